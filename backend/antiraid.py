@@ -0,0 +1,231 @@
+"""Join-rate raid detection with automatic guild lockdown.
+
+Configured through ``moderation_settings`` (detection is off unless
+``raid_join_threshold`` is set):
+
+    raid_join_threshold         joins within raid_join_interval that trigger a lockdown
+    raid_join_interval          seconds, default 10
+    raid_new_account_days       accounts younger than this count as new, default 7
+    raid_new_account_threshold  new-account joins within raid_join_interval that trigger a lockdown
+    raid_lockdown_duration      seconds without joins before the lockdown lifts, default 300
+    raid_verification_level     verification level applied during lockdown, default "high"
+    raid_alert_channel          channel name for the lockdown start/end notices
+
+Each guild keeps fixed-size ring buffers of recent join times, ``threshold - 1``
+slots each. The slot about to be overwritten holds the time of the join
+``threshold - 1`` joins ago, so the sliding-window check is a single
+comparison per join and memory per guild is constant. No database access
+happens on the join path.
+
+When a lockdown raises the verification level, ``on_lockdown`` receives the
+previous level so the caller can persist it; ``restore_after_restart`` undoes
+a lockdown the process did not live to lift.
+"""
+import asyncio
+import time
+from array import array
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import discord
+
+
+class JoinRing:
+    """Ring buffer answering "were there ``size`` joins within ``window`` seconds?" in O(1)"""
+
+    __slots__ = ('_times', '_index')
+
+    def __init__(self, size: int):
+        # The join being added is the size-th one, so only the previous size - 1 are kept
+        self._times = array('d', [float('-inf')] * (size - 1))
+        self._index = 0
+
+    def add(self, now: float, window: float) -> bool:
+        if not self._times:
+            return True
+        oldest = self._times[self._index]
+        self._times[self._index] = now
+        self._index = (self._index + 1) % len(self._times)
+        return now - oldest <= window
+
+
+class GuildRaidState:
+    """Detector buffers and lockdown state for one guild"""
+
+    __slots__ = ('key', 'joins', 'new_accounts', 'locked', 'locked_at', 'last_join',
+                 'suppressed', 'deferred', 'previous_verification', 'lift_task')
+
+    def __init__(self, key: tuple):
+        join_threshold, new_account_threshold = key[0], key[2]
+        self.key = key
+        self.joins = JoinRing(join_threshold) if join_threshold else None
+        self.new_accounts = JoinRing(new_account_threshold) if new_account_threshold else None
+        self.locked = False
+        self.locked_at = 0.0
+        self.last_join = 0.0
+        self.suppressed = 0
+        self.deferred: List = []
+        self.previous_verification = None
+        self.lift_task: Optional[asyncio.Task] = None
+
+
+class AntiRaidGuard:
+    """Watch member joins per guild and lock guilds down while a raid is in progress"""
+
+    def __init__(self, on_lift: Optional[Callable[[discord.Guild, Dict, List], Awaitable[None]]] = None,
+                 max_deferred: int = 5000,
+                 on_lockdown: Optional[Callable[[discord.Guild, discord.VerificationLevel, discord.VerificationLevel],
+                                                Awaitable[None]]] = None):
+        self.on_lift = on_lift
+        # Called with (guild, previous level, raised level) so the previous level can be stored
+        # and restored after a restart; on_lift runs once it has been restored
+        self.on_lockdown = on_lockdown
+        self.max_deferred = max_deferred
+        self._guilds: Dict[int, GuildRaidState] = {}
+        self.lockdowns = 0
+
+    @staticmethod
+    def _settings_key(settings: Dict) -> tuple:
+        return (
+            int(settings.get('raid_join_threshold') or 0),
+            float(settings.get('raid_join_interval', 10)),
+            int(settings.get('raid_new_account_threshold') or 0),
+            float(settings.get('raid_new_account_days', 7)) * 86400
+        )
+
+    def observe(self, member, settings: Dict) -> bool:
+        """Record a join; return True when the guild is (now) in lockdown"""
+        if not settings.get('raid_join_threshold'):
+            return False
+
+        guild_id = member.guild.id
+        key = self._settings_key(settings)
+        state = self._guilds.get(guild_id)
+        if state is None or state.key != key:
+            state = self._new_state(guild_id, key, state)
+
+        now = time.monotonic()
+        state.last_join = now
+        join_threshold, interval, _, new_account_age = key
+
+        tripped = state.joins is not None and state.joins.add(now, interval)
+        if state.new_accounts is not None:
+            created_at = getattr(member, 'created_at', None)
+            if created_at is not None and time.time() - created_at.timestamp() < new_account_age:
+                tripped = state.new_accounts.add(now, interval) or tripped
+
+        if state.locked:
+            state.suppressed += 1
+            if len(state.deferred) < self.max_deferred:
+                state.deferred.append(member)
+            return True
+
+        if tripped:
+            state.locked = True
+            state.locked_at = now
+            state.suppressed = 1
+            state.deferred = [member]
+            self.lockdowns += 1
+            state.lift_task = asyncio.get_running_loop().create_task(self._lockdown(member.guild, state, settings))
+            return True
+        return False
+
+    def _new_state(self, guild_id: int, key: tuple, previous: Optional[GuildRaidState]) -> GuildRaidState:
+        state = GuildRaidState(key)
+        if previous is not None and previous.locked:
+            # Keep an ongoing lockdown when the thresholds are edited mid-raid
+            for slot in ('locked', 'locked_at', 'suppressed', 'deferred', 'previous_verification', 'lift_task'):
+                setattr(state, slot, getattr(previous, slot))
+        self._guilds[guild_id] = state
+        return state
+
+    def is_locked(self, guild_id: int) -> bool:
+        state = self._guilds.get(guild_id)
+        return bool(state and state.locked)
+
+    async def _lockdown(self, guild: discord.Guild, state: GuildRaidState, settings: Dict):
+        print(f"Raid detected in {guild.name} ({guild.id}), starting lockdown")
+        level_name = settings.get('raid_verification_level', 'high')
+        try:
+            level = discord.VerificationLevel[level_name]
+            if guild.verification_level is None or guild.verification_level < level:
+                previous = guild.verification_level
+                await guild.edit(verification_level=level, reason="Anti-raid lockdown")
+                state.previous_verification = previous
+                if self.on_lockdown is not None and previous is not None:
+                    await self.on_lockdown(guild, previous, level)
+        except Exception as e:
+            print(f"Failed to raise verification level in {guild.id}: {e}")
+
+        await self._alert(guild, settings, "🚨 تم رصد هجوم انضمام! تم تفعيل وضع الإغلاق مؤقتاً وإيقاف رسائل الترحيب.")
+
+        duration = float(settings.get('raid_lockdown_duration', 300))
+        while True:
+            remaining = state.last_join + duration - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        await self.lift(guild, settings)
+
+    async def lift(self, guild: discord.Guild, settings: Dict):
+        """End a guild's lockdown and hand deferred members to the on_lift callback"""
+        state = self._guilds.get(guild.id)
+        if state is None or not state.locked:
+            return
+        state.locked = False
+        deferred, state.deferred = state.deferred, []
+        if state.lift_task is not None and state.lift_task is not asyncio.current_task():
+            state.lift_task.cancel()
+        state.lift_task = None
+
+        if state.previous_verification is not None:
+            try:
+                await guild.edit(verification_level=state.previous_verification, reason="Anti-raid lockdown ended")
+            except Exception as e:
+                print(f"Failed to restore verification level in {guild.id}: {e}")
+            state.previous_verification = None
+
+        print(f"Lockdown lifted in {guild.name} ({guild.id}) after {state.suppressed} joins")
+        await self._alert(guild, settings, f"✅ انتهى وضع الإغلاق. انضم {state.suppressed} عضو خلال الهجوم.")
+        if self.on_lift is not None:
+            await self.on_lift(guild, settings, deferred)
+
+    async def restore_after_restart(self, guild: discord.Guild, previous: discord.VerificationLevel,
+                                    raised: discord.VerificationLevel) -> bool:
+        """Undo a lockdown interrupted by a restart; returns False if it could not be undone yet
+
+        The level is only lowered while it is still the one the lockdown set, so a level
+        changed by the guild's admins in the meantime is kept.
+        """
+        if self.is_locked(guild.id):
+            return False
+        if guild.verification_level == raised:
+            try:
+                await guild.edit(verification_level=previous, reason="Anti-raid lockdown ended (after restart)")
+            except Exception as e:
+                print(f"Failed to restore verification level in {guild.id}: {e}")
+                return False
+        return True
+
+    async def _alert(self, guild: discord.Guild, settings: Dict, message: str):
+        channel_name = settings.get('raid_alert_channel')
+        if not channel_name:
+            return
+        channel = discord.utils.get(guild.channels, name=channel_name)
+        if channel is None:
+            return
+        try:
+            await channel.send(message)
+        except Exception as e:
+            print(f"Failed to send raid alert in {guild.id}: {e}")
+
+    def status(self, guild_id: int) -> Dict:
+        state = self._guilds.get(guild_id)
+        if state is None:
+            return {"monitored": False, "locked": False}
+        return {
+            "monitored": True,
+            "locked": state.locked,
+            "locked_for_seconds": round(time.monotonic() - state.locked_at, 1) if state.locked else 0,
+            "suppressed_joins": state.suppressed if state.locked else 0,
+            "deferred_members": len(state.deferred)
+        }
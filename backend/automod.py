@@ -0,0 +1,349 @@
+"""Keyword, regex, spam and mention-flood automod driven by moderation_settings.
+
+Supported ``moderation_settings`` keys (all optional):
+
+    enabled            bool, default True
+    banned_words       list of words/phrases, matched case-insensitively anywhere in the message
+    banned_patterns    list of regular expressions, matched case-insensitively
+    spam_max_messages  messages allowed per member within spam_interval seconds
+    spam_interval      default 5
+    mention_max        user/role mentions allowed per member within mention_interval seconds
+    mention_interval   default 10
+    actions            any of "delete", "timeout"; default ["delete"]
+    timeout_duration   timeout length in seconds, default 300
+    exempt_roles       role names that bypass automod
+
+Banned words are compiled into one Aho-Corasick automaton and the patterns
+into one combined regex per guild (patterns with groups, which may hold
+backreferences or repeat group names, are matched on their own). Compiled rules are cached and rebuilt only
+when the settings change. Matching is pure CPU work; the resulting deletes and
+timeouts are queued and sent in batches (bulk delete per channel, one timeout
+per member) so a flood of bad messages does not turn into a flood of requests.
+"""
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher over casefolded text"""
+
+    __slots__ = ('_goto', '_fail', '_out')
+
+    def __init__(self, terms: List[str]):
+        goto = [{}]
+        out = [None]
+        for term in terms:
+            node = 0
+            for ch in term:
+                nxt = goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append(None)
+                    goto[node][ch] = nxt
+                node = nxt
+            out[node] = term
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[nxt] is None:
+                    out[nxt] = out[fail[nxt]]
+
+        self._goto = goto
+        self._fail = fail
+        self._out = out
+
+    def search(self, text: str) -> Optional[str]:
+        """Return the first banned term found in ``text`` or None"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node] is not None:
+                return out[node]
+        return None
+
+
+class SlidingWindow:
+    """Per-key weighted event counts over the last ``window`` seconds"""
+
+    __slots__ = ('window', '_events', '_totals')
+
+    def __init__(self, window: float):
+        self.window = window
+        self._events: Dict[int, deque] = {}
+        self._totals: Dict[int, int] = {}
+
+    def add(self, key: int, now: float, weight: int = 1) -> int:
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque()
+            total = 0
+        else:
+            total = self._totals[key]
+            cutoff = now - self.window
+            while events and events[0][0] <= cutoff:
+                total -= events.popleft()[1]
+        events.append((now, weight))
+        total += weight
+        self._totals[key] = total
+        return total
+
+    def prune(self, now: float):
+        """Drop keys whose newest event has left the window"""
+        cutoff = now - self.window
+        stale = [key for key, events in self._events.items() if events[-1][0] <= cutoff]
+        for key in stale:
+            del self._events[key]
+            del self._totals[key]
+
+    def __len__(self):
+        return len(self._events)
+
+
+_GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+
+def _scoped(pattern: str) -> str:
+    """Wrap a pattern for the combined alternation
+
+    Leading global inline flags such as ``(?i)`` are only valid at the very
+    start of an expression, so they become scoped flags on the pattern's own
+    group instead: ``(?i)spam`` -> ``(?i:spam)``.
+    """
+    flags = ''
+    match = _GLOBAL_FLAGS.match(pattern)
+    while match:
+        flags += match.group(1)
+        pattern = pattern[match.end():]
+        match = _GLOBAL_FLAGS.match(pattern)
+    return f"(?{flags}:{pattern})" if flags else f"(?:{pattern})"
+
+
+class GuildRules:
+    """Compiled moderation_settings for one guild"""
+
+    __slots__ = ('enabled', 'automaton', 'regexes', 'spam_max', 'spam', 'mention_max',
+                 'mentions', 'delete', 'timeout', 'timeout_duration', 'exempt_roles')
+
+    def __init__(self, settings: Dict):
+        self.enabled = settings.get('enabled', True)
+
+        terms = sorted({str(word).casefold().strip() for word in settings.get('banned_words') or []} - {''})
+        self.automaton = AhoCorasick(terms) if terms else None
+
+        # Group-free patterns share one alternation; patterns with groups keep their own regex,
+        # since joining renumbers groups (breaking backreferences) and repeats group names
+        combinable = []
+        regexes = []
+        for pattern in settings.get('banned_patterns') or []:
+            try:
+                pattern = _scoped(str(pattern))
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                print(f"Ignoring invalid automod pattern {pattern!r}: {e}")
+                continue
+            if compiled.groups:
+                regexes.append(compiled)
+            else:
+                combinable.append(pattern)
+        if len(combinable) > 1:
+            try:
+                regexes.insert(0, re.compile('|'.join(combinable), re.IGNORECASE))
+            except re.error as e:
+                print(f"Cannot combine automod patterns, matching them one by one: {e}")
+                regexes[:0] = [re.compile(pattern, re.IGNORECASE) for pattern in combinable]
+        elif combinable:
+            regexes.insert(0, re.compile(combinable[0], re.IGNORECASE))
+        self.regexes = tuple(regexes)
+
+        self.spam_max = int(settings.get('spam_max_messages') or 0)
+        self.spam = SlidingWindow(float(settings.get('spam_interval', 5))) if self.spam_max else None
+        self.mention_max = int(settings.get('mention_max') or 0)
+        self.mentions = SlidingWindow(float(settings.get('mention_interval', 10))) if self.mention_max else None
+
+        actions = settings.get('actions') or ['delete']
+        self.delete = 'delete' in actions
+        self.timeout = 'timeout' in actions
+        self.timeout_duration = timedelta(seconds=int(settings.get('timeout_duration', 300)))
+        self.exempt_roles = frozenset(settings.get('exempt_roles') or [])
+
+
+class ActionBatcher:
+    """Queue automod actions and send them in batches"""
+
+    def __init__(self, flush_interval: float = 0.5, max_batch: int = 100):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._deletes: Dict[int, tuple] = {}
+        self._timeouts: Dict[tuple, tuple] = {}
+        self._pending = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self.requests = 0
+
+    def delete(self, message):
+        entry = self._deletes.get(message.channel.id)
+        if entry is None:
+            entry = self._deletes[message.channel.id] = (message.channel, [])
+        entry[1].append(message)
+        self._enqueued()
+
+    def timeout(self, member, duration: timedelta, reason: str):
+        key = (member.guild.id, member.id)
+        if key not in self._timeouts:
+            self._timeouts[key] = (member, duration, reason)
+            self._enqueued()
+
+    def _enqueued(self):
+        self._pending += 1
+        if self._pending >= self.max_batch:
+            self._schedule(0)
+        elif self._flush_task is None:
+            self._schedule(self.flush_interval)
+
+    def _schedule(self, delay: float):
+        if self._flush_task is not None and delay:
+            return
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        deletes, self._deletes = self._deletes, {}
+        timeouts, self._timeouts = self._timeouts, {}
+        self._pending = 0
+
+        for channel, messages in deletes.values():
+            for start in range(0, len(messages), 100):
+                chunk = messages[start:start + 100]
+                try:
+                    self.requests += 1
+                    if len(chunk) == 1:
+                        await chunk[0].delete()
+                    else:
+                        await channel.delete_messages(chunk, reason="Automod")
+                except Exception as e:
+                    print(f"Automod delete failed in {channel}: {e}")
+
+        for member, duration, reason in timeouts.values():
+            try:
+                self.requests += 1
+                await member.timeout(duration, reason=reason)
+            except Exception as e:
+                print(f"Automod timeout failed for {member}: {e}")
+
+
+class AutoModEngine:
+    """Check guild messages against cached per-guild rules"""
+
+    def __init__(self, batcher: Optional[ActionBatcher] = None, prune_every: int = 10000):
+        self.batcher = batcher or ActionBatcher()
+        self.prune_every = prune_every
+        self._rules: Dict[int, tuple] = {}
+        self.checked = 0
+        self.flagged = 0
+
+    def rules_for(self, guild_id: int, settings: Dict) -> GuildRules:
+        """Return compiled rules, rebuilding them only when the settings changed"""
+        cached = self._rules.get(guild_id)
+        if cached is not None and cached[0] is settings:
+            return cached[2]
+        fingerprint = json.dumps(settings, sort_keys=True, default=str)
+        if cached is not None and cached[1] == fingerprint:
+            rules = cached[2]
+        else:
+            rules = GuildRules(settings)
+        self._rules[guild_id] = (settings, fingerprint, rules)
+        return rules
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        if guild_id is None:
+            self._rules.clear()
+        else:
+            self._rules.pop(guild_id, None)
+
+    def check(self, message, settings: Dict) -> Optional[str]:
+        """Return the reason a message violates the guild's rules, or None"""
+        rules = self.rules_for(message.guild.id, settings)
+        if not rules.enabled:
+            return None
+
+        author = message.author
+        if rules.exempt_roles and any(role.name in rules.exempt_roles for role in author.roles):
+            return None
+        permissions = getattr(author, 'guild_permissions', None)
+        if permissions is not None and permissions.manage_messages:
+            return None
+
+        self.checked += 1
+        if self.checked % self.prune_every == 0:
+            self._prune()
+
+        now = time.monotonic()
+        reason = None
+        if rules.spam is not None and rules.spam.add(author.id, now) > rules.spam_max:
+            reason = "spam"
+        if rules.mentions is not None:
+            mention_count = len(message.mentions) + len(message.role_mentions)
+            if mention_count and rules.mentions.add(author.id, now, mention_count) > rules.mention_max:
+                reason = "mention flood"
+
+        content = message.content
+        if reason is None and content:
+            if rules.automaton is not None and rules.automaton.search(content.casefold()) is not None:
+                reason = "banned word"
+            elif any(regex.search(content) is not None for regex in rules.regexes):
+                reason = "banned pattern"
+        return reason
+
+    def process(self, message, settings: Dict) -> Optional[str]:
+        """Check a message and queue the configured actions for violations"""
+        reason = self.check(message, settings)
+        if reason is None:
+            return None
+        self.flagged += 1
+        rules = self._rules[message.guild.id][2]
+        if rules.delete:
+            self.batcher.delete(message)
+        if rules.timeout:
+            self.batcher.timeout(message.author, rules.timeout_duration, f"Automod: {reason}")
+        return reason
+
+    def _prune(self):
+        now = time.monotonic()
+        for _, _, rules in self._rules.values():
+            if rules.spam is not None:
+                rules.spam.prune(now)
+            if rules.mentions is not None:
+                rules.mentions.prune(now)
+
+    def stats(self) -> Dict:
+        return {
+            "guilds": len(self._rules),
+            "checked": self.checked,
+            "flagged": self.flagged,
+            "action_requests": self.batcher.requests
+        }
@@ -0,0 +1,79 @@
+"""Full-text search over server configurations.
+
+A Mongo text index covers ``name``, ``description`` and ``search_text``, a
+derived field holding the template's role, category and channel names (one
+per line). ``search_text`` is computed from the plain template on every
+write, before the heavy sections are packed by ConfigStorage, so it stays
+searchable in every storage mode. The index uses ``default_language: "none"``:
+no stemming or stop words, which suits Arabic and English names alike.
+
+Matches are ranked by ``textScore`` (name hits weigh most), and each result
+carries highlight spans computed from the query terms.
+"""
+import re
+from typing import Dict, Iterable, List
+
+TEXT_INDEX_NAME = "config_search"
+TEXT_INDEX_KEYS = [("name", "text"), ("description", "text"), ("search_text", "text")]
+TEXT_INDEX_OPTIONS = {
+    "name": TEXT_INDEX_NAME,
+    "weights": {"name": 10, "description": 4, "search_text": 1},
+    "default_language": "none"
+}
+
+MAX_CONTENT_HIGHLIGHTS = 5
+
+
+def _entry_names(config: Dict) -> Iterable[str]:
+    for role in config.get('roles') or []:
+        yield role.get('name')
+    for channel in config.get('channels') or []:
+        yield channel.get('name')
+    for category in config.get('categories') or []:
+        yield category.get('name')
+        for channel in category.get('channels') or []:
+            yield channel.get('name')
+
+
+def search_text(config: Dict) -> str:
+    """Role, category and channel names of a plain (unpacked) template, deduplicated"""
+    return "\n".join(dict.fromkeys(name for name in _entry_names(config) if name))
+
+
+def query_terms(query: str) -> List[str]:
+    """Positive words of a $text query (negated terms and operators dropped)"""
+    terms = []
+    for token in re.findall(r'-?"[^"]*"|\S+', query):
+        if token.startswith('-'):
+            continue
+        terms.extend(re.findall(r'\w+', token))
+    return list(dict.fromkeys(term.casefold() for term in terms))
+
+
+def _spans(text: str, pattern) -> List[List[int]]:
+    return [[match.start(), match.end()] for match in pattern.finditer(text)]
+
+
+def highlights(doc: Dict, terms: List[str]) -> List[Dict]:
+    """Where the query terms occur: [{field, text, spans: [[start, end], ...]}]
+
+    ``contents`` entries are the individual role/channel names that matched.
+    """
+    if not terms:
+        return []
+    pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, terms)) + r')(?!\w)', re.IGNORECASE)
+    result = []
+    for field in ('name', 'description'):
+        text = doc.get(field) or ''
+        spans = _spans(text, pattern)
+        if spans:
+            result.append({"field": field, "text": text, "spans": spans})
+    matched = 0
+    for name in (doc.get('search_text') or '').split('\n'):
+        spans = _spans(name, pattern)
+        if spans:
+            result.append({"field": "contents", "text": name, "spans": spans})
+            matched += 1
+            if matched == MAX_CONTENT_HIGHLIGHTS:
+                break
+    return result
@@ -0,0 +1,150 @@
+"""Optional compact storage for the heavy sections of server configurations.
+
+``roles``, ``channels`` and ``categories`` make up nearly all of a large
+template. With ``CONFIG_STORAGE_MODE`` set, documents whose heavy sections
+serialize to at least ``CONFIG_STORAGE_MIN_BYTES`` keep them compressed under
+``_packed`` instead of inline:
+
+    inline      sections stored as plain arrays (default, previous behaviour)
+    compressed  each section is a compressed blob inside the document
+    dedup       each section is stored once in ``config_blobs``, keyed by the
+                SHA-256 of its content and reference counted, so templates
+                sharing identical sections share one blob
+
+Blobs use zstandard when the package is installed and zlib otherwise; the codec
+is recorded per section, so both can be read back regardless of the current
+setting. Documents are decoded only where the sections are needed (setup and
+full reads); metadata reads never touch them. Decompressed sections are kept in
+a small LRU cache keyed by content hash.
+"""
+import hashlib
+import json
+import os
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+HEAVY_FIELDS = ('roles', 'channels', 'categories')
+STORAGE_MODES = ('inline', 'compressed', 'dedup')
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 9)
+
+
+def _decompress(blob: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Section is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return zlib.decompress(blob)
+
+
+class ConfigStorage:
+    """Pack heavy config sections on write and unpack them on demand"""
+
+    def __init__(self, mode: str = 'inline', min_bytes: int = 4096, codec: Optional[str] = None,
+                 cache_size: int = 256):
+        if mode not in STORAGE_MODES:
+            raise ValueError(f"Unknown config storage mode {mode!r}, expected one of {STORAGE_MODES}")
+        self.mode = mode
+        self.min_bytes = min_bytes
+        self.codec = codec or ('zstd' if zstandard is not None else 'zlib')
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> 'ConfigStorage':
+        return cls(
+            mode=os.environ.get('CONFIG_STORAGE_MODE', 'inline'),
+            min_bytes=int(os.environ.get('CONFIG_STORAGE_MIN_BYTES', 4096)),
+            codec=os.environ.get('CONFIG_STORAGE_CODEC') or None
+        )
+
+    # Writing ----------------------------------------------------------------
+
+    async def encode(self, db, doc: Dict) -> Dict:
+        """Return a copy of ``doc`` with its heavy sections packed according to the mode"""
+        if self.mode == 'inline':
+            return doc
+        sections = {
+            field: json.dumps(doc[field], ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            for field in HEAVY_FIELDS if doc.get(field) is not None
+        }
+        if sum(len(data) for data in sections.values()) < self.min_bytes:
+            return doc
+
+        packed = {}
+        for field, data in sections.items():
+            digest = hashlib.sha256(data).hexdigest()
+            blob = _compress(data, self.codec)
+            entry = {"codec": self.codec, "sha256": digest, "size": len(data)}
+            if self.mode == 'compressed':
+                entry["blob"] = blob
+            else:
+                await db.config_blobs.update_one(
+                    {"sha256": digest},
+                    {"$setOnInsert": {"codec": self.codec, "blob": blob, "size": len(data)}, "$inc": {"refs": 1}},
+                    upsert=True
+                )
+            packed[field] = entry
+            self._remember(digest, data)
+
+        encoded = {key: value for key, value in doc.items() if key not in packed}
+        encoded['_packed'] = packed
+        return encoded
+
+    @staticmethod
+    def update_operations(encoded: Dict) -> Dict:
+        """$set/$unset operations that replace a stored document's sections with ``encoded``'s"""
+        operations = {"$set": dict(encoded)}
+        if '_packed' in encoded:
+            unset = {field: "" for field in encoded['_packed']}
+        else:
+            unset = {"_packed": ""}
+        operations["$unset"] = unset
+        return operations
+
+    async def release(self, db, doc: Optional[Dict]):
+        """Drop a stored document's references to shared blobs"""
+        for entry in ((doc or {}).get('_packed') or {}).values():
+            if 'blob' in entry:
+                continue
+            await db.config_blobs.update_one({"sha256": entry['sha256']}, {"$inc": {"refs": -1}})
+            await db.config_blobs.delete_one({"sha256": entry['sha256'], "refs": {"$lte": 0}})
+
+    # Reading ----------------------------------------------------------------
+
+    async def decode(self, db, doc: Optional[Dict]) -> Optional[Dict]:
+        """Return ``doc`` with packed sections restored; unpacked documents are returned as is"""
+        if not doc or '_packed' not in doc:
+            return doc
+        decoded = {key: value for key, value in doc.items() if key != '_packed'}
+        for field, entry in doc['_packed'].items():
+            data = self._cache.get(entry['sha256'])
+            if data is None:
+                blob = entry.get('blob')
+                if blob is None:
+                    stored = await db.config_blobs.find_one({"sha256": entry['sha256']}, {"_id": 0, "blob": 1})
+                    if stored is None:
+                        raise LookupError(f"Missing config blob {entry['sha256']} for section {field}")
+                    blob = stored['blob']
+                data = _decompress(blob, entry['codec'])
+                self._remember(entry['sha256'], data)
+            else:
+                self._cache.move_to_end(entry['sha256'])
+            decoded[field] = json.loads(data)
+        return decoded
+
+    def _remember(self, digest: str, data: bytes):
+        self._cache[digest] = data
+        self._cache.move_to_end(digest)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,113 @@
+"""Version history for server configurations as JSON-patch deltas.
+
+Every saved version gets a record in ``config_versions``. Most records hold a
+JSON patch (RFC 6902 ``add``/``remove``/``replace`` operations) from the
+previous version; every ``checkpoint_every``-th version holds the full
+document instead. Rebuilding any version therefore starts from the nearest
+checkpoint at or below it and applies at most ``checkpoint_every - 1``
+patches, however long the history grows.
+
+Lists are diffed index by index, which keeps edits to a single role or channel
+down to a few small operations.
+"""
+import copy
+from typing import Any, Dict, Iterable, List
+
+CHECKPOINT_EVERY = 10
+
+
+def _escape(key: str) -> str:
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def _unescape(token: str) -> str:
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def make_patch(old: Any, new: Any, path: str = '') -> List[Dict]:
+    """Return the JSON patch operations turning ``old`` into ``new``"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            child = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": child, "value": copy.deepcopy(value)})
+            else:
+                ops.extend(make_patch(old[key], value, child))
+        return ops
+
+    if isinstance(old, list) and isinstance(new, list):
+        # Only the middle section between an unchanged head and tail is diffed,
+        # so inserting or removing one entry does not shift every later index
+        head = 0
+        while head < len(old) and head < len(new) and old[head] == new[head]:
+            head += 1
+        tail = 0
+        while (tail < len(old) - head and tail < len(new) - head
+               and old[len(old) - 1 - tail] == new[len(new) - 1 - tail]):
+            tail += 1
+        old_end = len(old) - tail
+        new_end = len(new) - tail
+
+        ops = []
+        common = min(old_end - head, new_end - head)
+        for index in range(head, head + common):
+            ops.extend(make_patch(old[index], new[index], f"{path}/{index}"))
+        # Remove from the end so earlier indexes stay valid
+        for index in range(old_end - 1, head + common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{index}"})
+        for index in range(head + common, new_end):
+            ops.append({"op": "add", "path": f"{path}/{index}", "value": copy.deepcopy(new[index])})
+        return ops
+
+    if old == new and type(old) is type(new):
+        return []
+    return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+
+
+def apply_patch(document: Any, patch: Iterable[Dict]) -> Any:
+    """Apply JSON patch operations to a copy of ``document``"""
+    document = copy.deepcopy(document)
+    for op in patch:
+        tokens = [_unescape(token) for token in op['path'].split('/')[1:]]
+        if not tokens:
+            document = copy.deepcopy(op.get('value'))
+            continue
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            if op['op'] == 'add':
+                parent.insert(index, copy.deepcopy(op['value']))
+            elif op['op'] == 'remove':
+                del parent[index]
+            else:
+                parent[index] = copy.deepcopy(op['value'])
+        else:
+            if op['op'] == 'remove':
+                del parent[last]
+            else:
+                parent[last] = copy.deepcopy(op['value'])
+    return document
+
+
+def is_checkpoint(version: int, checkpoint_every: int = CHECKPOINT_EVERY) -> bool:
+    return version == 1 or (version - 1) % checkpoint_every == 0
+
+
+def rebuild(records: Iterable[Dict]) -> Dict:
+    """Rebuild a version from its checkpoint record followed by the delta records up to it"""
+    document = None
+    for record in records:
+        if record['kind'] == 'checkpoint':
+            document = copy.deepcopy(record['document'])
+        elif document is not None:
+            document = apply_patch(document, record['patch'])
+    if document is None:
+        raise ValueError("Version history has no checkpoint")
+    return document
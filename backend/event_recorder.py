@@ -0,0 +1,90 @@
+"""Record gateway member join/leave events to a compact binary file.
+
+Each event is a fixed 33-byte little-endian record:
+
+    kind (u8) | timestamp (f64, unix) | guild_id (u64) | member_id (u64) | account_created (f64, unix)
+
+preceded once by a 6-byte file header (magic + format version). The file is
+append-only, so several bot runs can record into the same file and the
+replayer in benchmarks/replay_events.py can read it back.
+"""
+import os
+import struct
+import time
+from typing import Iterator, NamedTuple, Optional
+
+MAGIC = b'NEVT'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sH')
+RECORD = struct.Struct('<BdQQd')
+
+EVENT_JOIN = 1
+EVENT_LEAVE = 2
+
+
+class RecordedEvent(NamedTuple):
+    kind: int
+    timestamp: float
+    guild_id: int
+    member_id: int
+    account_created: float
+
+
+class EventRecorder:
+    """Append member events to a recording file with buffered writes"""
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.flush_every = flush_every
+        self.recorded = 0
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new_file:
+            self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+
+    @classmethod
+    def from_env(cls) -> Optional['EventRecorder']:
+        """Create a recorder when EVENT_RECORD_PATH is set, otherwise None"""
+        path = os.environ.get('EVENT_RECORD_PATH')
+        return cls(path) if path else None
+
+    def record(self, kind: int, guild_id: int, member_id: int,
+               account_created: float = 0.0, timestamp: Optional[float] = None):
+        self._file.write(RECORD.pack(
+            kind,
+            time.time() if timestamp is None else timestamp,
+            guild_id,
+            member_id,
+            account_created
+        ))
+        self.recorded += 1
+        if self.recorded % self.flush_every == 0:
+            self._file.flush()
+
+    def record_member(self, kind: int, member):
+        """Record an event for a discord.Member"""
+        created_at = getattr(member, 'created_at', None)
+        self.record(kind, member.guild.id, member.id, created_at.timestamp() if created_at else 0.0)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            self._file.close()
+
+
+def read_events(path: str) -> Iterator[RecordedEvent]:
+    """Yield the events stored in a recording file in order"""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a member event recording")
+        while True:
+            chunk = f.read(RECORD.size * 4096)
+            if not chunk:
+                break
+            usable = len(chunk) - len(chunk) % RECORD.size
+            for fields in RECORD.iter_unpack(chunk[:usable]):
+                yield RecordedEvent(*fields)
@@ -0,0 +1,146 @@
+"""Capture a live guild's structure as a ServerConfig in the ``categories`` format.
+
+Everything is read from the bot's gateway cache (roles, channels, positions and
+permission overwrites), so taking a snapshot costs no REST calls.
+
+A snapshot is first flattened into entities keyed by Discord ID
+(``role:<id>``, ``category:<id>``, ``channel:<id>``). Incremental snapshots
+compare a hash of every entity with the hashes stored for the previous
+snapshot and keep only entities that were added or changed plus the keys that
+disappeared. ``apply_changes`` replays a chain of snapshots back into a full
+entity map and ``entities_to_config`` turns that into a ServerConfig dict.
+
+Overwrites are stored as ``{"role name": {"allow": int, "deny": int}}`` with
+``"@everyone"`` for the default role. Member-specific overwrites are not
+portable between guilds and are left out.
+"""
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EVERYONE = "@everyone"
+
+# Channel types that setup can recreate, mapped to the config's channel type
+CHANNEL_TYPES = {
+    'text': 'text',
+    'news': 'text',
+    'voice': 'voice',
+    'stage_voice': 'voice',
+}
+
+
+def _overwrites(channel) -> Dict[str, Dict[str, int]]:
+    result = {}
+    for target, overwrite in channel.overwrites.items():
+        if not hasattr(target, 'is_default'):
+            continue  # member overwrite
+        allow, deny = overwrite.pair()
+        name = EVERYONE if target.is_default() else target.name
+        result[name] = {"allow": allow.value, "deny": deny.value}
+    return result
+
+
+def capture_entities(guild) -> Dict[str, Dict]:
+    """Flatten the cached guild structure into entities keyed by Discord ID"""
+    entities = {}
+    for role in guild.roles:
+        if role.is_default() or role.managed:
+            continue
+        entities[f"role:{role.id}"] = {
+            "name": role.name,
+            "permissions": role.permissions.value,
+            "color": f"#{role.color.value:06x}",
+            "hoist": role.hoist,
+            "mentionable": role.mentionable,
+            "position": role.position
+        }
+
+    for channel in guild.channels:
+        channel_type = str(channel.type)
+        if channel_type == 'category':
+            entities[f"category:{channel.id}"] = {
+                "name": channel.name,
+                "position": channel.position,
+                "overwrites": _overwrites(channel)
+            }
+        elif channel_type in CHANNEL_TYPES:
+            entry = {
+                "name": channel.name,
+                "type": CHANNEL_TYPES[channel_type],
+                "position": channel.position,
+                "category": str(channel.category_id) if channel.category_id else None,
+                "overwrites": _overwrites(channel)
+            }
+            topic = getattr(channel, 'topic', None)
+            if topic:
+                entry["topic"] = topic
+            entities[f"channel:{channel.id}"] = entry
+    return entities
+
+
+def entity_hash(entry: Dict) -> str:
+    serialized = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(serialized.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def diff_entities(previous_hashes: Dict[str, str], entities: Dict[str, Dict]) -> Tuple[Dict, List[str], Dict[str, str]]:
+    """Return (changed entities, removed keys, new hashes) relative to the previous snapshot"""
+    hashes = {key: entity_hash(entry) for key, entry in entities.items()}
+    changed = {key: entities[key] for key, value in hashes.items() if previous_hashes.get(key) != value}
+    removed = [key for key in previous_hashes if key not in hashes]
+    return changed, removed, hashes
+
+
+def apply_changes(snapshots: Iterable[Dict]) -> Dict[str, Dict]:
+    """Rebuild the full entity map from a full snapshot followed by its incrementals"""
+    entities: Dict[str, Dict] = {}
+    for snapshot in snapshots:
+        if snapshot.get('kind') == 'full':
+            entities = dict(snapshot['entities'])
+        else:
+            entities.update(snapshot.get('entities') or {})
+            for key in snapshot.get('removed') or []:
+                entities.pop(key, None)
+    return entities
+
+
+def _ordered(entries: Iterable[Dict]) -> List[Dict]:
+    return sorted(entries, key=lambda entry: (entry.get('type') == 'voice', entry.get('position', 0)))
+
+
+def entities_to_config(entities: Dict[str, Dict], name: str, description: str,
+                       icon_url: Optional[str] = None) -> Dict:
+    """Build a ServerConfig dict (categories format) from snapshot entities"""
+    # Roles are created top-down, so the highest role comes first
+    roles = [
+        {key: value for key, value in entry.items() if key != 'position'}
+        for entry in sorted((e for k, e in entities.items() if k.startswith('role:')),
+                            key=lambda entry: entry['position'], reverse=True)
+    ]
+
+    categories = {}
+    for key, entry in entities.items():
+        if key.startswith('category:'):
+            categories[key.split(':', 1)[1]] = {**entry, "channels": []}
+
+    uncategorized = []
+    for key, entry in entities.items():
+        if not key.startswith('channel:'):
+            continue
+        channel = {k: v for k, v in entry.items() if k != 'category'}
+        parent = categories.get(entry.get('category'))
+        (parent["channels"] if parent is not None else uncategorized).append(channel)
+
+    ordered_categories = []
+    for category in sorted(categories.values(), key=lambda entry: entry['position']):
+        category["channels"] = _ordered(category["channels"])
+        ordered_categories.append(category)
+
+    return {
+        "name": name,
+        "description": description,
+        "icon_url": icon_url,
+        "roles": roles,
+        "categories": ordered_categories,
+        "channels": _ordered(uncategorized)
+    }
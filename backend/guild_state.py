@@ -0,0 +1,185 @@
+"""Compact runtime form of a guild's welcome, auto-role and moderation settings.
+
+``get_guild_config`` keeps one ``GuildState`` per guild instead of the raw
+Mongo document. At 100k guilds the raw form repeats every key and every piece
+of template text per guild; here:
+
+    - records use ``__slots__`` (no per-instance dict)
+    - strings are interned, so text shared by guilds set up from the same
+      template is stored once
+    - identical welcome/auto-role records and moderation dicts are shared
+      between guilds through weak-value pools
+    - the embed colour is parsed once to an int, and auto-role names are
+      resolved to role IDs on first use per guild (cleared on role changes)
+
+Welcome keys not listed in ``WelcomeSettings.DEFAULTS`` are dropped. Shared
+records must be treated as read-only.
+"""
+import json
+import sys
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def parse_color(value, default: int = 0x00ff00) -> int:
+    """Accept "#rrggbb", "rrggbb" or an int"""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).lstrip('#'), 16)
+    except ValueError:
+        return default
+
+
+def _shared(pool: weakref.WeakValueDictionary, values, factory, same):
+    """Return the pooled record equal to ``values``, creating it when no guild holds one
+
+    Records are pooled by hash, so the pool holds no copy of the values; a hash
+    collision just leaves the second record unshared.
+    """
+    try:
+        key = hash(values)
+    except TypeError:  # unhashable value in the settings: keep a private copy
+        return factory()
+    record = pool.get(key)
+    if record is not None and same(record):
+        return record
+    record = factory()
+    pool.setdefault(key, record)
+    return record
+
+
+class WelcomeSettings:
+    """Welcome and goodbye message settings with the handlers' defaults applied"""
+
+    DEFAULTS = {
+        'enabled': False,
+        'channel': 'الترحيب',
+        'message': 'مرحباً {user} في {server}! 🎉',
+        'use_embed': True,
+        'title': 'مرحباً بك! 🎉',
+        'color': 0x00ff00,
+        'thumbnail': False,
+        'footer': None,
+        'goodbye_enabled': False,
+        'goodbye_channel': 'الترحيب',
+        'goodbye_message': 'وداعاً {username}! 👋',
+        'delivery': None,
+        'card': False,
+        'card_background': None,
+        'card_color': None,
+        'card_accent': None,
+        'card_title': None,
+        'card_text': None,
+    }
+    __slots__ = tuple(DEFAULTS) + ('__weakref__',)
+
+    _pool: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __init__(self, values: Tuple):
+        for name, value in zip(self.DEFAULTS, values):
+            setattr(self, name, value)
+
+    def values(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.DEFAULTS)
+
+    @classmethod
+    def from_dict(cls, settings: Optional[Dict]) -> Optional['WelcomeSettings']:
+        if not settings:
+            return None
+        values = []
+        for name, default in cls.DEFAULTS.items():
+            value = settings.get(name, default)
+            if name == 'color':
+                value = parse_color(value, default)
+            values.append(_intern(value))
+        values = tuple(values)
+        return _shared(cls._pool, values, lambda: cls(values), lambda record: record.values() == values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Mapping-style access for code written against the settings dict"""
+        value = getattr(self, key, None) if key in self.DEFAULTS else None
+        return default if value is None else value
+
+
+class AutoRoleSettings:
+    """Auto-role switch and role names; names resolve to IDs per guild in GuildState"""
+
+    __slots__ = ('enabled', 'roles', '__weakref__')
+
+    _pool: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+    def __init__(self, enabled: bool, roles: Tuple[str, ...]):
+        self.enabled = enabled
+        self.roles = roles
+
+    @classmethod
+    def from_dict(cls, settings: Optional[Dict]) -> Optional['AutoRoleSettings']:
+        if not settings:
+            return None
+        enabled = bool(settings.get('enabled', False))
+        roles = tuple(_intern(str(name)) for name in settings.get('roles') or [])
+        return _shared(cls._pool, (enabled, roles), lambda: cls(enabled, roles),
+                       lambda record: record.enabled == enabled and record.roles == roles)
+
+
+class _SharedDict(dict):
+    __slots__ = ('__weakref__',)
+
+
+_moderation_pool: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+
+def shared_moderation(settings: Optional[Dict]) -> Optional[Dict]:
+    """One dict per distinct moderation configuration, shared by every guild using it"""
+    if not settings:
+        return None
+    canonical = json.dumps(settings, sort_keys=True, default=str)
+    return _shared(_moderation_pool, canonical, lambda: _SharedDict(json.loads(canonical)),
+                   lambda record: record == settings)
+
+
+class GuildState:
+    """A guild's cached runtime settings; ``found`` is False for guilds without stored settings"""
+
+    __slots__ = ('found', 'config_id', 'welcome', 'auto_role', 'moderation', 'auto_role_ids', 'loaded_at')
+
+    def __init__(self, loaded_at: float, found: bool = False, config_id: Optional[str] = None,
+                 welcome: Optional[WelcomeSettings] = None, auto_role: Optional[AutoRoleSettings] = None,
+                 moderation: Optional[Dict] = None):
+        self.found = found
+        self.config_id = config_id
+        self.welcome = welcome
+        self.auto_role = auto_role
+        self.moderation = moderation
+        self.auto_role_ids: Optional[Tuple[int, ...]] = None
+        self.loaded_at = loaded_at
+
+    @classmethod
+    def from_document(cls, doc: Optional[Dict], loaded_at: float) -> 'GuildState':
+        if doc is None:
+            return cls(loaded_at)
+        return cls(
+            loaded_at,
+            found=True,
+            config_id=_intern(doc.get('id')),
+            welcome=WelcomeSettings.from_dict(doc.get('welcome_settings')),
+            auto_role=AutoRoleSettings.from_dict(doc.get('auto_role_settings')),
+            moderation=shared_moderation(doc.get('moderation_settings'))
+        )
+
+    def auto_roles(self, guild) -> list:
+        """The guild's auto-role objects, resolving the configured names to IDs once"""
+        if not self.auto_role or not self.auto_role.enabled:
+            return []
+        if self.auto_role_ids is None:
+            by_name = {}
+            for role in guild.roles:
+                by_name.setdefault(role.name, role.id)
+            self.auto_role_ids = tuple(by_name[name] for name in self.auto_role.roles if name in by_name)
+        roles = [guild.get_role(role_id) for role_id in self.auto_role_ids]
+        return [role for role in roles if role is not None]
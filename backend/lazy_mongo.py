@@ -0,0 +1,63 @@
+"""Motor client and database handle created on first use.
+
+Importing the server module should not read connection settings or build a
+client: tools and benchmarks import it without a database, and at startup the
+client is first needed by the warm-up phase, which pings it explicitly.
+``LazyMongo.db`` behaves like a Motor database (``db.collection``,
+``db['collection']``, ``db.command(...)``); the client is built from
+``MONGO_URL`` and ``DB_NAME`` when a collection is first touched.
+"""
+import os
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+
+class _LazyDatabase:
+    __slots__ = ('_mongo',)
+
+    def __init__(self, mongo: 'LazyMongo'):
+        self._mongo = mongo
+
+    def __getattr__(self, name):
+        return getattr(self._mongo.database, name)
+
+    def __getitem__(self, name):
+        return self._mongo.database[name]
+
+
+class LazyMongo:
+    """Build the Motor client from the environment the first time it is used"""
+
+    def __init__(self, url_env: str = 'MONGO_URL', db_env: str = 'DB_NAME', server_selection_timeout_ms: int = 5000):
+        self.url_env = url_env
+        self.db_env = db_env
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+        self._client: Optional[AsyncIOMotorClient] = None
+        self._database: Optional[AsyncIOMotorDatabase] = None
+        self.db = _LazyDatabase(self)
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                os.environ[self.url_env],
+                serverSelectionTimeoutMS=self.server_selection_timeout_ms
+            )
+        return self._client
+
+    @property
+    def database(self) -> AsyncIOMotorDatabase:
+        if self._database is None:
+            self._database = self.client[os.environ[self.db_env]]
+        return self._database
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._database = None
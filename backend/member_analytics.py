@@ -0,0 +1,151 @@
+"""Pre-aggregated member join/leave counts per guild.
+
+Member events only increment an in-memory counter for the current minute, so
+the gateway handlers never write to the database. ``flush`` periodically
+swaps the counters out and rolls them up into minute, hour and day buckets,
+written to ``member_analytics`` as one unordered bulk of ``$inc`` upserts
+(one operation per guild and bucket, however many events it covers):
+
+    {guild_id, granularity: "minute"|"hour"|"day", bucket: datetime,
+     joins, leaves, expires_at}
+
+Minute and hour buckets carry an ``expires_at`` for the TTL index; day buckets
+are kept. If some operations of a bulk fail, only their bucket totals are kept
+for the next flush, so the upserts that did land are not counted twice. Reads
+serve the stored buckets plus whatever is still waiting to be flushed, so
+dashboards never scan raw events.
+"""
+import calendar
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+GRANULARITIES = {
+    # granularity: (bucket seconds, retention seconds or None to keep)
+    'minute': (60, 2 * 86400),
+    'hour': (3600, 90 * 86400),
+    'day': (86400, None),
+}
+
+FIELD_JOINS = 0
+FIELD_LEAVES = 1
+
+
+def bucket_start(timestamp: float, granularity: str) -> datetime:
+    """UTC start of the bucket containing a unix timestamp"""
+    seconds = GRANULARITIES[granularity][0]
+    return datetime.utcfromtimestamp(int(timestamp) // seconds * seconds)
+
+
+class MemberAnalytics:
+    """Count joins and leaves per guild and minute, flushing rolled-up buckets in bulk"""
+
+    def __init__(self, collection: str = 'member_analytics', flush_interval: float = 30.0, max_points: int = 1500):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.max_points = max_points
+        # (guild_id, minute timestamp) -> [joins, leaves]
+        self._pending: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+        # (guild_id, granularity, bucket) -> [joins, leaves] of operations that failed to write
+        self._retry: Dict[tuple, List[int]] = {}
+        self.flushed_operations = 0
+
+    def record_join(self, guild_id: int, timestamp: Optional[float] = None):
+        self._record(guild_id, FIELD_JOINS, timestamp)
+
+    def record_leave(self, guild_id: int, timestamp: Optional[float] = None):
+        self._record(guild_id, FIELD_LEAVES, timestamp)
+
+    def _record(self, guild_id: int, field: int, timestamp: Optional[float]):
+        minute = int(time.time() if timestamp is None else timestamp) // 60 * 60
+        self._pending[(guild_id, minute)][field] += 1
+
+    @staticmethod
+    def _roll_up(pending: Dict[tuple, List[int]]) -> Dict[tuple, List[int]]:
+        """Merge minute counters into (guild_id, granularity, bucket) totals"""
+        totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+        for (guild_id, minute), (joins, leaves) in pending.items():
+            for granularity in GRANULARITIES:
+                counts = totals[(str(guild_id), granularity, bucket_start(minute, granularity))]
+                counts[FIELD_JOINS] += joins
+                counts[FIELD_LEAVES] += leaves
+        return totals
+
+    async def flush(self, db) -> int:
+        """Write pending counters as $inc upserts; returns the number of bucket operations"""
+        if not self._pending and not self._retry:
+            return 0
+        pending, self._pending = self._pending, defaultdict(lambda: [0, 0])
+        totals = self._roll_up(pending)
+        for key, (joins, leaves) in self._retry.items():
+            counts = totals[key]
+            counts[FIELD_JOINS] += joins
+            counts[FIELD_LEAVES] += leaves
+        self._retry = {}
+
+        keys = list(totals)
+        operations = []
+        for guild_id, granularity, bucket in keys:
+            joins, leaves = totals[(guild_id, granularity, bucket)]
+            retention = GRANULARITIES[granularity][1]
+            update = {"$inc": {"joins": joins, "leaves": leaves}}
+            if retention:
+                update["$setOnInsert"] = {"expires_at": bucket + timedelta(seconds=retention)}
+            operations.append(UpdateOne(
+                {"guild_id": guild_id, "granularity": granularity, "bucket": bucket},
+                update,
+                upsert=True
+            ))
+        try:
+            await db[self.collection].bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # The bulk is unordered: every operation not listed as failed was applied
+            failed = {error['index'] for error in e.details.get('writeErrors', [])}
+            self._retry = {keys[index]: totals[keys[index]] for index in failed}
+            self.flushed_operations += len(operations) - len(failed)
+            raise
+        except Exception:
+            # Nothing is known to have been written; keep all counts for the next flush
+            self._retry = dict(totals)
+            raise
+        self.flushed_operations += len(operations)
+        return len(operations)
+
+    async def series(self, db, guild_id: str, granularity: str, start: datetime, end: datetime) -> List[Dict]:
+        """Buckets of a guild between start and end (inclusive, naive UTC), oldest first, zero-filled"""
+        seconds = GRANULARITIES[granularity][0]
+        start = bucket_start(calendar.timegm(start.utctimetuple()), granularity)
+        if (end - start).total_seconds() / seconds >= self.max_points:
+            raise ValueError(f"Range covers more than {self.max_points} {granularity} buckets")
+        stored = await db[self.collection].find(
+            {"guild_id": guild_id, "granularity": granularity, "bucket": {"$gte": start, "$lte": end}},
+            {"_id": 0, "bucket": 1, "joins": 1, "leaves": 1}
+        ).to_list(None)
+        counts = {doc['bucket']: [doc.get('joins', 0), doc.get('leaves', 0)] for doc in stored}
+
+        # Counts not flushed yet
+        for (pending_guild, minute), (joins, leaves) in self._pending.items():
+            if str(pending_guild) != guild_id:
+                continue
+            bucket = bucket_start(minute, granularity)
+            if start <= bucket <= end:
+                entry = counts.setdefault(bucket, [0, 0])
+                entry[FIELD_JOINS] += joins
+                entry[FIELD_LEAVES] += leaves
+        for (retry_guild, retry_granularity, bucket), (joins, leaves) in self._retry.items():
+            if retry_guild == guild_id and retry_granularity == granularity and start <= bucket <= end:
+                entry = counts.setdefault(bucket, [0, 0])
+                entry[FIELD_JOINS] += joins
+                entry[FIELD_LEAVES] += leaves
+
+        points = []
+        bucket = start
+        while bucket <= end:
+            joins, leaves = counts.get(bucket, (0, 0))
+            points.append({"bucket": bucket, "joins": joins, "leaves": leaves, "net": joins - leaves})
+            bucket += timedelta(seconds=seconds)
+        return points
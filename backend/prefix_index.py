@@ -0,0 +1,178 @@
+"""In-memory prefix index for slash command autocomplete.
+
+Names are kept in a sorted list of casefolded keys, so a prefix lookup is one
+``bisect`` plus a slice of at most ``limit`` entries. Discord sends an
+autocomplete request on every keystroke; answering from memory keeps each one
+in microseconds and off the database.
+
+``fuzzy_search`` tops up prefix matches with names where any word starts with
+the query and then with names containing the query's characters in order, so
+"mod" finds "🛡️ Moderator" and "adm" finds "Server Admin".
+
+``KeyedPrefixIndex`` holds ``(id, name)`` entries instead of bare names, so
+entries whose names differ only in case (or are identical) stay separate and a
+search result carries the id to look the entry up by.
+"""
+from bisect import bisect_left, insort
+from difflib import get_close_matches
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class PrefixIndex:
+    """Sorted, case-insensitive set of names supporting prefix search"""
+
+    __slots__ = ('_keys', '_names', '_counts')
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._keys: List[str] = []
+        self._names: Dict[str, str] = {}
+        self._counts: Dict[str, int] = {}
+        self.replace(names)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return name.casefold().strip()
+
+    def replace(self, names: Iterable[str]):
+        """Rebuild the index from scratch"""
+        self._names.clear()
+        self._counts.clear()
+        for name in names:
+            if not name:
+                continue
+            key = self._key(name)
+            self._names.setdefault(key, name)
+            self._counts[key] = self._counts.get(key, 0) + 1
+        self._keys = sorted(self._counts)
+
+    def add(self, name: str):
+        if not name:
+            return
+        key = self._key(name)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if not count:
+            self._names[key] = name
+            insort(self._keys, key)
+
+    def remove(self, name: str):
+        if not name:
+            return
+        key = self._key(name)
+        count = self._counts.get(key, 0)
+        if count > 1:
+            self._counts[key] = count - 1
+        elif count == 1:
+            del self._counts[key]
+            del self._names[key]
+            index = bisect_left(self._keys, key)
+            del self._keys[index]
+
+    def rename(self, old: str, new: str):
+        if old != new:
+            self.remove(old)
+            self.add(new)
+
+    def search(self, prefix: str, limit: int = 25) -> List[str]:
+        """Return up to ``limit`` names starting with ``prefix``, in sorted order"""
+        key = self._key(prefix)
+        keys = self._keys
+        start = bisect_left(keys, key)
+        results = []
+        for index in range(start, min(start + limit, len(keys))):
+            if not keys[index].startswith(key):
+                break
+            results.append(self._names[keys[index]])
+        return results
+
+    def fuzzy_search(self, query: str, limit: int = 25, exclude: Iterable[str] = ()) -> List[str]:
+        """Prefix matches first, then word-prefix matches, then in-order character matches"""
+        excluded = {self._key(name) for name in exclude}
+        key = self._key(query)
+        results = [name for name in self.search(query, limit + len(excluded)) if self._key(name) not in excluded]
+        if len(results) >= limit or not key:
+            return results[:limit]
+
+        seen = excluded | {self._key(name) for name in results}
+        word_matches = []
+        subsequence_matches = []
+        for candidate in self._keys:
+            if candidate in seen:
+                continue
+            if any(word.startswith(key) for word in candidate.split()):
+                word_matches.append(self._names[candidate])
+            elif _is_subsequence(key, candidate):
+                subsequence_matches.append(self._names[candidate])
+        return (results + word_matches + subsequence_matches)[:limit]
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Return the indexed spelling of ``name`` (case-insensitive), or None"""
+        return self._names.get(self._key(name))
+
+    def suggest(self, name: str, count: int = 3) -> List[str]:
+        """Closest indexed names for a name that did not resolve"""
+        matches = get_close_matches(self._key(name), self._keys, n=count, cutoff=0.5)
+        return [self._names[key] for key in matches]
+
+    def __contains__(self, name: str) -> bool:
+        return self._key(name) in self._counts
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class KeyedPrefixIndex:
+    """Sorted, case-insensitive ``(id, name)`` entries supporting prefix search"""
+
+    __slots__ = ('_entries', '_names')
+
+    def __init__(self, entries: Iterable[Tuple[str, str]] = ()):
+        self._entries: List[Tuple[str, str]] = []
+        self._names: Dict[str, str] = {}
+        self.replace(entries)
+
+    def replace(self, entries: Iterable[Tuple[str, str]]):
+        """Rebuild the index from scratch"""
+        self._names = {ident: name for ident, name in entries if ident and name}
+        self._entries = sorted((PrefixIndex._key(name), ident) for ident, name in self._names.items())
+
+    def set(self, ident: str, name: str):
+        """Add an entry or change the name of an existing one"""
+        self.remove(ident)
+        if ident and name:
+            self._names[ident] = name
+            insort(self._entries, (PrefixIndex._key(name), ident))
+
+    def remove(self, ident: str):
+        name = self._names.pop(ident, None)
+        if name is not None:
+            index = bisect_left(self._entries, (PrefixIndex._key(name), ident))
+            del self._entries[index]
+
+    def search(self, prefix: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Return up to ``limit`` ``(id, name)`` entries whose name starts with ``prefix``"""
+        key = PrefixIndex._key(prefix)
+        entries = self._entries
+        start = bisect_left(entries, (key,))
+        results = []
+        for index in range(start, min(start + limit, len(entries))):
+            entry_key, ident = entries[index]
+            if not entry_key.startswith(key):
+                break
+            results.append((ident, self._names[ident]))
+        return results
+
+    def __contains__(self, ident: str) -> bool:
+        return ident in self._names
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _is_subsequence(needle: str, haystack: str) -> bool:
+    position = 0
+    for ch in needle:
+        position = haystack.find(ch, position) + 1
+        if not position:
+            return False
+    return True
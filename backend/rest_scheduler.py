@@ -0,0 +1,238 @@
+"""Priority scheduler for the bot's outbound Discord REST calls.
+
+Every call made through ``bot.http`` passes through one scheduler that hands
+out a limited number of in-flight slots and a global request budget, always
+serving the most urgent priority class first:
+
+    INTERACTION   work done while answering a slash command
+    MEMBER_EVENT  welcome messages, auto-roles, automod actions (the default)
+    BULK          server setup from a template, deferred raid roles
+    MAINTENANCE   background jobs that can wait
+
+The priority is taken from a context variable, so code only has to wrap a
+block in ``with request_priority(Priority.BULK):`` and every request issued
+inside it (including from tasks it creates) is classified.
+
+The scheduler reads discord.py's own per-bucket rate-limit state: a request
+whose bucket is exhausted stays queued until the bucket resets, and other
+buckets keep flowing instead of a slot being held by a request that would only
+sleep inside discord.py. Interaction callbacks and followups are sent by
+discord.py through the interaction webhook adapter, not ``bot.http``, so they
+never wait behind this queue.
+"""
+import asyncio
+import contextvars
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Dict, Optional
+
+
+class Priority(IntEnum):
+    INTERACTION = 0
+    MEMBER_EVENT = 1
+    BULK = 2
+    MAINTENANCE = 3
+
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar('rest_priority', default=Priority.MEMBER_EVENT)
+
+
+def set_request_priority(priority: Priority):
+    """Classify every REST call made for the rest of the current task"""
+    _current_priority.set(priority)
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    """Classify every REST call made inside the block"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _Waiter:
+    __slots__ = ('future', 'route', 'enqueued')
+
+    def __init__(self, future: asyncio.Future, route):
+        self.future = future
+        self.route = route
+        self.enqueued = time.monotonic()
+
+
+class RestScheduler:
+    """Gate ``HTTPClient.request`` behind priority queues, a concurrency cap and a global budget"""
+
+    def __init__(self, max_concurrency: int = 10, global_rate: float = 45.0, scan_depth: int = 32):
+        self.max_concurrency = max_concurrency
+        self.global_rate = global_rate
+        self.scan_depth = scan_depth
+        self._queues = [deque() for _ in Priority]
+        self._in_flight = 0
+        self._tokens = global_rate
+        self._refilled = time.monotonic()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._http = None
+        self._granted = [0] * len(Priority)
+        self._wait_total = [0.0] * len(Priority)
+        self._wait_max = [0.0] * len(Priority)
+        self._deferred_by_bucket = 0
+
+    def install(self, http):
+        """Wrap an HTTPClient's request method so all calls go through the scheduler"""
+        original = http.request
+        self._http = http
+
+        async def request(route, **kwargs):
+            await self.acquire(route)
+            try:
+                return await original(route, **kwargs)
+            finally:
+                self.release()
+
+        http.request = request
+        return self
+
+    # Budget -----------------------------------------------------------------
+
+    def _refill(self, now: float):
+        if self.global_rate:
+            self._tokens = min(self.global_rate, self._tokens + (now - self._refilled) * self.global_rate)
+        self._refilled = now
+
+    def _has_budget(self) -> bool:
+        return self._in_flight < self.max_concurrency and (not self.global_rate or self._tokens >= 1)
+
+    def _bucket_delay(self, route) -> float:
+        """Seconds until discord.py's bucket for this route has a free token"""
+        http = self._http
+        buckets = getattr(http, '_buckets', None)
+        if not buckets or not hasattr(route, 'key'):
+            return 0.0
+        global_over = getattr(http, '_global_over', None)
+        if isinstance(global_over, asyncio.Event) and not global_over.is_set():
+            return 0.05
+        bucket_hash = getattr(http, '_bucket_hashes', {}).get(route.key)
+        ratelimit = buckets.get(f"{bucket_hash or route.key}:{route.major_parameters}")
+        if ratelimit is None or ratelimit.remaining > 0 or ratelimit.expires is None:
+            return 0.0
+        return max(0.0, ratelimit.expires - asyncio.get_running_loop().time())
+
+    def _grant(self, priority: int, waiter: _Waiter, now: float):
+        self._in_flight += 1
+        if self.global_rate:
+            self._tokens -= 1
+        waited = now - waiter.enqueued
+        self._granted[priority] += 1
+        self._wait_total[priority] += waited
+        if waited > self._wait_max[priority]:
+            self._wait_max[priority] = waited
+
+    # Acquire / release ------------------------------------------------------
+
+    async def acquire(self, route):
+        priority = int(_current_priority.get())
+        now = time.monotonic()
+        self._refill(now)
+
+        # Fast path: nothing more urgent (or equally urgent) is waiting
+        if (self._has_budget() and not any(self._queues[p] for p in range(priority + 1))
+                and self._bucket_delay(route) == 0.0):
+            self._grant(priority, _Waiter(None, route), now)
+            return
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), route)
+        self._queues[priority].append(waiter)
+        self._wake()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just before the caller was cancelled; give the slot back
+                self.release()
+            else:
+                try:
+                    self._queues[priority].remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def release(self):
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            if any(self._queues):
+                self._wakeup = asyncio.Event()
+                self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch_loop())
+        elif self._wakeup is not None:
+            self._wakeup.set()
+
+    # Dispatch ---------------------------------------------------------------
+
+    def _dispatch(self) -> Optional[float]:
+        """Grant as many waiters as the budget allows; return how long to wait before retrying"""
+        now = time.monotonic()
+        self._refill(now)
+        retry: Optional[float] = None
+
+        for priority, queue in enumerate(self._queues):
+            # index counts waiters skipped because their bucket is exhausted
+            index = 0
+            while index < len(queue) and index < self.scan_depth:
+                if not self._has_budget():
+                    if self.global_rate and self._tokens < 1:
+                        return (1 - self._tokens) / self.global_rate
+                    return None  # woken again by release()
+                waiter = queue[index]
+                if waiter.future.done():
+                    del queue[index]
+                    continue
+                delay = self._bucket_delay(waiter.route)
+                if delay > 0:
+                    self._deferred_by_bucket += 1
+                    retry = delay if retry is None else min(retry, delay)
+                    index += 1
+                    continue
+                del queue[index]
+                self._grant(priority, waiter, now)
+                waiter.future.set_result(None)
+        return retry
+
+    async def _dispatch_loop(self):
+        while any(self._queues):
+            self._wakeup.clear()
+            retry = self._dispatch()
+            if not any(self._queues):
+                break
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=retry)
+            except asyncio.TimeoutError:
+                pass
+
+    # Metrics ----------------------------------------------------------------
+
+    def metrics(self) -> Dict:
+        queues = {}
+        for priority in Priority:
+            granted = self._granted[priority]
+            queues[priority.name.lower()] = {
+                "depth": len(self._queues[priority]),
+                "granted": granted,
+                "avg_wait_ms": round(self._wait_total[priority] / granted * 1000, 2) if granted else 0.0,
+                "max_wait_ms": round(self._wait_max[priority] * 1000, 2)
+            }
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "global_rate": self.global_rate,
+            "global_tokens": round(self._tokens, 2),
+            "deferred_by_bucket": self._deferred_by_bucket,
+            "queues": queues
+        }
@@ -0,0 +1,110 @@
+"""Typed template entries for ServerConfig.
+
+Roles, channels and categories are slotted pydantic dataclasses: validation
+runs in pydantic's compiled core and each entry is stored without a per-
+instance ``__dict__``. Optional fields default to None, and code reading
+stored templates treats a None value the same as a missing key, so documents
+written before these models existed keep working.
+
+The entries are lenient because stored documents are read through them:
+``type`` is any string (setup creates ``SETUP_CHANNEL_TYPES`` and skips the
+rest), names are not length-checked (``check_names`` does that for request
+bodies), and keys without a field (``nsfw``, ``bitrate``, ...) are kept in
+``extra`` and written back at the top level when the entry is serialized.
+
+Both template formats are modeled:
+
+    flat         ``channels`` holds categories (``type: "category"``) and channels
+                 that point at them through ``category``
+    categories   ``categories`` holds categories with nested ``channels``;
+                 top-level ``channels`` are created without a category
+"""
+import dataclasses
+import functools
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from pydantic import Field, model_serializer, model_validator
+from pydantic.dataclasses import dataclass
+
+# Channel types setup knows how to create; other stored types are skipped
+SETUP_CHANNEL_TYPES = ('text', 'voice')
+
+# Discord limits role and channel names to 1-100 characters
+MAX_NAME_LENGTH = 100
+
+
+@functools.lru_cache(maxsize=None)
+def _field_names(cls) -> frozenset:
+    return frozenset(field.name for field in dataclasses.fields(cls))
+
+
+class _KeepsExtraKeys:
+    """Collect unknown keys into ``extra`` on input and flatten them back on output"""
+
+    __slots__ = ()
+
+    @model_validator(mode='before')
+    @classmethod
+    def _collect_extra(cls, data):
+        if isinstance(data, dict):
+            known = _field_names(cls)
+            if data.keys() <= known:
+                return data
+            unknown = {key: value for key, value in data.items() if key not in known}
+            data = {key: value for key, value in data.items() if key in known}
+            data['extra'] = {**(data.get('extra') or {}), **unknown}
+        return data
+
+    @model_serializer(mode='wrap')
+    def _flatten_extra(self, handler):
+        data = handler(self)
+        extra = data.pop('extra', None)
+        return {**data, **extra} if extra else data
+
+
+@dataclass(slots=True)
+class PermissionOverwrite:
+    allow: int = 0
+    deny: int = 0
+
+
+@dataclass(slots=True)
+class Role(_KeepsExtraKeys):
+    name: str
+    permissions: Union[int, str, None] = None  # bit value or a PERMISSION_MAPPINGS name
+    color: Union[int, str, None] = None  # integer or "#rrggbb"
+    hoist: Optional[bool] = None
+    mentionable: Optional[bool] = None
+    extra: Optional[Dict[str, Any]] = None
+
+
+@dataclass(slots=True)
+class Channel(_KeepsExtraKeys):
+    name: str
+    type: str = 'text'  # "text", "voice" or "category" (flat format); others are kept but not created
+    position: Optional[int] = None
+    category: Optional[str] = None
+    topic: Optional[str] = None
+    overwrites: Optional[Dict[str, PermissionOverwrite]] = None
+    extra: Optional[Dict[str, Any]] = None
+
+
+@dataclass(slots=True)
+class Category(_KeepsExtraKeys):
+    name: str
+    position: Optional[int] = None
+    overwrites: Optional[Dict[str, PermissionOverwrite]] = None
+    channels: List[Channel] = Field(default_factory=list)
+    extra: Optional[Dict[str, Any]] = None
+
+
+def check_names(roles: Iterable[Role], channels: Iterable[Channel], categories: Optional[Iterable[Category]]):
+    """Strip entry names and reject empty or over-long ones (request bodies only)"""
+    entries = [*roles, *channels]
+    for category in categories or []:
+        entries.append(category)
+        entries.extend(category.channels)
+    for entry in entries:
+        entry.name = entry.name.strip()
+        if not 1 <= len(entry.name) <= MAX_NAME_LENGTH:
+            raise ValueError(f"Role, channel and category names must be 1-{MAX_NAME_LENGTH} characters: {entry.name!r}")
@@ -1,38 +1,67 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 import asyncio
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, Field, StringConstraints, field_validator, model_validator
+from typing import Annotated, List, Dict, Any, Optional, Union
 import uuid
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 import json
+import hashlib
+import io
 import discord
 from discord.ext import commands
+from lazy_mongo import LazyMongo
+from event_recorder import EventRecorder, EVENT_JOIN, EVENT_LEAVE
+from member_analytics import GRANULARITIES, MemberAnalytics
+from automod import AutoModEngine
+from welcome_cards import WelcomeCardRenderer
+from webhook_delivery import WebhookDelivery
+from antiraid import AntiRaidGuard
+from prefix_index import KeyedPrefixIndex, PrefixIndex
+from guild_state import GuildState, WelcomeSettings
+from config_storage import ConfigStorage, HEAVY_FIELDS
+from config_search import TEXT_INDEX_KEYS, TEXT_INDEX_OPTIONS, highlights, query_terms, search_text
+from config_versions import CHECKPOINT_EVERY, is_checkpoint, make_patch, rebuild
+from schema import SETUP_CHANNEL_TYPES, Role, Channel, Category, check_names
+from guild_snapshot import apply_changes, capture_entities, diff_entities, entities_to_config
+from rest_scheduler import RestScheduler, Priority, request_priority, set_request_priority
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection, built from MONGO_URL/DB_NAME on first use (the warm-up ping at startup)
+mongo = LazyMongo()
+db = mongo.db
 
 # Discord bot setup
 DISCORD_TOKEN = os.environ.get('DISCORD_BOT_TOKEN')
 APPLICATION_ID = os.environ.get('DISCORD_APPLICATION_ID')
+# Optional guild for development: commands are synced there (instant) instead of globally
+DISCORD_DEV_GUILD_ID = os.environ.get('DISCORD_DEV_GUILD_ID')
 
 # Discord bot instance
 intents = discord.Intents.default()
 intents.guilds = True
 intents.guild_messages = True
+# Automod reads message content, a privileged intent that must also be enabled in the developer portal
+AUTOMOD_ENABLED = os.environ.get('AUTOMOD_ENABLED', '').lower() in ('1', 'true', 'yes')
+intents.message_content = AUTOMOD_ENABLED  # لقراءة محتوى الرسائل في الإشراف التلقائي
 intents.members = True  # للحصول على أحداث الأعضاء
 bot = commands.Bot(command_prefix='!', intents=intents)
 
+# All outbound REST calls are queued by priority: interactions, member events, bulk setup, maintenance
+rest_scheduler = RestScheduler(
+    max_concurrency=int(os.environ.get('REST_MAX_CONCURRENCY', 10)),
+    global_rate=float(os.environ.get('REST_GLOBAL_RATE', 45))
+).install(bot.http)
+
 # Global variables for bot status and active guild settings
 bot_status = {
     'running': False,
@@ -41,7 +70,42 @@ bot_status = {
 }
 
 # Store active guild configurations for welcome messages etc.
-active_guild_configs = {}
+# guild_id -> compact GuildState (found=False when the guild has no settings), filled by get_guild_config
+active_guild_configs: Dict[str, GuildState] = {}
+GUILD_CONFIG_TTL = int(os.environ.get('GUILD_CONFIG_TTL', 300))
+GUILD_CONFIG_FIELDS = {"_id": 0, "id": 1, "guild_id": 1,
+                       "welcome_settings": 1, "auto_role_settings": 1, "moderation_settings": 1}
+
+# Heavy template sections (roles/channels/categories) optionally stored compressed (CONFIG_STORAGE_MODE)
+config_storage = ConfigStorage.from_env()
+CONFIG_SUMMARY_FIELDS = {"_id": 0, **{field: 0 for field in HEAVY_FIELDS}, "_packed": 0, "search_text": 0}
+
+async def encode_config(doc: Dict) -> Dict:
+    """Stored form of a configuration: derived search text added, heavy sections packed"""
+    return await config_storage.encode(db, {**doc, "search_text": search_text(doc)})
+
+# Template names for /setup_server autocomplete, kept in sync with config create/update/delete
+config_name_index = KeyedPrefixIndex()
+config_name_index_loaded = False
+
+# Assignable role names per guild for /configure_autorole, rebuilt after role changes
+guild_role_indexes: Dict[int, PrefixIndex] = {}
+
+# Keyword/regex/spam automod, compiled per guild from moderation_settings (only with AUTOMOD_ENABLED)
+automod = AutoModEngine()
+
+# Welcome image cards rendered off the event loop (welcome_settings.card)
+welcome_cards = WelcomeCardRenderer.from_env()
+
+# Welcome/goodbye messages posted through per-channel webhooks (welcome_settings.delivery = "webhook")
+webhook_delivery = WebhookDelivery()
+
+# Optional recording of member join/leave events for offline replay (EVENT_RECORD_PATH)
+event_recorder = EventRecorder.from_env()
+
+# Join/leave counts per guild, aggregated in memory and flushed as minute/hour/day buckets
+member_analytics = MemberAnalytics(flush_interval=float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 30)))
+analytics_flush_task = None
 
 # Create the main app
 app = FastAPI(title="Discord Server Manager", version="1.0.0")
@@ -55,28 +119,80 @@ class ServerConfig(BaseModel):
     name: str
     description: str
     icon_url: Optional[str] = None
-    roles: List[Dict[str, Any]]
-    channels: List[Dict[str, Any]]
+    roles: List[Role]
+    channels: List[Channel]
+    categories: Optional[List[Category]] = None
     welcome_settings: Optional[Dict[str, Any]] = None
     auto_role_settings: Optional[Dict[str, Any]] = None
     moderation_settings: Optional[Dict[str, Any]] = None
+    version: int = 1
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
-class ServerConfigCreate(BaseModel):
+class ServerConfigContent(BaseModel):
+    """Template content as stored; also used to read stored and historical versions"""
     name: str
     description: str
     icon_url: Optional[str] = None
-    roles: List[Dict[str, Any]]
-    channels: List[Dict[str, Any]]
+    roles: List[Role]
+    channels: List[Channel]
+    categories: Optional[List[Category]] = None
     welcome_settings: Optional[Dict[str, Any]] = None
     auto_role_settings: Optional[Dict[str, Any]] = None
     moderation_settings: Optional[Dict[str, Any]] = None
 
+    @field_validator('categories')
+    @classmethod
+    def flat_format_without_categories(cls, categories):
+        """The form posts categories: [] for flat templates; store those as the flat format"""
+        return categories or None
+
+class ServerConfigCreate(ServerConfigContent):
+    """Create/update request body: entry names are checked against Discord's limits"""
+
+    @model_validator(mode='after')
+    def valid_entry_names(self):
+        check_names(self.roles, self.channels, self.categories)
+        return self
+
 class SetupRequest(BaseModel):
     guild_id: str
     config_id: str
 
+class ServerConfigSummary(BaseModel):
+    id: str
+    name: str
+    description: str
+    icon_url: Optional[str] = None
+    version: int = 1
+    guild_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class ConfigSearchResult(ServerConfigSummary):
+    score: float
+    highlights: List[Dict[str, Any]] = []
+
+class ConfigSearchResponse(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    total: int
+    results: List[ConfigSearchResult]
+
+# Discord IDs as decimal strings; batch jobs also use them as keys in update paths ("guilds.<id>.status")
+Snowflake = Annotated[str, StringConstraints(strip_whitespace=True, pattern=r'^[0-9]{1,20}$')]
+
+class BatchSetupRequest(BaseModel):
+    config_id: str
+    guild_ids: List[Snowflake]
+    max_concurrency: int = Field(default=5, ge=1, le=50)
+
+class SnapshotRequest(BaseModel):
+    incremental: bool = True
+    save_config: bool = False
+    name: Optional[str] = None
+
 class SetupStatus(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     guild_id: str
@@ -87,6 +203,139 @@ class SetupStatus(BaseModel):
     started_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
+async def get_guild_config(guild_id: str) -> Optional[GuildState]:
+    """Get a guild's runtime settings, served from memory and loaded from the database on a miss"""
+    cached = active_guild_configs.get(guild_id)
+    now = time.monotonic()
+    if cached is not None and now - cached.loaded_at < GUILD_CONFIG_TTL:
+        return cached if cached.found else None
+    
+    config = await db.server_configs.find_one({"guild_id": guild_id}, GUILD_CONFIG_FIELDS)
+    if config is None:
+        # Guilds set up by a batch job keep their settings outside the template
+        config = await db.guild_settings.find_one({"guild_id": guild_id}, GUILD_CONFIG_FIELDS)
+    state = GuildState.from_document(config, now)
+    active_guild_configs[guild_id] = state
+    return state if state.found else None
+
+def invalidate_guild_config(guild_id: Optional[str]):
+    """Drop a guild's cached settings after they change"""
+    if guild_id:
+        active_guild_configs.pop(guild_id, None)
+
+async def release_raid_lockdown(guild: discord.Guild, moderation_settings: Dict, members: List):
+    """Grant the auto-roles deferred during a raid lockdown and log the lockdown"""
+    config = await get_guild_config(str(guild.id))
+    granted = 0
+    
+    if config:
+        roles = config.auto_roles(guild)
+        if roles:
+            with request_priority(Priority.BULK):
+                for member in members:
+                    try:
+                        await member.add_roles(*roles, reason="Deferred auto-role after raid lockdown")
+                        granted += 1
+                    except Exception as e:
+                        print(f"Error granting deferred roles to {member}: {e}")
+    
+    await db.raid_lockdowns.delete_one({"guild_id": str(guild.id)})
+    await db.raid_events.insert_one({
+        "id": str(uuid.uuid4()),
+        "guild_id": str(guild.id),
+        "deferred_members": len(members),
+        "roles_granted": granted,
+        "ended_at": datetime.utcnow()
+    })
+
+async def store_raid_lockdown(guild: discord.Guild, previous: discord.VerificationLevel,
+                              raised: discord.VerificationLevel):
+    """Keep the level to restore in the database so a restart mid-lockdown can still undo it"""
+    await db.raid_lockdowns.update_one(
+        {"guild_id": str(guild.id)},
+        {"$set": {
+            "previous_verification": previous.value,
+            "raised_verification": raised.value,
+            "locked_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+
+async def recover_raid_lockdowns():
+    """Restore the verification level of guilds whose lockdown was cut short by a restart"""
+    async for record in db.raid_lockdowns.find({}, {"_id": 0}):
+        guild = bot.get_guild(int(record['guild_id']))
+        if guild is None:
+            continue  # not in this shard's cache; the record expires with the TTL index
+        restored = await anti_raid.restore_after_restart(
+            guild,
+            discord.VerificationLevel(record['previous_verification']),
+            discord.VerificationLevel(record['raised_verification'])
+        )
+        if restored:
+            await db.raid_lockdowns.delete_one({"guild_id": record['guild_id']})
+            print(f"Restored verification level in {guild.id} after an interrupted lockdown")
+
+# Join-rate raid detection; lockdowns defer auto-roles to release_raid_lockdown
+anti_raid = AntiRaidGuard(on_lift=release_raid_lockdown, on_lockdown=store_raid_lockdown)
+
+# Hash of the last command tree synced during this process, to skip the check on reconnects
+synced_command_hash = None
+
+def command_tree_hash(guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Hash the serialized slash command tree as Discord would receive it"""
+    payloads = []
+    for command in sorted(bot.tree.get_commands(guild=guild), key=lambda c: c.name):
+        try:
+            payload = command.to_dict(bot.tree)
+        except TypeError:
+            # discord.py < 2.4 takes no tree argument
+            payload = command.to_dict()
+        payloads.append(payload)
+    serialized = json.dumps(payloads, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+async def sync_command_tree():
+    """Sync slash commands only when the command tree changed since the last sync"""
+    global synced_command_hash
+    guild = discord.Object(id=int(DISCORD_DEV_GUILD_ID)) if DISCORD_DEV_GUILD_ID else None
+    if guild is not None:
+        bot.tree.copy_global_to(guild=guild)
+    
+    tree_hash = command_tree_hash(guild)
+    if tree_hash == synced_command_hash:
+        return
+    
+    meta_id = f"command_tree:{DISCORD_DEV_GUILD_ID}" if guild is not None else "command_tree:global"
+    meta = await db.bot_meta.find_one({"id": meta_id, "application_id": bot.application_id})
+    if meta and meta.get('hash') == tree_hash:
+        synced_command_hash = tree_hash
+        print("الأوامر محدثة، لا حاجة للمزامنة.")
+        return
+    
+    with request_priority(Priority.MAINTENANCE):
+        synced = await bot.tree.sync(guild=guild)
+    await db.bot_meta.update_one(
+        {"id": meta_id},
+        {"$set": {
+            "hash": tree_hash,
+            "application_id": bot.application_id,
+            "commands": len(synced),
+            "synced_at": datetime.utcnow()
+        }},
+        upsert=True
+    )
+    synced_command_hash = tree_hash
+    print(f"تم مزامنة {len(synced)} أمر.")
+
+async def send_member_message(channel, welcome_settings: WelcomeSettings, content: Optional[str] = None,
+                              embed: Optional[discord.Embed] = None, file: Optional[discord.File] = None):
+    """Send a welcome/goodbye message as the bot or through the channel's delivery webhook"""
+    if welcome_settings.delivery == 'webhook' and isinstance(channel, discord.TextChannel):
+        await webhook_delivery.send(db, channel, content=content, embed=embed, file=file)
+    else:
+        await channel.send(content=content, embed=embed, file=file)
+
 # Discord Bot Events
 @bot.event
 async def on_ready():
@@ -96,67 +345,92 @@ async def on_ready():
     bot_status['running'] = True
     bot_status['last_error'] = None
     
-    # Sync slash commands
+    # Sync slash commands (skipped when unchanged since the last sync)
     try:
-        synced = await bot.tree.sync()
-        print(f"تم مزامنة {len(synced)} أمر.")
+        await sync_command_tree()
     except Exception as e:
         print(f"فشل في مزامنة الأوامر: {e}")
+    
+    # Continue auto-role jobs interrupted by a restart
+    try:
+        await resume_autorole_jobs()
+    except Exception as e:
+        print(f"Failed to resume auto-role jobs: {e}")
+    
+    # Undo raid lockdowns interrupted by a restart
+    try:
+        await recover_raid_lockdowns()
+    except Exception as e:
+        print(f"Failed to recover raid lockdowns: {e}")
 
 @bot.event
 async def on_member_join(member):
     """Handle new member joining the server"""
+    if event_recorder:
+        event_recorder.record_member(EVENT_JOIN, member)
+    member_analytics.record_join(member.guild.id)
+    
     try:
         guild_id = str(member.guild.id)
         
-        # Get guild configuration from database
-        config = await db.server_configs.find_one({"guild_id": guild_id})
+        # Get guild configuration (cached, no database query per join)
+        config = await get_guild_config(guild_id)
         if not config:
             return
         
-        welcome_settings = config.get('welcome_settings', {})
-        if not welcome_settings.get('enabled', False):
+        # During a raid lockdown skip individual welcomes and defer auto-roles
+        if anti_raid.observe(member, config.moderation or {}):
+            return
+        
+        welcome_settings = config.welcome
+        if not welcome_settings or not welcome_settings.enabled:
             return
         
         # Send welcome message
-        welcome_channel_name = welcome_settings.get('channel', 'الترحيب')
-        welcome_channel = discord.utils.get(member.guild.channels, name=welcome_channel_name)
+        welcome_channel = discord.utils.get(member.guild.channels, name=welcome_settings.channel)
         
         if welcome_channel:
             # Create welcome message
-            welcome_message = welcome_settings.get('message', 'مرحباً {user} في {server}! 🎉')
-            welcome_message = welcome_message.format(
+            welcome_message = welcome_settings.message.format(
                 user=member.mention,
                 server=member.guild.name,
                 username=member.display_name
             )
             
             # Create embed if specified
-            if welcome_settings.get('use_embed', True):
+            if welcome_settings.use_embed:
                 embed = discord.Embed(
-                    title=welcome_settings.get('title', 'مرحباً بك! 🎉'),
+                    title=welcome_settings.title,
                     description=welcome_message,
-                    color=discord.Color(int(welcome_settings.get('color', '#00ff00').replace('#', ''), 16))
+                    color=discord.Color(welcome_settings.color)
                 )
                 
-                if welcome_settings.get('thumbnail'):
+                if welcome_settings.thumbnail:
                     embed.set_thumbnail(url=member.display_avatar.url)
                 
-                if welcome_settings.get('footer'):
-                    embed.set_footer(text=welcome_settings['footer'])
-                    
-                await welcome_channel.send(embed=embed)
+                if welcome_settings.footer:
+                    embed.set_footer(text=welcome_settings.footer)
+                
+                # Without a card (disabled, Pillow missing or renderer busy) the plain embed is sent
+                card = await welcome_cards.render(member, welcome_settings) if welcome_settings.card else None
+                if card:
+                    embed.set_image(url="attachment://welcome.png")
+                    await send_member_message(welcome_channel, welcome_settings, embed=embed,
+                                              file=discord.File(io.BytesIO(card), filename="welcome.png"))
+                else:
+                    await send_member_message(welcome_channel, welcome_settings, embed=embed)
             else:
-                await welcome_channel.send(welcome_message)
-        
-        # Auto-assign roles
-        auto_role_settings = config.get('auto_role_settings', {})
-        if auto_role_settings.get('enabled', False):
-            role_names = auto_role_settings.get('roles', [])
-            for role_name in role_names:
-                role = discord.utils.get(member.guild.roles, name=role_name)
-                if role:
-                    await member.add_roles(role)
+                card = await welcome_cards.render(member, welcome_settings) if welcome_settings.card else None
+                if card:
+                    await send_member_message(welcome_channel, welcome_settings, welcome_message,
+                                              file=discord.File(io.BytesIO(card), filename="welcome.png"))
+                else:
+                    await send_member_message(welcome_channel, welcome_settings, welcome_message)
+        
+        # Auto-assign roles (names resolved to IDs once per guild)
+        roles = config.auto_roles(member.guild)
+        if roles:
+            await member.add_roles(*roles)
                     
     except Exception as e:
         print(f"Error handling member join: {e}")
@@ -164,66 +438,130 @@ async def on_member_join(member):
 @bot.event
 async def on_member_remove(member):
     """Handle member leaving the server"""
+    if event_recorder:
+        event_recorder.record_member(EVENT_LEAVE, member)
+    member_analytics.record_leave(member.guild.id)
+    
     try:
         guild_id = str(member.guild.id)
         
-        # Get guild configuration from database
-        config = await db.server_configs.find_one({"guild_id": guild_id})
-        if not config:
+        # Get guild configuration (cached); no goodbyes during a raid lockdown
+        config = await get_guild_config(guild_id)
+        if not config or anti_raid.is_locked(member.guild.id):
             return
             
-        welcome_settings = config.get('welcome_settings', {})
-        if not welcome_settings.get('goodbye_enabled', False):
+        welcome_settings = config.welcome
+        if not welcome_settings or not welcome_settings.goodbye_enabled:
             return
         
         # Send goodbye message
-        goodbye_channel_name = welcome_settings.get('goodbye_channel', 'الترحيب')
-        goodbye_channel = discord.utils.get(member.guild.channels, name=goodbye_channel_name)
+        goodbye_channel = discord.utils.get(member.guild.channels, name=welcome_settings.goodbye_channel)
         
         if goodbye_channel:
-            goodbye_message = welcome_settings.get('goodbye_message', 'وداعاً {username}! 👋')
-            goodbye_message = goodbye_message.format(
+            goodbye_message = welcome_settings.goodbye_message.format(
                 username=member.display_name,
                 server=member.guild.name
             )
             
-            if welcome_settings.get('use_embed', True):
+            if welcome_settings.use_embed:
                 embed = discord.Embed(
                     title='وداعاً! 👋',
                     description=goodbye_message,
                     color=discord.Color.red()
                 )
-                await goodbye_channel.send(embed=embed)
+                await send_member_message(goodbye_channel, welcome_settings, embed=embed)
             else:
-                await goodbye_channel.send(goodbye_message)
+                await send_member_message(goodbye_channel, welcome_settings, goodbye_message)
                 
     except Exception as e:
         print(f"Error handling member remove: {e}")
 
+@bot.event
+async def on_message(message):
+    """Run automod on guild messages"""
+    if AUTOMOD_ENABLED and message.guild and not message.author.bot:
+        try:
+            config = await get_guild_config(str(message.guild.id))
+            if config and config.moderation:
+                automod.process(message, config.moderation)
+        except Exception as e:
+            print(f"Error running automod: {e}")
+    
+    await bot.process_commands(message)
+
 @bot.event
 async def on_disconnect():
     global bot_status
     bot_status['connected'] = False
     print("تم قطع الاتصال مع Discord.")
 
+async def load_config_name_index():
+    """Fill the config name index from the database"""
+    global config_name_index_loaded
+    entries = [(doc.get('id'), doc.get('name'))
+               async for doc in db.server_configs.find({}, {"_id": 0, "id": 1, "name": 1})]
+    config_name_index.replace(entries)
+    config_name_index_loaded = True
+
+def get_role_index(guild: discord.Guild) -> PrefixIndex:
+    """Index of a guild's assignable role names, built from the gateway cache"""
+    index = guild_role_indexes.get(guild.id)
+    if index is None:
+        index = PrefixIndex(role.name for role in guild.roles if not role.is_default() and not role.managed)
+        guild_role_indexes[guild.id] = index
+    return index
+
+def forget_role_lookups(guild: discord.Guild):
+    """Drop role name lookups built from a guild's roles after they change"""
+    guild_role_indexes.pop(guild.id, None)
+    state = active_guild_configs.get(str(guild.id))
+    if state is not None:
+        state.auto_role_ids = None
+
+@bot.event
+async def on_guild_role_create(role):
+    forget_role_lookups(role.guild)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name or before.managed != after.managed:
+        forget_role_lookups(after.guild)
+
+@bot.event
+async def on_guild_role_delete(role):
+    forget_role_lookups(role.guild)
+
 # Discord slash commands
+async def classify_interaction(interaction: discord.Interaction) -> bool:
+    """Run REST calls made while handling a slash command at interaction priority"""
+    set_request_priority(Priority.INTERACTION)
+    return True
+
+bot.tree.interaction_check = classify_interaction
+
 @bot.tree.command(name="setup_server", description="إعداد السيرفر باستخدام ملف JSON")
 async def setup_server_command(interaction: discord.Interaction, config_name: str):
     """Command to setup server using saved configuration"""
     await interaction.response.defer()
     
     try:
-        # Find configuration by name
-        config_doc = await db.server_configs.find_one({"name": config_name})
+        # Autocomplete choices carry the configuration ID; a typed value is looked up by name
+        stored = await db.server_configs.find_one({"id": config_name})
+        if stored is None:
+            stored = await db.server_configs.find_one({"name": config_name})
+        config_doc = await config_storage.decode(db, stored)
         if not config_doc:
             await interaction.followup.send(f"❌ لم يتم العثور على إعداد بالاسم: {config_name}")
             return
+        config_name = config_doc.get('name', config_name)
         
         # Store guild ID in config for future use
         await db.server_configs.update_one(
-            {"name": config_name},
+            {"id": config_doc['id']},
             {"$set": {"guild_id": str(interaction.guild.id)}}
         )
+        invalidate_guild_config(config_doc.get('guild_id'))
+        invalidate_guild_config(str(interaction.guild.id))
         
         # Create setup status
         setup_status = SetupStatus(
@@ -233,7 +571,7 @@ async def setup_server_command(interaction: discord.Interaction, config_name: st
             message="بدء إعداد السيرفر..."
         )
         
-        await db.setup_status.insert_one(setup_status.dict())
+        await insert_setup_status(setup_status)
         
         await interaction.followup.send(f"🚀 بدء إعداد السيرفر باستخدام: {config_name}")
         
@@ -265,6 +603,29 @@ async def setup_server_command(interaction: discord.Interaction, config_name: st
     except Exception as e:
         await interaction.followup.send(f"❌ خطأ: {str(e)}")
 
+@setup_server_command.autocomplete('config_name')
+async def config_name_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest saved configuration names from the in-memory index"""
+    if not config_name_index_loaded:
+        await load_config_name_index()
+    return [discord.app_commands.Choice(name=name[:100], value=config_id)
+            for config_id, name in config_name_index.search(current)]
+
+async def save_guild_settings(guild_id: str, field: str, settings: Dict):
+    """Set one settings field on the configuration bound to a guild, as a new version"""
+    current = await db.server_configs.find_one({"guild_id": guild_id})
+    if current is None or 'id' not in current:
+        await db.server_configs.update_one(
+            {"guild_id": guild_id},
+            {"$set": {field: settings}},
+            upsert=True
+        )
+    else:
+        content = ServerConfigContent(**await config_storage.decode(db, current)).dict()
+        content[field] = settings
+        await save_config_version(current, content)
+    invalidate_guild_config(guild_id)
+
 @bot.tree.command(name="configure_welcome", description="إعداد رسائل الترحيب للسيرفر")
 async def configure_welcome(interaction: discord.Interaction, 
                           channel_name: str = "الترحيب",
@@ -285,11 +646,7 @@ async def configure_welcome(interaction: discord.Interaction,
             "footer": f"مرحباً بك في {interaction.guild.name}"
         }
         
-        await db.server_configs.update_one(
-            {"guild_id": guild_id},
-            {"$set": {"welcome_settings": welcome_settings}},
-            upsert=True
-        )
+        await save_guild_settings(guild_id, "welcome_settings", welcome_settings)
         
         embed = discord.Embed(
             title="✅ تم إعداد رسائل الترحيب!",
@@ -307,14 +664,31 @@ async def configure_autorole(interaction: discord.Interaction, roles: str):
     """Configure automatic role assignment"""
     try:
         guild_id = str(interaction.guild.id)
-        role_list = [role.strip() for role in roles.split(',')]
+        role_list = [role.strip() for role in roles.split(',') if role.strip()]
         
         # Validate roles exist
+        role_index = get_role_index(interaction.guild)
         valid_roles = []
+        invalid_roles = []
         for role_name in role_list:
-            role = discord.utils.get(interaction.guild.roles, name=role_name)
-            if role:
-                valid_roles.append(role_name)
+            resolved = role_index.resolve(role_name)
+            if resolved:
+                if resolved not in valid_roles:
+                    valid_roles.append(resolved)
+            else:
+                invalid_roles.append(role_name)
+        
+        if invalid_roles:
+            lines = []
+            for role_name in invalid_roles:
+                suggestions = role_index.suggest(role_name)
+                hint = f" (هل تقصد: {', '.join(suggestions)}؟)" if suggestions else ""
+                lines.append(f"• {role_name}{hint}")
+            await interaction.response.send_message(
+                "❌ لم يتم العثور على الأدوار التالية:\n" + "\n".join(lines),
+                ephemeral=True
+            )
+            return
         
         if not valid_roles:
             await interaction.response.send_message("❌ لم يتم العثور على أي من الأدوار المحددة.")
@@ -325,11 +699,7 @@ async def configure_autorole(interaction: discord.Interaction, roles: str):
             "roles": valid_roles
         }
         
-        await db.server_configs.update_one(
-            {"guild_id": guild_id},
-            {"$set": {"auto_role_settings": auto_role_settings}},
-            upsert=True
-        )
+        await save_guild_settings(guild_id, "auto_role_settings", auto_role_settings)
         
         embed = discord.Embed(
             title="✅ تم إعداد توزيع الأدوار التلقائي!",
@@ -342,6 +712,43 @@ async def configure_autorole(interaction: discord.Interaction, roles: str):
     except Exception as e:
         await interaction.response.send_message(f"❌ خطأ: {str(e)}")
 
+@configure_autorole.autocomplete('roles')
+async def autorole_roles_autocomplete(interaction: discord.Interaction, current: str):
+    """Suggest guild roles for the last entry of the comma-separated list"""
+    *chosen, partial = current.split(',')
+    chosen = [name.strip() for name in chosen if name.strip()]
+    prefix = ', '.join(chosen + ['']) if chosen else ''
+    choices = []
+    for name in get_role_index(interaction.guild).fuzzy_search(partial, exclude=chosen):
+        value = prefix + name
+        if len(value) <= 100:
+            choices.append(discord.app_commands.Choice(name=value, value=value))
+    return choices
+
+@bot.tree.command(name="apply_autorole_all", description="منح الأدوار التلقائية لجميع الأعضاء الحاليين")
+async def apply_autorole_all(interaction: discord.Interaction):
+    """Grant the configured auto-roles to members who joined before they were set up"""
+    try:
+        if not interaction.user.guild_permissions.manage_roles:
+            await interaction.response.send_message("❌ تحتاج صلاحية إدارة الأدوار لاستخدام هذا الأمر.", ephemeral=True)
+            return
+        
+        try:
+            job = await start_autorole_job(interaction.guild)
+        except ValueError as e:
+            await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+            return
+        
+        embed = discord.Embed(
+            title="⏳ جاري توزيع الأدوار على الأعضاء الحاليين",
+            description=f"عدد الأعضاء: {job['total']}\nمعرف الحالة: `{job['status_id']}`",
+            color=discord.Color.blue()
+        )
+        await interaction.response.send_message(embed=embed)
+        
+    except Exception as e:
+        await interaction.response.send_message(f"❌ خطأ: {str(e)}")
+
 @bot.tree.command(name="test_welcome", description="اختبار رسالة الترحيب")
 async def test_welcome(interaction: discord.Interaction):
     """Test welcome message"""
@@ -350,31 +757,41 @@ async def test_welcome(interaction: discord.Interaction):
         member = interaction.user
         
         guild_id = str(interaction.guild.id)
-        config = await db.server_configs.find_one({"guild_id": guild_id})
+        config = await get_guild_config(guild_id)
         
-        if not config or not config.get('welcome_settings', {}).get('enabled'):
+        if not config or not config.welcome or not config.welcome.enabled:
             await interaction.response.send_message("❌ رسائل الترحيب غير مفعلة في هذا السيرفر.")
             return
         
-        welcome_settings = config['welcome_settings']
-        welcome_message = welcome_settings.get('message', 'مرحباً {user} في {server}! 🎉')
-        welcome_message = welcome_message.format(
+        welcome_settings = config.welcome
+        welcome_message = welcome_settings.message.format(
             user=member.mention,
             server=interaction.guild.name,
             username=member.display_name
         )
         
         embed = discord.Embed(
-            title=welcome_settings.get('title', 'مرحباً بك! 🎉'),
+            title=welcome_settings.title,
             description=welcome_message + "\n\n**(هذه رسالة اختبار)**",
-            color=discord.Color(int(welcome_settings.get('color', '#00ff00').replace('#', ''), 16))
+            color=discord.Color(welcome_settings.color)
         )
         
-        if welcome_settings.get('thumbnail'):
+        if welcome_settings.thumbnail:
             embed.set_thumbnail(url=member.display_avatar.url)
         
         embed.set_footer(text="اختبار رسالة الترحيب")
         
+        if welcome_settings.card:
+            # Rendering can take longer than the initial response window
+            await interaction.response.defer()
+            card = await welcome_cards.render(member, welcome_settings)
+            if card:
+                embed.set_image(url="attachment://welcome.png")
+                await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(card), filename="welcome.png"))
+            else:
+                await interaction.followup.send(embed=embed)
+            return
+        
         await interaction.response.send_message(embed=embed)
         
     except Exception as e:
@@ -409,17 +826,26 @@ async def setup_discord_server(guild: discord.Guild, config: Dict, status_id: st
         # Update status
         await update_setup_status(status_id, "running", 10, "إنشاء الأدوار...")
         
-        # Create roles
-        role_mapping = await create_roles(guild, config.get('roles', []))
-        
-        # Update status
-        await update_setup_status(status_id, "running", 50, "إنشاء القنوات والتصنيفات...")
+        # Resolve the template once (batch setups pass an already compiled one)
+        template = config if '_compiled_roles' in config else compile_setup_template(config)
         
-        # Create categories and channels (supports both formats)
-        await create_channels_and_categories(guild, config, role_mapping)
+        # Bulk creation yields to interactions and member events
+        with request_priority(Priority.BULK):
+            # Create roles
+            role_mapping = await create_roles(guild, template['_compiled_roles'])
+            
+            # Update status
+            await update_setup_status(status_id, "running", 50, "إنشاء القنوات والتصنيفات...")
+            
+            # Create categories and channels (supports both formats)
+            order_mismatches = await create_channels_and_categories(guild, template, role_mapping)
         
         # Update status
-        await update_setup_status(status_id, "completed", 100, "تم إعداد السيرفر بنجاح!")
+        if order_mismatches:
+            await update_setup_status(status_id, "completed", 100,
+                                      f"تم إعداد السيرفر، لكن ترتيب بعض القنوات يختلف عن القالب: {', '.join(order_mismatches)}")
+        else:
+            await update_setup_status(status_id, "completed", 100, "تم إعداد السيرفر بنجاح!")
         
         return True
         
@@ -428,193 +854,307 @@ async def setup_discord_server(guild: discord.Guild, config: Dict, status_id: st
         print(f"Server setup error: {e}")
         return False
 
-async def create_roles(guild: discord.Guild, roles_config: List[Dict]):
-    """Create roles based on configuration - supports both detailed and simplified formats"""
-    role_mapping = {}
+# Permission mappings for string-based permissions
+PERMISSION_MAPPINGS = {
+    'administrator': 8,
+    'manage_guild': 32,
+    'manage_roles': 268435456,
+    'manage_channels': 16,
+    'kick_members': 2,
+    'ban_members': 4,
+    'manage_messages': 8192,
+    'moderate_members': 1099511627776,
+    'view_channels': 1024,
+    'send_messages': 2048,
+    'read_message_history': 65536,
+    'connect': 1048576,
+    'speak': 2097152
+}
+
+def compile_role(role_config: Dict) -> Dict:
+    """Resolve a role entry (detailed or simplified format) into create_role arguments"""
+    # Handle permissions (both numeric and string formats)
+    permissions_value = 0
+    # Stored templates use None for unset fields
+    if role_config.get('permissions') is not None:
+        if isinstance(role_config['permissions'], str):
+            # String-based permission (e.g., "administrator")
+            permissions_value = PERMISSION_MAPPINGS.get(role_config['permissions'], 0)
+        elif isinstance(role_config['permissions'], int):
+            # Numeric permission
+            permissions_value = role_config['permissions']
+    else:
+        # Default permissions based on role name patterns
+        role_name_lower = role_config['name'].lower()
+        if 'مشرف' in role_name_lower or 'admin' in role_name_lower:
+            permissions_value = 8  # Administrator
+        elif 'مدرس' in role_name_lower or 'mod' in role_name_lower:
+            permissions_value = 805306368  # Moderate permissions
+        elif 'مناقش' in role_name_lower:
+            permissions_value = 104188992  # Discussion permissions
+        elif 'عضو' in role_name_lower:
+            permissions_value = 104324161  # Member permissions
+        elif 'زائر' in role_name_lower or 'guest' in role_name_lower:
+            permissions_value = 104324049  # Guest permissions
+        elif 'بوت' in role_name_lower or 'bot' in role_name_lower:
+            permissions_value = 104324161  # Bot permissions
+    
+    # Handle color
+    color = discord.Color.default()
+    if role_config.get('color') is not None:
+        try:
+            color_value = role_config['color']
+            if isinstance(color_value, str):
+                color = discord.Color(int(color_value.replace('#', ''), 16))
+            else:
+                color = discord.Color(color_value)
+        except:
+            # Default colors based on role type
+            role_name_lower = role_config['name'].lower()
+            if 'مشرف' in role_name_lower:
+                color = discord.Color.red()
+            elif 'مدرس' in role_name_lower:
+                color = discord.Color.blue()
+            elif 'مناقش' in role_name_lower:
+                color = discord.Color.green()
+            elif 'عضو' in role_name_lower:
+                color = discord.Color.light_grey()
+            elif 'زائر' in role_name_lower:
+                color = discord.Color.darker_grey()
+            elif 'بوت' in role_name_lower:
+                color = discord.Color.orange()
     
-    # Permission mappings for string-based permissions
-    permission_mappings = {
-        'administrator': 8,
-        'manage_guild': 32,
-        'manage_roles': 268435456,
-        'manage_channels': 16,
-        'kick_members': 2,
-        'ban_members': 4,
-        'manage_messages': 8192,
-        'moderate_members': 1099511627776,
-        'view_channels': 1024,
-        'send_messages': 2048,
-        'read_message_history': 65536,
-        'connect': 1048576,
-        'speak': 2097152
+    staff_role = 'مشرف' in role_config['name'] or 'مدرس' in role_config['name']
+    return {
+        "name": role_config['name'],
+        "permissions": discord.Permissions(permissions=permissions_value),
+        "color": color,
+        "hoist": staff_role if role_config.get('hoist') is None else role_config['hoist'],
+        "mentionable": staff_role if role_config.get('mentionable') is None else role_config['mentionable']
     }
+
+def compile_setup_template(config: Dict) -> Dict:
+    """Resolve a configuration once so the same template can be applied to many guilds"""
+    template = dict(config)
     
-    for role_config in roles_config:
+    compiled_roles = []
+    for role_config in config.get('roles') or []:
+        try:
+            compiled_roles.append(compile_role(role_config))
+        except Exception as e:
+            print(f"Error compiling role {role_config.get('name')}: {e}")
+    template['_compiled_roles'] = compiled_roles
+    
+    if 'channels' in config and not config.get('categories'):
+        template['channels'] = sorted(config['channels'], key=lambda x: x.get('position') or 0)
+    
+    return template
+
+async def create_roles(guild: discord.Guild, compiled_roles: List[Dict]):
+    """Create roles from compiled role arguments, reusing roles that already exist"""
+    role_mapping = {}
+    
+    for role_spec in compiled_roles:
         try:
             # Check if role already exists
-            existing_role = discord.utils.get(guild.roles, name=role_config['name'])
+            existing_role = discord.utils.get(guild.roles, name=role_spec['name'])
             if existing_role:
-                role_mapping[role_config['name']] = existing_role
+                role_mapping[role_spec['name']] = existing_role
                 continue
             
-            # Handle permissions (both numeric and string formats)
-            permissions_value = 0
-            if 'permissions' in role_config:
-                if isinstance(role_config['permissions'], str):
-                    # String-based permission (e.g., "administrator")
-                    permissions_value = permission_mappings.get(role_config['permissions'], 0)
-                elif isinstance(role_config['permissions'], int):
-                    # Numeric permission
-                    permissions_value = role_config['permissions']
-            else:
-                # Default permissions based on role name patterns
-                role_name_lower = role_config['name'].lower()
-                if 'مشرف' in role_name_lower or 'admin' in role_name_lower:
-                    permissions_value = 8  # Administrator
-                elif 'مدرس' in role_name_lower or 'mod' in role_name_lower:
-                    permissions_value = 805306368  # Moderate permissions
-                elif 'مناقش' in role_name_lower:
-                    permissions_value = 104188992  # Discussion permissions
-                elif 'عضو' in role_name_lower:
-                    permissions_value = 104324161  # Member permissions
-                elif 'زائر' in role_name_lower or 'guest' in role_name_lower:
-                    permissions_value = 104324049  # Guest permissions
-                elif 'بوت' in role_name_lower or 'bot' in role_name_lower:
-                    permissions_value = 104324161  # Bot permissions
-            
-            # Create permissions object
-            permissions = discord.Permissions(permissions=permissions_value)
-            
-            # Handle color
-            color = discord.Color.default()
-            if 'color' in role_config:
-                try:
-                    color_value = role_config['color']
-                    if isinstance(color_value, str):
-                        color = discord.Color(int(color_value.replace('#', ''), 16))
-                    else:
-                        color = discord.Color(color_value)
-                except:
-                    # Default colors based on role type
-                    role_name_lower = role_config['name'].lower()
-                    if 'مشرف' in role_name_lower:
-                        color = discord.Color.red()
-                    elif 'مدرس' in role_name_lower:
-                        color = discord.Color.blue()
-                    elif 'مناقش' in role_name_lower:
-                        color = discord.Color.green()
-                    elif 'عضو' in role_name_lower:
-                        color = discord.Color.light_grey()
-                    elif 'زائر' in role_name_lower:
-                        color = discord.Color.darker_grey()
-                    elif 'بوت' in role_name_lower:
-                        color = discord.Color.orange()
-            
             # Create role
-            role = await guild.create_role(
-                name=role_config['name'],
-                permissions=permissions,
-                color=color,
-                hoist=role_config.get('hoist', True if 'مشرف' in role_config['name'] or 'مدرس' in role_config['name'] else False),
-                mentionable=role_config.get('mentionable', True if 'مشرف' in role_config['name'] or 'مدرس' in role_config['name'] else False)
-            )
+            role = await guild.create_role(**role_spec)
             
-            role_mapping[role_config['name']] = role
-            print(f"Created role: {role_config['name']} with permissions: {permissions_value}")
+            role_mapping[role_spec['name']] = role
+            print(f"Created role: {role_spec['name']} with permissions: {role_spec['permissions'].value}")
             
         except Exception as e:
-            print(f"Error creating role {role_config['name']}: {e}")
+            print(f"Error creating role {role_spec['name']}: {e}")
     
     return role_mapping
 
-async def create_channels_and_categories(guild: discord.Guild, config: Dict, role_mapping: Dict):
-    """Create channels and categories based on configuration - supports both old and new formats"""
+def resolve_overwrites(guild: discord.Guild, overwrites_config: Optional[Dict], role_mapping: Dict) -> Dict:
+    """Turn {"role name": {"allow": int, "deny": int}} into discord.py overwrites"""
+    overwrites = {}
+    for role_name, pair in (overwrites_config or {}).items():
+        if role_name == '@everyone':
+            target = guild.default_role
+        else:
+            target = role_mapping.get(role_name) or discord.utils.get(guild.roles, name=role_name)
+        if target is None:
+            print(f"Skipping overwrite for unknown role: {role_name}")
+            continue
+        overwrites[target] = discord.PermissionOverwrite.from_pair(
+            discord.Permissions(pair.get('allow') or 0),
+            discord.Permissions(pair.get('deny') or 0)
+        )
+    return overwrites
+
+def channel_overwrites(category_overwrites: Optional[Dict], channel_config: Dict) -> Optional[Dict]:
+    """Category overwrites with the channel's own entries taking precedence per role"""
+    if not channel_config.get('overwrites'):
+        return category_overwrites
+    return {**(category_overwrites or {}), **channel_config['overwrites']}
+
+async def create_channel(guild: discord.Guild, channel_config: Dict, category,
+                         overwrites_config: Optional[Dict], role_mapping: Dict):
+    """Create a text or voice channel with its overwrites in the same request"""
+    options = {"name": channel_config['name'], "category": category}
+    overwrites = resolve_overwrites(guild, overwrites_config, role_mapping)
+    if overwrites:
+        options["overwrites"] = overwrites
+    
+    if channel_config.get('type', 'text') == 'voice':
+        channel = await guild.create_voice_channel(**options)
+        print(f"Created voice channel: {channel_config['name']}")
+    else:
+        channel = await guild.create_text_channel(**options)
+        print(f"Created text channel: {channel_config['name']}")
+    return channel
+
+async def create_category(guild: discord.Guild, category_config: Dict, role_mapping: Dict):
+    """Create a category with its overwrites in the same request"""
+    options = {"name": category_config['name']}
+    overwrites = resolve_overwrites(guild, category_config.get('overwrites'), role_mapping)
+    if overwrites:
+        options["overwrites"] = overwrites
+    category = await guild.create_category(**options)
+    print(f"Created category: {category_config['name']}")
+    return category
+
+def layout_groups(entries) -> Dict[tuple, List[int]]:
+    """Channel ids in order, grouped the way Discord orders them: by parent and by text/voice"""
+    groups: Dict[tuple, List[int]] = {}
+    for channel_id, parent_id, channel_type in entries:
+        kind = 'category' if channel_type == 'category' else ('voice' if channel_type in ('voice', 'stage_voice') else 'text')
+        groups.setdefault((parent_id, kind), []).append(channel_id)
+    return groups
+
+async def apply_channel_layout(guild: discord.Guild, layout: List[tuple]) -> List[str]:
+    """Set the final order of all created channels in one request, verify it and return mismatches"""
+    if not layout:
+        return []
+    payload = []
+    for position, (channel, parent) in enumerate(layout):
+        entry = {"id": channel.id, "position": position}
+        if parent is not None:
+            entry["parent_id"] = parent.id
+        payload.append(entry)
+    expected = layout_groups((channel.id, parent.id if parent else None, str(channel.type)) for channel, parent in layout)
+    
+    mismatches = []
+    for attempt in range(2):
+        await bot.http.bulk_channel_update(guild.id, payload, reason="Server setup channel order")
+        
+        # One fetch to compare the order Discord settled on with the template
+        created_ids = {channel.id for channel, _ in layout}
+        fetched = sorted(
+            (channel for channel in await guild.fetch_channels() if channel.id in created_ids),
+            key=lambda channel: (channel.position, channel.id)
+        )
+        actual = layout_groups((channel.id, channel.category_id, str(channel.type)) for channel in fetched)
+        mismatches = [
+            f"{kind} channels under {parent_id or 'top level'}"
+            for (parent_id, kind), ids in expected.items()
+            if actual.get((parent_id, kind)) != ids
+        ]
+        if not mismatches:
+            break
+        print(f"Channel order mismatch after bulk update (attempt {attempt + 1}): {mismatches}")
+    return mismatches
+
+async def create_channels_and_categories(guild: discord.Guild, config: Dict, role_mapping: Dict) -> List[str]:
+    """Create channels and categories based on configuration - supports both old and new formats
+    
+    Channels are created without positions and ordered afterwards in a single bulk
+    update; returns the groups whose final order does not match the template.
+    """
     category_mapping = {}
+    layout = []  # (channel, parent category) in template order
     
     # Check if using new format with 'categories' array
-    if 'categories' in config:
-        # New format: categories with nested channels
-        position = 0
+    if config.get('categories'):
+        # New format: categories with nested channels; top-level channels have no category
+        for channel_config in config.get('channels') or []:
+            if channel_config.get('type', 'text') not in SETUP_CHANNEL_TYPES:
+                continue
+            try:
+                channel = await create_channel(guild, channel_config, None, channel_config.get('overwrites'), role_mapping)
+                layout.append((channel, None))
+            except Exception as e:
+                print(f"Error creating channel {channel_config['name']}: {e}")
+        
         for category_config in config['categories']:
             try:
                 # Create category
-                category = await guild.create_category(
-                    name=category_config['name'],
-                    position=position
-                )
+                category = await create_category(guild, category_config, role_mapping)
                 category_mapping[category_config['name']] = category
-                print(f"Created category: {category_config['name']}")
-                position += 1
+                layout.append((category, None))
                 
-                # Create channels within category
+                # Create channels within category, inheriting its overwrites
                 for channel_config in category_config.get('channels', []):
-                    channel_type = channel_config.get('type', 'text')
-                    
-                    if channel_type == 'text':
-                        channel = await guild.create_text_channel(
-                            name=channel_config['name'],
-                            category=category,
-                            position=position
-                        )
-                        print(f"Created text channel: {channel_config['name']}")
-                        
-                    elif channel_type == 'voice':
-                        channel = await guild.create_voice_channel(
-                            name=channel_config['name'],
-                            category=category,
-                            position=position
-                        )
-                        print(f"Created voice channel: {channel_config['name']}")
-                    
-                    position += 1
+                    if channel_config.get('type', 'text') not in SETUP_CHANNEL_TYPES:
+                        continue
+                    overwrites_config = channel_overwrites(category_config.get('overwrites'), channel_config)
+                    channel = await create_channel(guild, channel_config, category, overwrites_config, role_mapping)
+                    layout.append((channel, category))
                     
             except Exception as e:
                 print(f"Error creating category/channel {category_config['name']}: {e}")
     
     elif 'channels' in config:
         # Old format: flat channels list with category references
-        channels_config = config['channels']
-        channels_config.sort(key=lambda x: x.get('position', 0))
+        channels_config = sorted(config['channels'], key=lambda x: x.get('position') or 0)
+        category_overwrites = {}
         
         for channel_config in channels_config:
             try:
-                if channel_config['type'] == 'category':
+                if channel_config.get('type', 'text') == 'category':
                     # Create category
-                    category = await guild.create_category(
-                        name=channel_config['name'],
-                        position=channel_config.get('position', 0)
-                    )
+                    category = await create_category(guild, channel_config, role_mapping)
                     category_mapping[channel_config['name']] = category
-                    print(f"Created category: {channel_config['name']}")
-                    
-                elif channel_config['type'] == 'text':
-                    # Create text channel
-                    category = None
-                    if 'category' in channel_config:
-                        category = category_mapping.get(channel_config['category'])
-                    
-                    channel = await guild.create_text_channel(
-                        name=channel_config['name'],
-                        category=category,
-                        position=channel_config.get('position', 0)
-                    )
-                    print(f"Created text channel: {channel_config['name']}")
+                    category_overwrites[channel_config['name']] = channel_config.get('overwrites')
+                    layout.append((category, None))
                     
-                elif channel_config['type'] == 'voice':
-                    # Create voice channel
+                elif channel_config.get('type', 'text') in SETUP_CHANNEL_TYPES:
+                    # Create text or voice channel
                     category = None
-                    if 'category' in channel_config:
+                    parent_overwrites = None
+                    if channel_config.get('category'):
                         category = category_mapping.get(channel_config['category'])
+                        parent_overwrites = category_overwrites.get(channel_config['category'])
                     
-                    channel = await guild.create_voice_channel(
-                        name=channel_config['name'],
-                        category=category,
-                        position=channel_config.get('position', 0)
-                    )
-                    print(f"Created voice channel: {channel_config['name']}")
+                    channel = await create_channel(guild, channel_config, category,
+                                                   channel_overwrites(parent_overwrites, channel_config), role_mapping)
+                    layout.append((channel, category))
                     
             except Exception as e:
                 print(f"Error creating channel {channel_config['name']}: {e}")
+    
+    try:
+        return await apply_channel_layout(guild, layout)
+    except Exception as e:
+        print(f"Error ordering channels: {e}")
+        return ["channel order could not be applied"]
+
+async def insert_setup_status(setup_status: SetupStatus):
+    """Store a new setup status and make it the guild's latest"""
+    status_doc = setup_status.dict()
+    await db.setup_status.insert_one(status_doc)
+    await db.setup_status_latest.update_one(
+        {"guild_id": setup_status.guild_id},
+        {"$set": {
+            "status_id": setup_status.id,
+            "config_id": setup_status.config_id,
+            "status": setup_status.status,
+            "progress": setup_status.progress,
+            "message": setup_status.message,
+            "started_at": setup_status.started_at,
+            "updated_at": setup_status.started_at,
+            "completed_at": None
+        }},
+        upsert=True
+    )
 
 async def update_setup_status(status_id: str, status: str, progress: int, message: str):
     """Update setup status in database"""
@@ -628,10 +1168,159 @@ async def update_setup_status(status_id: str, status: str, progress: int, messag
     if status in ["completed", "failed"]:
         update_data["completed_at"] = datetime.utcnow()
     
-    await db.setup_status.update_one(
+    status_doc = await db.setup_status.find_one_and_update(
         {"id": status_id},
+        {"$set": update_data},
+        projection={"_id": 0, "guild_id": 1, "started_at": 1}
+    )
+    if status_doc is None:
+        return
+    
+    await db.setup_status_latest.update_one(
+        {"guild_id": status_doc['guild_id'], "status_id": status_id},
         {"$set": update_data}
     )
+    
+    if "completed_at" in update_data:
+        # Daily aggregates outlive the raw documents removed by the TTL index
+        duration = (update_data["completed_at"] - status_doc['started_at']).total_seconds()
+        await db.setup_status_daily.update_one(
+            {"date": update_data["completed_at"].strftime("%Y-%m-%d")},
+            {"$inc": {f"counts.{status}": 1, "duration_total_s": duration}, "$max": {"duration_max_s": duration}},
+            upsert=True
+        )
+
+# Retention for setup history (0 keeps documents forever); setups that never finished are kept longer
+SETUP_STATUS_RETENTION_DAYS = int(os.environ.get('SETUP_STATUS_RETENTION_DAYS', 30))
+SETUP_STATUS_ABANDONED_DAYS = int(os.environ.get('SETUP_STATUS_ABANDONED_DAYS', 90))
+
+async def ensure_indexes():
+    """Create the indexes used by lookups, uniqueness guarantees and setup history retention"""
+    indexes = [
+        (db.setup_status, [("id", 1)], {"unique": True}),
+        (db.setup_status_latest, [("guild_id", 1)], {"unique": True}),
+        (db.setup_status_daily, [("date", 1)], {"unique": True}),
+        (db.server_configs, [("id", 1)], {}),
+        (db.server_configs, [("guild_id", 1)], {}),
+        (db.server_configs, [("name", 1)], {}),
+        (db.server_configs, TEXT_INDEX_KEYS, TEXT_INDEX_OPTIONS),
+        (db.guild_settings, [("guild_id", 1)], {"unique": True}),
+        (db.config_versions, [("config_id", 1), ("version", 1)], {"unique": True}),
+        (db.config_blobs, [("sha256", 1)], {"unique": True}),
+        (db.guild_snapshots, [("guild_id", 1), ("sequence", 1)], {}),
+        (db.guild_snapshots, [("base_id", 1), ("sequence", 1)], {}),
+        (db.guild_snapshot_state, [("guild_id", 1)], {"unique": True}),
+        (db.setup_jobs, [("id", 1)], {"unique": True}),
+        (db.autorole_jobs, [("id", 1)], {"unique": True}),
+        (db.delivery_webhooks, [("channel_id", 1)], {"unique": True}),
+        (db.raid_lockdowns, [("guild_id", 1)], {"unique": True}),
+        (db.raid_lockdowns, [("locked_at", 1)], {"expireAfterSeconds": 30 * 86400}),
+        (db.autorole_jobs, [("guild_id", 1), ("status", 1)], {}),
+        (db.member_analytics, [("guild_id", 1), ("granularity", 1), ("bucket", 1)], {"unique": True}),
+        # Minute and hour buckets expire at their expires_at; day buckets have none
+        (db.member_analytics, [("expires_at", 1)], {"expireAfterSeconds": 0}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            print(f"Failed to create index {keys} on {collection.name}: {e}")
+    
+    # Finished setups expire by completed_at; pending or running documents that never finish
+    # (queued through /api/setup, or interrupted by a restart) expire by started_at
+    for ttl_name, field, days in (
+        ("completed_at_ttl", "completed_at", SETUP_STATUS_RETENTION_DAYS),
+        ("started_at_ttl", "started_at",
+         SETUP_STATUS_RETENTION_DAYS and max(SETUP_STATUS_ABANDONED_DAYS, SETUP_STATUS_RETENTION_DAYS))
+    ):
+        await ensure_ttl_index(db.setup_status, ttl_name, field, days * 86400)
+
+async def ensure_ttl_index(collection, name: str, field: str, seconds: int):
+    """Create, retune or (seconds=0) drop a TTL index"""
+    try:
+        existing = (await collection.index_information()).get(name)
+        if not seconds:
+            if existing:
+                await collection.drop_index(name)
+        elif existing is None:
+            await collection.create_index([(field, 1)], name=name, expireAfterSeconds=seconds)
+        elif existing.get('expireAfterSeconds') != seconds:
+            await db.command({
+                "collMod": collection.name,
+                "index": {"name": name, "expireAfterSeconds": seconds}
+            })
+    except Exception as e:
+        print(f"Failed to configure {collection.name} retention ({name}): {e}")
+
+# Configuration version history (JSON-patch deltas with periodic full checkpoints)
+async def record_config_version(config_id: str, version: int, content: Dict, previous: Optional[Dict] = None):
+    """Store a version as a checkpoint or as a patch from the previous version"""
+    record = {"config_id": config_id, "version": version, "created_at": datetime.utcnow()}
+    if previous is None or is_checkpoint(version, CHECKPOINT_EVERY):
+        record.update(kind="checkpoint", document=content)
+    else:
+        patch = make_patch(previous, content)
+        record.update(kind="delta", patch=patch, operations=len(patch))
+    await db.config_versions.insert_one(record)
+
+async def ensure_config_history(current: Dict, content: Optional[Dict] = None) -> Dict:
+    """Start the history of a configuration created before versioning with its current content"""
+    if content is None:
+        content = ServerConfigContent(**await config_storage.decode(db, current)).dict()
+    if not await db.config_versions.find_one({"config_id": current['id']}, {"_id": 1}):
+        # Upsert so concurrent first reads do not trip the unique (config_id, version) index
+        await db.config_versions.update_one(
+            {"config_id": current['id'], "version": current.get('version', 1)},
+            {"$setOnInsert": {"kind": "checkpoint", "document": content, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+    return content
+
+async def save_config_version(current: Dict, content: Dict) -> Dict:
+    """Write new content to a configuration as its next version"""
+    config_id = current['id']
+    version = current.get('version', 1)
+    await ensure_config_history(current)
+    try:
+        # Patch against what the history rebuilds, which is what the patch is applied to
+        previous = await load_config_version(config_id, version)
+    except HTTPException:
+        # The chain cannot rebuild the current version; start again from a checkpoint
+        previous = None
+    
+    updated_at = datetime.utcnow()
+    encoded = await encode_config({**content, "version": version + 1, "updated_at": updated_at})
+    result = await db.server_configs.update_one(
+        {"id": config_id, "version": current.get('version')},
+        config_storage.update_operations(encoded)
+    )
+    if result.matched_count == 0:
+        await config_storage.release(db, encoded)
+        raise HTTPException(status_code=409, detail="Configuration was modified concurrently, retry")
+    await config_storage.release(db, current)
+    
+    await record_config_version(config_id, version + 1, content, previous)
+    config_name_index.set(config_id, content['name'])
+    invalidate_guild_config(current.get('guild_id'))
+    updated = {key: value for key, value in current.items() if key != '_packed'}
+    return {**updated, **content, "version": version + 1, "updated_at": updated_at}
+
+async def load_config_version(config_id: str, version: int) -> Dict:
+    """Rebuild a version from the nearest checkpoint at or below it"""
+    checkpoint = await db.config_versions.find_one(
+        {"config_id": config_id, "kind": "checkpoint", "version": {"$lte": version}},
+        {"_id": 0},
+        sort=[("version", -1)]
+    )
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="Version not found")
+    deltas = await db.config_versions.find(
+        {"config_id": config_id, "kind": "delta", "version": {"$gt": checkpoint['version'], "$lte": version}},
+        {"_id": 0}
+    ).sort("version", 1).to_list(None)
+    if checkpoint['version'] + len(deltas) != version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return rebuild([checkpoint] + deltas)
 
 # API Routes
 @api_router.get("/")
@@ -642,14 +1331,43 @@ async def root():
 async def create_server_config(config: ServerConfigCreate):
     """Create a new server configuration"""
     config_obj = ServerConfig(**config.dict())
-    await db.server_configs.insert_one(config_obj.dict())
+    await db.server_configs.insert_one(await encode_config(config_obj.dict()))
+    await record_config_version(config_obj.id, config_obj.version, config.dict())
+    config_name_index.set(config_obj.id, config_obj.name)
     return config_obj
 
-@api_router.get("/configs", response_model=List[ServerConfig])
-async def get_server_configs():
-    """Get all server configurations"""
+@api_router.get("/configs", response_model=Union[List[ServerConfigSummary], List[ServerConfig]])
+async def get_server_configs(summary: bool = False):
+    """Get all server configurations; summary=true returns metadata without roles and channels"""
+    if summary:
+        configs = await db.server_configs.find({}, CONFIG_SUMMARY_FIELDS).to_list(100)
+        return [ServerConfigSummary(**config) for config in configs]
     configs = await db.server_configs.find().to_list(100)
-    return [ServerConfig(**config) for config in configs]
+    return [ServerConfig(**await config_storage.decode(db, config)) for config in configs]
+
+# Declared before /configs/{config_id} so "search" is not taken for an id
+@api_router.get("/configs/search", response_model=ConfigSearchResponse)
+async def search_server_configs(q: str, page: int = 1, page_size: int = 20):
+    """Search configurations by name, description and role/channel names, best matches first"""
+    query = q.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    page = max(page, 1)
+    page_size = max(1, min(page_size, 50))
+    
+    text_filter = {"$text": {"$search": query}}
+    projection = {"_id": 0, **{field: 1 for field in ServerConfigSummary.model_fields},
+                  "search_text": 1, "score": {"$meta": "textScore"}}
+    docs = await db.server_configs.find(text_filter, projection) \
+        .sort([("score", {"$meta": "textScore"})]) \
+        .skip((page - 1) * page_size) \
+        .limit(page_size) \
+        .to_list(page_size)
+    total = await db.server_configs.count_documents(text_filter)
+    
+    terms = query_terms(query)
+    results = [ConfigSearchResult(**doc, highlights=highlights(doc, terms)) for doc in docs]
+    return ConfigSearchResponse(query=query, page=page, page_size=page_size, total=total, results=results)
 
 @api_router.get("/configs/{config_id}", response_model=ServerConfig)
 async def get_server_config(config_id: str):
@@ -657,31 +1375,63 @@ async def get_server_config(config_id: str):
     config = await db.server_configs.find_one({"id": config_id})
     if not config:
         raise HTTPException(status_code=404, detail="Configuration not found")
-    return ServerConfig(**config)
+    return ServerConfig(**await config_storage.decode(db, config))
 
 @api_router.put("/configs/{config_id}", response_model=ServerConfig)
 async def update_server_config(config_id: str, config: ServerConfigCreate):
     """Update a server configuration"""
-    config_dict = config.dict()
-    config_dict["updated_at"] = datetime.utcnow()
+    current = await db.server_configs.find_one({"id": config_id})
+    if not current:
+        raise HTTPException(status_code=404, detail="Configuration not found")
     
-    result = await db.server_configs.update_one(
-        {"id": config_id},
-        {"$set": config_dict}
-    )
+    updated_config = await save_config_version(current, config.dict())
+    return ServerConfig(**updated_config)
+
+@api_router.get("/configs/{config_id}/versions")
+async def list_config_versions(config_id: str):
+    """List the saved versions of a configuration, newest first"""
+    def history():
+        return db.config_versions.find(
+            {"config_id": config_id},
+            {"_id": 0, "version": 1, "kind": 1, "operations": 1, "created_at": 1}
+        ).sort("version", -1).to_list(1000)
     
-    if result.matched_count == 0:
+    versions = await history()
+    if not versions:
+        current = await db.server_configs.find_one({"id": config_id})
+        if not current:
+            raise HTTPException(status_code=404, detail="Configuration not found")
+        await ensure_config_history(current)
+        versions = await history()
+    return versions
+
+@api_router.get("/configs/{config_id}/versions/{version}")
+async def get_config_version(config_id: str, version: int):
+    """Get the content of a configuration as it was at a given version"""
+    content = await load_config_version(config_id, version)
+    return {"config_id": config_id, "version": version, "config": content}
+
+@api_router.post("/configs/{config_id}/versions/{version}/rollback", response_model=ServerConfig)
+async def rollback_server_config(config_id: str, version: int):
+    """Restore an earlier version; the restored content is saved as a new version"""
+    current = await db.server_configs.find_one({"id": config_id})
+    if not current:
         raise HTTPException(status_code=404, detail="Configuration not found")
     
-    updated_config = await db.server_configs.find_one({"id": config_id})
+    content = await load_config_version(config_id, version)
+    updated_config = await save_config_version(current, ServerConfigContent(**content).dict())
     return ServerConfig(**updated_config)
 
 @api_router.delete("/configs/{config_id}")
 async def delete_server_config(config_id: str):
     """Delete a server configuration"""
-    result = await db.server_configs.delete_one({"id": config_id})
-    if result.deleted_count == 0:
+    deleted = await db.server_configs.find_one_and_delete({"id": config_id}, {"guild_id": 1, "name": 1, "_packed": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Configuration not found")
+    await config_storage.release(db, deleted)
+    config_name_index.remove(config_id)
+    invalidate_guild_config(deleted.get('guild_id'))
+    await db.config_versions.delete_many({"config_id": config_id})
     return {"message": "Configuration deleted successfully"}
 
 @api_router.get("/bot/status")
@@ -689,6 +1439,11 @@ async def get_bot_status():
     """Get bot connection status"""
     return bot_status
 
+@api_router.get("/bot/scheduler")
+async def get_scheduler_metrics():
+    """Get outbound REST queue depths and wait times per priority class"""
+    return rest_scheduler.metrics()
+
 @api_router.post("/bot/start")
 async def start_bot(background_tasks: BackgroundTasks):
     """Start the Discord bot"""
@@ -704,12 +1459,30 @@ async def start_bot(background_tasks: BackgroundTasks):
         bot_status['last_error'] = str(e)
         raise HTTPException(status_code=500, detail=f"Failed to start bot: {e}")
 
+@api_router.get("/guilds/{guild_id}/raid")
+async def get_raid_status(guild_id: str):
+    """Get anti-raid lockdown status for a guild"""
+    if not guild_id.isdigit():
+        raise HTTPException(status_code=404, detail="Guild not found")
+    return anti_raid.status(int(guild_id))
+
+@api_router.post("/guilds/{guild_id}/raid/lift")
+async def lift_raid_lockdown(guild_id: str):
+    """Manually end a guild's raid lockdown"""
+    guild = bot.get_guild(int(guild_id)) if guild_id.isdigit() else None
+    if not guild or not anti_raid.is_locked(guild.id):
+        raise HTTPException(status_code=404, detail="No active lockdown for this guild")
+    
+    config = await get_guild_config(guild_id)
+    await anti_raid.lift(guild, (config.moderation if config else None) or {})
+    return {"message": "Lockdown lifted"}
+
 @api_router.post("/setup")
 async def trigger_server_setup(setup: SetupRequest, background_tasks: BackgroundTasks):
     """Trigger server setup via API"""
     try:
         # Find configuration
-        config = await db.server_configs.find_one({"id": setup.config_id})
+        config = await db.server_configs.find_one({"id": setup.config_id}, {"_id": 1})
         if not config:
             raise HTTPException(status_code=404, detail="Configuration not found")
         
@@ -721,7 +1494,7 @@ async def trigger_server_setup(setup: SetupRequest, background_tasks: Background
             message="Setup queued..."
         )
         
-        await db.setup_status.insert_one(setup_status.dict())
+        await insert_setup_status(setup_status)
         
         return {"message": "Server setup queued", "status_id": setup_status.id}
         
@@ -731,11 +1504,493 @@ async def trigger_server_setup(setup: SetupRequest, background_tasks: Background
 @api_router.get("/setup/status/{status_id}")
 async def get_setup_status(status_id: str):
     """Get setup status"""
-    status = await db.setup_status.find_one({"id": status_id})
+    status = await db.setup_status.find_one({"id": status_id}, {"_id": 0})
     if not status:
         raise HTTPException(status_code=404, detail="Setup status not found")
     return status
 
+@api_router.get("/guilds/{guild_id}/setup/latest")
+async def get_latest_setup_status(guild_id: str):
+    """Get the most recent setup status of a guild"""
+    status = await db.setup_status_latest.find_one({"guild_id": guild_id}, {"_id": 0})
+    if not status:
+        raise HTTPException(status_code=404, detail="No setup recorded for this guild")
+    return status
+
+@api_router.get("/setup/stats")
+async def get_setup_stats(days: int = 30):
+    """Daily setup counts and durations, kept after raw statuses expire"""
+    daily = await db.setup_status_daily.find({}, {"_id": 0}).sort("date", -1).to_list(max(1, min(days, 366)))
+    for day in daily:
+        finished = sum((day.get('counts') or {}).values())
+        day['duration_avg_s'] = round(day.get('duration_total_s', 0) / finished, 3) if finished else 0.0
+    return daily
+
+# Member analytics: time series served from the pre-aggregated buckets
+ANALYTICS_DEFAULT_RANGES = {"minute": 60, "hour": 48, "day": 30}
+
+async def flush_member_analytics_loop():
+    """Periodically write the in-memory join/leave counters to Mongo"""
+    while True:
+        await asyncio.sleep(member_analytics.flush_interval)
+        try:
+            await member_analytics.flush(db)
+        except Exception as e:
+            print(f"Failed to flush member analytics: {e}")
+
+@api_router.get("/guilds/{guild_id}/analytics")
+async def get_guild_analytics(guild_id: str, granularity: str = "hour",
+                              start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Join/leave counts per minute, hour or day (UTC); defaults to the last 60 minutes, 48 hours or 30 days"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    # Buckets are stored as naive UTC
+    end = end.astimezone(timezone.utc).replace(tzinfo=None) if end and end.tzinfo else (end or datetime.utcnow())
+    if start is None:
+        start = end - timedelta(seconds=GRANULARITIES[granularity][0] * ANALYTICS_DEFAULT_RANGES[granularity])
+    elif start.tzinfo:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        points = await member_analytics.series(db, guild_id, granularity, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "guild_id": guild_id,
+        "granularity": granularity,
+        "start": points[0]['bucket'] if points else start,
+        "end": end,
+        "totals": {
+            "joins": sum(point['joins'] for point in points),
+            "leaves": sum(point['leaves'] for point in points)
+        },
+        "points": points
+    }
+
+# Guild snapshots: export a live guild's structure, storing only changes between snapshots
+SNAPSHOT_FULL_EVERY = int(os.environ.get('SNAPSHOT_FULL_EVERY', 20))
+
+async def load_snapshot_entities(snapshot: Dict) -> Dict:
+    """Rebuild a stored snapshot's full entity map from its base snapshot and incrementals"""
+    if snapshot['kind'] == 'full':
+        return snapshot['entities']
+    chain = await db.guild_snapshots.find(
+        {"base_id": snapshot['base_id'], "sequence": {"$lte": snapshot['sequence']}},
+        {"_id": 0}
+    ).sort("sequence", 1).to_list(None)
+    # The chain starts with the base snapshot itself (its base_id is its own id)
+    return apply_changes(chain)
+
+@api_router.post("/guilds/{guild_id}/snapshot")
+async def snapshot_guild(guild_id: str, request: Optional[SnapshotRequest] = None):
+    """Capture a guild's roles, categories, channels and overwrites from the bot cache"""
+    request = request or SnapshotRequest()
+    guild = bot.get_guild(int(guild_id)) if guild_id.isdigit() else None
+    if guild is None:
+        raise HTTPException(status_code=404, detail="Guild not found or bot is not a member")
+    
+    entities = capture_entities(guild)
+    state = await db.guild_snapshot_state.find_one({"guild_id": guild_id}) or {}
+    incremental = (request.incremental and state.get('base_id')
+                   and state.get('since_full', 0) < SNAPSHOT_FULL_EVERY)
+    changed, removed, hashes = diff_entities(state.get('hashes', {}) if incremental else {}, entities)
+    
+    snapshot_id = state.get('last_snapshot_id')
+    stored = bool(changed or removed) or not incremental
+    if stored:
+        snapshot_id = str(uuid.uuid4())
+        sequence = state.get('sequence', 0) + 1
+        await db.guild_snapshots.insert_one({
+            "id": snapshot_id,
+            "guild_id": guild_id,
+            "kind": "incremental" if incremental else "full",
+            "base_id": state['base_id'] if incremental else snapshot_id,
+            "sequence": sequence,
+            "entities": changed,
+            "removed": removed,
+            "created_at": datetime.utcnow()
+        })
+        await db.guild_snapshot_state.update_one(
+            {"guild_id": guild_id},
+            {"$set": {
+                "hashes": hashes,
+                "last_snapshot_id": snapshot_id,
+                "base_id": state['base_id'] if incremental else snapshot_id,
+                "since_full": state.get('since_full', 0) + 1 if incremental else 0,
+                "sequence": sequence,
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    
+    icon_url = str(guild.icon.url) if guild.icon else None
+    config = entities_to_config(entities, request.name or guild.name, f"Snapshot of {guild.name}", icon_url)
+    config_id = None
+    if request.save_config:
+        config_obj = ServerConfig(**config)
+        await db.server_configs.insert_one(await encode_config(config_obj.dict()))
+        await record_config_version(config_obj.id, config_obj.version, ServerConfigContent(**config).dict())
+        config_name_index.set(config_obj.id, config_obj.name)
+        config_id = config_obj.id
+    
+    return {
+        "snapshot_id": snapshot_id,
+        "kind": ("incremental" if incremental else "full") if stored else "unchanged",
+        "changed": len(changed),
+        "removed": len(removed),
+        "config_id": config_id,
+        "config": config
+    }
+
+@api_router.get("/guilds/{guild_id}/snapshots")
+async def list_guild_snapshots(guild_id: str):
+    """List a guild's snapshots, newest first"""
+    snapshots = await db.guild_snapshots.find(
+        {"guild_id": guild_id},
+        {"_id": 0, "entities": 0, "removed": 0}
+    ).sort("sequence", -1).to_list(100)
+    return snapshots
+
+@api_router.get("/guilds/{guild_id}/snapshots/{snapshot_id}")
+async def get_guild_snapshot(guild_id: str, snapshot_id: str):
+    """Rebuild the full configuration captured by a snapshot"""
+    snapshot = await db.guild_snapshots.find_one({"id": snapshot_id, "guild_id": guild_id}, {"_id": 0})
+    if not snapshot:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    entities = await load_snapshot_entities(snapshot)
+    config = entities_to_config(entities, f"snapshot-{guild_id}", f"Snapshot {snapshot_id}")
+    return {"snapshot_id": snapshot_id, "kind": snapshot['kind'], "created_at": snapshot['created_at'], "config": config}
+
+# Batch setup: one template applied to many guilds
+batch_setup_tasks = set()
+batch_job_subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+def publish_batch_event(job_id: str, event: Dict):
+    """Push a progress event to every open stream of a batch job"""
+    for queue in batch_job_subscribers.get(job_id, []):
+        queue.put_nowait(event)
+
+async def run_batch_setup(job_id: str, template: Dict, guild_ids: List[str], max_concurrency: int):
+    """Run setups for all guilds of a batch job, at most max_concurrency at a time"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    runtime_settings = {
+        key: template[key]
+        for key in ('welcome_settings', 'auto_role_settings', 'moderation_settings')
+        if template.get(key)
+    }
+    
+    async def setup_guild(guild_id: str):
+        setup_status = SetupStatus(
+            guild_id=guild_id,
+            config_id=template['id'],
+            status="running",
+            message="بدء إعداد السيرفر..."
+        )
+        await insert_setup_status(setup_status)
+        await db.setup_jobs.update_one(
+            {"id": job_id},
+            {"$set": {f"guilds.{guild_id}.status": "running", f"guilds.{guild_id}.status_id": setup_status.id}}
+        )
+        publish_batch_event(job_id, {"guild_id": guild_id, "status": "running"})
+        
+        guild = bot.get_guild(int(guild_id)) if guild_id.isdigit() else None
+        if guild is None:
+            error = "Guild not found or bot is not a member"
+            await update_setup_status(setup_status.id, "failed", 0, f"خطأ: {error}")
+            return error
+        if not await setup_discord_server(guild, template, setup_status.id):
+            return "Setup failed, see the guild's setup status"
+        if runtime_settings:
+            # Bind the template's welcome/auto-role/moderation settings to the guild
+            await db.guild_settings.update_one(
+                {"guild_id": guild_id},
+                {"$set": {**runtime_settings, "id": template['id'], "name": template.get('name')}},
+                upsert=True
+            )
+            invalidate_guild_config(guild_id)
+        return None
+    
+    async def run_guild(guild_id: str):
+        """Set up one guild and record its outcome; errors only fail that guild"""
+        async with semaphore:
+            try:
+                error = await setup_guild(guild_id)
+            except Exception as e:
+                print(f"Batch setup error in guild {guild_id}: {e}")
+                error = str(e) or type(e).__name__
+            status = "failed" if error else "completed"
+            await db.setup_jobs.update_one(
+                {"id": job_id},
+                {
+                    "$set": {f"guilds.{guild_id}.status": status, f"guilds.{guild_id}.error": error},
+                    "$inc": {status: 1}
+                }
+            )
+            publish_batch_event(job_id, {"guild_id": guild_id, "status": status, "error": error})
+    
+    try:
+        results = await asyncio.gather(*(run_guild(guild_id) for guild_id in guild_ids), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Batch setup error: {result}")
+        job = await db.setup_jobs.find_one({"id": job_id}, {"failed": 1})
+        status = "completed" if not (job or {}).get('failed') else "completed_with_errors"
+    except Exception as e:
+        print(f"Batch setup error: {e}")
+        status = "failed"
+    
+    await db.setup_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": status, "completed_at": datetime.utcnow()}}
+    )
+    publish_batch_event(job_id, {"status": status, "done": True})
+
+@api_router.post("/setup/batch")
+async def trigger_batch_setup(request: BatchSetupRequest):
+    """Apply one configuration to many guilds in a single job"""
+    config = await config_storage.decode(db, await db.server_configs.find_one({"id": request.config_id}))
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    
+    guild_ids = list(dict.fromkeys(request.guild_ids))
+    if not guild_ids:
+        raise HTTPException(status_code=400, detail="guild_ids must not be empty")
+    
+    job = {
+        "id": str(uuid.uuid4()),
+        "config_id": request.config_id,
+        "status": "running",
+        "total": len(guild_ids),
+        "completed": 0,
+        "failed": 0,
+        "guilds": {guild_id: {"status": "pending"} for guild_id in guild_ids},
+        "created_at": datetime.utcnow(),
+        "completed_at": None
+    }
+    await db.setup_jobs.insert_one(job)
+    
+    # Compile once and share the template across every guild in the job
+    template = compile_setup_template(config)
+    task = asyncio.create_task(run_batch_setup(job['id'], template, guild_ids, request.max_concurrency))
+    batch_setup_tasks.add(task)
+    task.add_done_callback(batch_setup_tasks.discard)
+    
+    return {"message": "Batch setup started", "job_id": job['id'], "total": len(guild_ids)}
+
+@api_router.get("/setup/batch/{job_id}")
+async def get_batch_setup(job_id: str):
+    """Get aggregate and per-guild status of a batch setup job"""
+    job = await db.setup_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+@api_router.get("/setup/batch/{job_id}/stream")
+async def stream_batch_setup(job_id: str):
+    """Stream batch setup progress as server-sent events until the job finishes"""
+    # Subscribe before reading the job, so a "done" event published in between is queued
+    queue: asyncio.Queue = asyncio.Queue()
+    batch_job_subscribers.setdefault(job_id, []).append(queue)
+    
+    def unsubscribe():
+        subscribers = batch_job_subscribers.get(job_id, [])
+        if queue in subscribers:
+            subscribers.remove(queue)
+        if not subscribers:
+            batch_job_subscribers.pop(job_id, None)
+    
+    try:
+        job = await db.setup_jobs.find_one({"id": job_id}, {"_id": 0})
+    except Exception:
+        unsubscribe()
+        raise
+    if not job:
+        unsubscribe()
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    
+    async def events():
+        try:
+            snapshot = {k: job[k] for k in ('status', 'total', 'completed', 'failed')}
+            yield f"data: {json.dumps(snapshot)}\n\n"
+            if job['status'] != "running":
+                return
+            while True:
+                event = await queue.get()
+                yield f"data: {json.dumps(event)}\n\n"
+                if event.get('done'):
+                    return
+        finally:
+            unsubscribe()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+# Auto-roles for existing members: paginated member fetches, paced grants, checkpointed jobs
+AUTOROLE_PAGE_SIZE = min(int(os.environ.get('AUTOROLE_PAGE_SIZE', 1000)), 1000)
+AUTOROLE_GRANTS_PER_SECOND = float(os.environ.get('AUTOROLE_GRANTS_PER_SECOND', 5))
+autorole_job_tasks: Dict[str, asyncio.Task] = {}
+autorole_job_lock = asyncio.Lock()
+
+def spawn_autorole_job(job: Dict):
+    """Run a job in the background unless it is already running in this process"""
+    if job['id'] in autorole_job_tasks:
+        return
+    task = asyncio.create_task(run_autorole_job(job))
+    autorole_job_tasks[job['id']] = task
+    task.add_done_callback(lambda _: autorole_job_tasks.pop(job['id'], None))
+
+async def start_autorole_job(guild: discord.Guild) -> Dict:
+    """Start a job granting the guild's auto-roles to existing members, or return the running one"""
+    guild_id = str(guild.id)
+    async with autorole_job_lock:
+        running = await db.autorole_jobs.find_one({"guild_id": guild_id, "status": "running"}, {"_id": 0})
+        if running:
+            spawn_autorole_job(running)
+            return running
+        
+        config = await get_guild_config(guild_id)
+        if not config or not config.auto_role or not config.auto_role.enabled or not config.auto_role.roles:
+            raise ValueError("لم يتم إعداد الأدوار التلقائية لهذا السيرفر.")
+        roles = config.auto_roles(guild)
+        if not roles:
+            raise ValueError("لم يتم العثور على أي من الأدوار التلقائية في السيرفر.")
+        
+        setup_status = SetupStatus(
+            guild_id=guild_id,
+            config_id=config.config_id or "auto_role",
+            status="running",
+            message="توزيع الأدوار على الأعضاء الحاليين..."
+        )
+        await insert_setup_status(setup_status)
+        
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "guild_id": guild_id,
+            "status_id": setup_status.id,
+            "role_ids": [str(role.id) for role in roles],
+            "status": "running",
+            "after": None,  # checkpoint: last member id handled
+            "total": guild.member_count or 0,
+            "processed": 0,
+            "granted": 0,
+            "skipped": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+            "completed_at": None
+        }
+        await db.autorole_jobs.insert_one(job)
+        job.pop('_id', None)
+        spawn_autorole_job(job)
+        return job
+
+async def finish_autorole_job(job: Dict, status: str, message: str):
+    now = datetime.utcnow()
+    await db.autorole_jobs.update_one(
+        {"id": job['id']},
+        {"$set": {"status": status, "error": message if status == "failed" else None,
+                  "updated_at": now, "completed_at": now}}
+    )
+    await update_setup_status(job['status_id'], status, 100 if status == "completed" else 0, message)
+
+async def run_autorole_job(job: Dict):
+    """Walk the guild's members page by page from the job's checkpoint and grant missing auto-roles"""
+    guild = bot.get_guild(int(job['guild_id']))
+    if guild is None:
+        await finish_autorole_job(job, "failed", "خطأ: السيرفر غير موجود أو البوت ليس عضواً فيه")
+        return
+    roles = [guild.get_role(int(role_id)) for role_id in job['role_ids']]
+    roles = [role for role in roles if role]
+    if not roles:
+        await finish_autorole_job(job, "failed", "خطأ: تم حذف الأدوار التلقائية")
+        return
+    
+    interval = 1 / AUTOROLE_GRANTS_PER_SECOND if AUTOROLE_GRANTS_PER_SECOND > 0 else 0
+    counts = {key: job.get(key, 0) for key in ("processed", "granted", "skipped", "failed")}
+    total = max(job.get('total') or guild.member_count or 0, 1)
+    after = job.get('after')
+    
+    try:
+        # Member pages and grants queue behind interactions and member events
+        with request_priority(Priority.BULK):
+            while True:
+                # One page per request; only the current page is held in memory
+                page = [
+                    member async for member in guild.fetch_members(
+                        limit=AUTOROLE_PAGE_SIZE,
+                        after=discord.Object(id=int(after)) if after else None
+                    )
+                ]
+                for member in page:
+                    missing = [role for role in roles if role not in member.roles]
+                    if member.bot or not missing:
+                        counts['skipped'] += 1
+                    else:
+                        try:
+                            await member.add_roles(*missing, reason="Auto-role for existing members")
+                            counts['granted'] += 1
+                        except discord.HTTPException as e:
+                            counts['failed'] += 1
+                            print(f"Error granting auto-roles to {member}: {e}")
+                        if interval:
+                            await asyncio.sleep(interval)
+                    counts['processed'] += 1
+                
+                if page:
+                    after = str(page[-1].id)
+                    await db.autorole_jobs.update_one(
+                        {"id": job['id']},
+                        {"$set": {"after": after, **counts, "updated_at": datetime.utcnow()}}
+                    )
+                    await update_setup_status(
+                        job['status_id'], "running", min(99, counts['processed'] * 100 // total),
+                        f"تمت معالجة {counts['processed']} من {total} عضو (تم منح الأدوار لـ {counts['granted']})"
+                    )
+                if len(page) < AUTOROLE_PAGE_SIZE:
+                    break
+    except asyncio.CancelledError:
+        # Shutdown: the job stays running and resumes from its checkpoint
+        raise
+    except Exception as e:
+        print(f"Auto-role job {job['id']} failed: {e}")
+        await finish_autorole_job(job, "failed", f"خطأ: {str(e)}")
+        return
+    
+    await finish_autorole_job(
+        job, "completed",
+        f"تم منح الأدوار لـ {counts['granted']} عضو ({counts['skipped']} لديهم الأدوار مسبقاً، {counts['failed']} فشل)"
+    )
+
+async def resume_autorole_jobs():
+    """Restart running jobs of the guilds this bot is in from their last checkpoint"""
+    guild_ids = [str(guild.id) for guild in bot.guilds]
+    jobs = await db.autorole_jobs.find(
+        {"status": "running", "guild_id": {"$in": guild_ids}}, {"_id": 0}
+    ).to_list(None)
+    for job in jobs:
+        spawn_autorole_job(job)
+
+@api_router.post("/guilds/{guild_id}/autorole/apply")
+async def apply_autorole_to_members(guild_id: str):
+    """Grant the guild's auto-roles to all existing members in a background job"""
+    guild = bot.get_guild(int(guild_id)) if guild_id.isdigit() else None
+    if guild is None:
+        raise HTTPException(status_code=404, detail="Guild not found or bot is not a member")
+    try:
+        job = await start_autorole_job(guild)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Auto-role job running", "job_id": job['id'], "status_id": job['status_id']}
+
+@api_router.get("/autorole/jobs/{job_id}")
+async def get_autorole_job(job_id: str):
+    """Get an auto-role job's checkpoint and counters"""
+    job = await db.autorole_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Auto-role job not found")
+    return job
+
 # Background task to run Discord bot
 async def run_discord_bot():
     """Run Discord bot in background"""
@@ -749,9 +2004,6 @@ async def run_discord_bot():
         bot_status['last_error'] = str(e)
         print(f"Bot error: {e}")
 
-# Include router
-app.include_router(api_router)
-
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -768,15 +2020,153 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Startup warm-up: /api/readyz reports not ready until it finishes, then checks Mongo and the gateway live
+WARMUP_GATEWAY_TIMEOUT = float(os.environ.get('WARMUP_GATEWAY_TIMEOUT', 60))
+READINESS_PING_TIMEOUT = float(os.environ.get('READINESS_PING_TIMEOUT', 2))
+startup_state = {
+    "ready": False,
+    "started_at": None,
+    "ready_at": None,
+    "duration_ms": None,
+    "steps": {}
+}
+bot_task = None
+warm_up_task = None
+
+async def timed_step(name: str, coroutine) -> bool:
+    """Run one warm-up step and record its outcome and duration"""
+    started = time.perf_counter()
+    step = {"ok": False, "duration_ms": None, "error": None}
+    startup_state['steps'][name] = step
+    try:
+        await coroutine
+        step['ok'] = True
+    except Exception as e:
+        step['error'] = str(e) or type(e).__name__
+        print(f"Warm-up step {name} failed: {step['error']}")
+    step['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return step['ok']
+
+async def preload_guild_configs():
+    """Fill the runtime settings cache for every guild with stored settings"""
+    now = time.monotonic()
+    loaded = {}
+    async for config in db.guild_settings.find({}, GUILD_CONFIG_FIELDS):
+        loaded[config['guild_id']] = config
+    # Templates bound to a guild take precedence, as in get_guild_config
+    async for config in db.server_configs.find({"guild_id": {"$ne": None}}, GUILD_CONFIG_FIELDS):
+        if config.get('guild_id'):
+            loaded[config['guild_id']] = config
+    for guild_id, config in loaded.items():
+        if guild_id not in active_guild_configs:
+            active_guild_configs[guild_id] = GuildState.from_document(config, now)
+
+async def backfill_search_text():
+    """Add the derived search text to configurations stored before it existed"""
+    async for doc in db.server_configs.find({"search_text": {"$exists": False}, "name": {"$exists": True}}):
+        config = await config_storage.decode(db, doc)
+        await db.server_configs.update_one({"_id": doc['_id']}, {"$set": {"search_text": search_text(config)}})
+
+async def connect_gateway():
+    """Start the bot and wait until the gateway session is ready"""
+    global bot_task
+    if bot_task is None or bot_task.done():
+        bot_task = asyncio.create_task(run_discord_bot())
+    ready = asyncio.create_task(bot.wait_until_ready())
+    try:
+        await asyncio.wait({ready, bot_task}, timeout=WARMUP_GATEWAY_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        ready.cancel()
+    if not bot.is_ready():
+        raise RuntimeError(bot_status['last_error'] or f"Gateway not ready after {WARMUP_GATEWAY_TIMEOUT}s")
+
+async def warm_up():
+    """Ping Mongo, check indexes, preload caches and connect the gateway in parallel"""
+    started = time.perf_counter()
+    startup_state['started_at'] = datetime.utcnow()
+    
+    steps = {
+        "mongo": timed_step("mongo", db.command("ping")),
+        "indexes": timed_step("indexes", ensure_indexes()),
+        "config_names": timed_step("config_names", load_config_name_index()),
+        "guild_configs": timed_step("guild_configs", preload_guild_configs()),
+        "search_text": timed_step("search_text", backfill_search_text())
+    }
+    if DISCORD_TOKEN:
+        steps["gateway"] = timed_step("gateway", connect_gateway())
+    results = dict(zip(steps, await asyncio.gather(*steps.values())))
+    
+    # Cache steps only slow down the first requests; Mongo and the gateway are required
+    startup_state['ready'] = results['mongo'] and results.get('gateway', True)
+    startup_state['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if startup_state['ready']:
+        startup_state['ready_at'] = datetime.utcnow()
+    print(f"Warm-up finished in {startup_state['duration_ms']}ms: "
+          + ", ".join(f"{name} {step['duration_ms']}ms{'' if step['ok'] else ' (failed)'}"
+                      for name, step in startup_state['steps'].items()))
+
+@api_router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+async def readiness_checks() -> Dict[str, bool]:
+    """Current state of the required dependencies: a Mongo ping and, with a token, the gateway session"""
+    checks = {}
+    try:
+        await asyncio.wait_for(db.command("ping"), READINESS_PING_TIMEOUT)
+        checks['mongo'] = True
+    except Exception:
+        checks['mongo'] = False
+    if DISCORD_TOKEN:
+        checks['gateway'] = bot.is_ready()
+    return checks
+
+@api_router.get("/readyz")
+async def readyz():
+    """Readiness: 503 during warm-up, then 200 while Mongo answers and the gateway is connected
+    
+    Checked on every probe, so a failed warm-up step (Mongo briefly down, the gateway
+    still chunking members past WARMUP_GATEWAY_TIMEOUT) recovers once the dependency does.
+    """
+    warming_up = warm_up_task is None or not warm_up_task.done()
+    checks = {} if warming_up else await readiness_checks()
+    ready = not warming_up and all(checks.values())
+    startup_state['ready'] = ready
+    if ready and startup_state['ready_at'] is None:
+        startup_state['ready_at'] = datetime.utcnow()
+    body = {"ready": ready, "warming_up": warming_up, "checks": checks,
+            "duration_ms": startup_state['duration_ms'], "steps": startup_state['steps']}
+    if not ready:
+        return JSONResponse(status_code=503, content=jsonable_encoder(body))
+    return body
+
+# Include router (after every api_router route is declared: include_router copies the routes)
+app.include_router(api_router)
+
 @app.on_event("startup")
 async def startup_event():
-    """Start Discord bot on app startup"""
-    if DISCORD_TOKEN:
-        asyncio.create_task(run_discord_bot())
+    """Warm up in the background so liveness answers immediately and readiness follows"""
+    global analytics_flush_task
+    analytics_flush_task = asyncio.create_task(flush_member_analytics_loop())
+    global warm_up_task
+    warm_up_task = asyncio.create_task(warm_up())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown"""
     if bot.is_closed() is False:
         await bot.close()
-    client.close()
+    if event_recorder:
+        event_recorder.close()
+    await welcome_cards.close()
+    await webhook_delivery.close()
+    if analytics_flush_task:
+        analytics_flush_task.cancel()
+    for task in list(autorole_job_tasks.values()):
+        task.cancel()
+    try:
+        await member_analytics.flush(db)
+    except Exception as e:
+        print(f"Failed to flush member analytics: {e}")
+    mongo.close()
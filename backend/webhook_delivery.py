@@ -0,0 +1,235 @@
+"""Welcome and goodbye delivery through per-channel webhooks.
+
+Enabled per guild with ``welcome_settings.delivery = "webhook"``. The first
+message for a channel creates a webhook there (one bot REST call) and stores
+it in ``delivery_webhooks``:
+
+    {channel_id, guild_id, webhook_id, token, created_at}
+
+Messages are then executed against the webhook URL over one pooled aiohttp
+session, so they do not count against the bot's per-channel and global rate
+limits. Each webhook has its own queue and worker: during a burst, queued
+embed-only messages are merged into requests of up to 10 embeds, and the
+worker follows the webhook's rate-limit headers. Messages with text content or
+an attachment are sent one per request.
+
+When a webhook cannot be created (missing Manage Webhooks) or turns out to be
+deleted, the messages go out through ``channel.send`` instead; a channel
+without permission is not retried for ``retry_after`` seconds.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import aiohttp
+import discord
+
+API_BASE = 'https://discord.com/api/v10'
+MAX_EMBEDS = 10
+
+
+class _Message:
+    __slots__ = ('channel', 'content', 'embed', 'file')
+
+    def __init__(self, channel, content: Optional[str], embed: Optional[discord.Embed], file: Optional[discord.File]):
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+        self.file = file
+
+    @property
+    def batchable(self) -> bool:
+        return self.embed is not None and not self.content and self.file is None
+
+
+class WebhookDelivery:
+    """Post messages through cached channel webhooks with per-webhook queues and embed batching"""
+
+    def __init__(self, name: str = 'Welcome', idle_timeout: float = 60.0, retry_after: float = 600.0):
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.retry_after = retry_after
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._webhooks: Dict[int, tuple] = {}  # channel_id -> (webhook_id, token)
+        self._unavailable: Dict[int, float] = {}  # channel_id -> monotonic time to retry creation
+        self._creating: Dict[int, asyncio.Lock] = {}
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self.delivered = 0
+        self.requests = 0
+        self.fallbacks = 0
+
+    # Webhooks ---------------------------------------------------------------
+
+    def _session_for_requests(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+
+    async def _webhook(self, db, channel) -> Optional[tuple]:
+        webhook = self._webhooks.get(channel.id)
+        if webhook is not None:
+            return webhook
+        if self._unavailable.get(channel.id, 0) > time.monotonic():
+            return None
+
+        lock = self._creating.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            webhook = self._webhooks.get(channel.id)
+            if webhook is not None:
+                return webhook
+            stored = await db.delivery_webhooks.find_one(
+                {"channel_id": str(channel.id)}, {"_id": 0, "webhook_id": 1, "token": 1}
+            )
+            if stored:
+                webhook = (stored['webhook_id'], stored['token'])
+            else:
+                try:
+                    created = await channel.create_webhook(name=self.name, reason="Welcome message delivery")
+                except discord.HTTPException as e:
+                    print(f"Cannot create a delivery webhook in {channel.id}: {e}")
+                    self._unavailable[channel.id] = time.monotonic() + self.retry_after
+                    return None
+                webhook = (str(created.id), created.token)
+                await db.delivery_webhooks.update_one(
+                    {"channel_id": str(channel.id)},
+                    {"$set": {
+                        "guild_id": str(channel.guild.id),
+                        "webhook_id": webhook[0],
+                        "token": webhook[1],
+                        "created_at": datetime.utcnow()
+                    }},
+                    upsert=True
+                )
+            self._webhooks[channel.id] = webhook
+            return webhook
+
+    async def forget(self, db, channel_id: int):
+        """Drop a channel's webhook after it was deleted on Discord's side"""
+        self._webhooks.pop(channel_id, None)
+        await db.delivery_webhooks.delete_one({"channel_id": str(channel_id)})
+
+    # Sending ----------------------------------------------------------------
+
+    async def send(self, db, channel, content: Optional[str] = None, embed: Optional[discord.Embed] = None,
+                   file: Optional[discord.File] = None):
+        """Queue a message for the channel's webhook; falls back to channel.send without one"""
+        webhook = await self._webhook(db, channel)
+        if webhook is None:
+            self.fallbacks += 1
+            await channel.send(content=content, embed=embed, file=file)
+            return
+
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = asyncio.Queue()
+        queue.put_nowait(_Message(channel, content, embed, file))
+        if channel.id not in self._workers:
+            task = asyncio.create_task(self._worker(db, channel.id, queue))
+            self._workers[channel.id] = task
+
+    async def _worker(self, db, channel_id: int, queue: asyncio.Queue):
+        carry = None
+        try:
+            while True:
+                first, carry = carry, None
+                if first is None:
+                    try:
+                        first = await asyncio.wait_for(queue.get(), self.idle_timeout)
+                    except asyncio.TimeoutError:
+                        if queue.empty():
+                            return
+                        continue
+
+                # Merge embed-only messages already waiting behind the first one
+                batch = [first]
+                while first.batchable and len(batch) < MAX_EMBEDS and not queue.empty():
+                    message = queue.get_nowait()
+                    if not message.batchable:
+                        carry = message
+                        break
+                    batch.append(message)
+
+                try:
+                    await self._execute(db, channel_id, batch)
+                except Exception as e:
+                    print(f"Webhook delivery failed in {channel_id}: {e}")
+                    await self._fall_back(batch)
+        finally:
+            self._workers.pop(channel_id, None)
+            if queue.empty():
+                self._queues.pop(channel_id, None)
+
+    async def _execute(self, db, channel_id: int, batch: List[_Message]):
+        while True:
+            webhook = self._webhooks.get(channel_id)
+            if webhook is None:
+                await self._fall_back(batch)
+                return
+            url = f"{API_BASE}/webhooks/{webhook[0]}/{webhook[1]}"
+            payload = {"allowed_mentions": {"parse": ["users"]}}
+            if batch[0].content:
+                payload["content"] = batch[0].content
+            embeds = [message.embed.to_dict() for message in batch if message.embed is not None]
+            if embeds:
+                payload["embeds"] = embeds
+
+            message = batch[0]
+            if message.file is not None:
+                data = aiohttp.FormData()
+                data.add_field('payload_json', json.dumps(payload), content_type='application/json')
+                message.file.reset()
+                data.add_field('files[0]', message.file.fp, filename=message.file.filename)
+                request = self._session_for_requests().post(url, data=data)
+            else:
+                request = self._session_for_requests().post(url, json=payload)
+
+            async with request as response:
+                self.requests += 1
+                if response.status == 429:
+                    retry = await response.json(content_type=None)
+                    await asyncio.sleep(float((retry or {}).get('retry_after', 1)))
+                    continue
+                if response.status in (401, 404):
+                    # Webhook deleted or token revoked: recreate on the next message
+                    await self.forget(db, channel_id)
+                    await self._fall_back(batch)
+                    return
+                if response.status >= 400:
+                    raise RuntimeError(f"HTTP {response.status}: {await response.text()}")
+
+                self.delivered += len(batch)
+                # Wait out an exhausted bucket before the next request on this webhook
+                if response.headers.get('X-RateLimit-Remaining') == '0':
+                    await asyncio.sleep(float(response.headers.get('X-RateLimit-Reset-After', 1)))
+                return
+
+    async def _fall_back(self, batch: List[_Message]):
+        for message in batch:
+            self.fallbacks += 1
+            try:
+                if message.file is not None:
+                    message.file.reset()
+                await message.channel.send(content=message.content, embed=message.embed, file=message.file)
+            except Exception as e:
+                print(f"Error sending message in {message.channel.id}: {e}")
+
+    async def close(self):
+        for task in list(self._workers.values()):
+            task.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def stats(self) -> Dict:
+        return {
+            "webhooks": len(self._webhooks),
+            "queued": sum(queue.qsize() for queue in self._queues.values()),
+            "delivered": self.delivered,
+            "requests": self.requests,
+            "fallbacks": self.fallbacks
+        }
@@ -0,0 +1,293 @@
+"""Rendered welcome cards (avatar, name and member count) for welcome messages.
+
+Enabled per guild through ``welcome_settings``:
+
+    card               bool, attach a rendered card to the welcome message
+    card_background    image URL used as the card background (optional)
+    card_color         background colour when no image is set, default "#2b2d31"
+    card_accent        colour of the avatar ring and title, default "#5865f2"
+    card_title         title line, default "مرحباً بك!"
+    card_text          subtitle, formatted with {username}, {server}, {member_count};
+                       default "العضو رقم {member_count}"
+
+Rendering uses Pillow (optional dependency; Arabic text is shaped by libraqm
+or, if installed, arabic-reshaper and python-bidi) in a process pool so the gateway
+loop never blocks on image work. The per-guild base image (background and
+title) is rendered once and reused; raw avatar and background downloads are
+kept in bounded LRU caches on the bot side, and each worker process keeps the
+decoded versions in its own LRU. When the pool already has ``max_pending``
+cards in flight, or a render takes too long, ``render`` returns None and the
+caller sends the plain embed instead.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Dict, Optional
+
+import aiohttp
+
+try:
+    from PIL import Image, ImageDraw, ImageFont, ImageOps, features
+except ImportError:  # optional dependency
+    Image = None
+
+try:
+    # Joined, right-to-left Arabic when Pillow is built without libraqm
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+except ImportError:
+    arabic_reshaper = None
+
+CARD_SIZE = (800, 260)
+AVATAR_SIZE = 160
+
+
+class _LRU:
+    __slots__ = ('_items', 'max_items')
+
+    def __init__(self, max_items: int):
+        self._items: OrderedDict = OrderedDict()
+        self.max_items = max_items
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+
+# Worker side (runs in the pool processes) ------------------------------------
+
+def _color(value: str, default: str):
+    try:
+        return tuple(int(value.lstrip('#')[i:i + 2], 16) for i in (0, 2, 4))
+    except (AttributeError, ValueError):
+        return _color(default, default)
+
+
+@lru_cache(maxsize=8)
+def _font(size: int):
+    path = os.environ.get('WELCOME_CARD_FONT')
+    for candidate in filter(None, (path, 'DejaVuSans-Bold.ttf', 'DejaVuSans.ttf')):
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=1)
+def _has_raqm() -> bool:
+    return features.check_feature('raqm')
+
+
+def _shape(text: str) -> str:
+    if _has_raqm() or arabic_reshaper is None:
+        return text
+    return get_display(arabic_reshaper.reshape(text))
+
+
+# Decoded images kept per worker process, keyed by base key / avatar hash
+_worker_bases = _LRU(64)
+_worker_avatars = _LRU(256)
+
+
+def _decoded_base(key: str, data: bytes):
+    base = _worker_bases.get(key)
+    if base is None:
+        base = Image.open(io.BytesIO(data)).convert('RGBA')
+        _worker_bases.put(key, base)
+    return base
+
+
+def _decoded_avatar(key: str, data: bytes):
+    avatar = _worker_avatars.get(key)
+    if avatar is None:
+        avatar = Image.open(io.BytesIO(data)).convert('RGBA')
+        avatar = ImageOps.fit(avatar, (AVATAR_SIZE, AVATAR_SIZE))
+        mask = Image.new('L', (AVATAR_SIZE, AVATAR_SIZE), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, AVATAR_SIZE - 1, AVATAR_SIZE - 1), fill=255)
+        avatar.putalpha(mask)
+        _worker_avatars.put(key, avatar)
+    return avatar
+
+
+def render_base(background: Optional[bytes], style: Dict) -> bytes:
+    """Render the guild's reusable card background with its title"""
+    if background:
+        card = ImageOps.fit(Image.open(io.BytesIO(background)).convert('RGBA'), CARD_SIZE)
+        card = Image.alpha_composite(card, Image.new('RGBA', CARD_SIZE, (0, 0, 0, 110)))
+    else:
+        card = Image.new('RGBA', CARD_SIZE, _color(style.get('card_color'), '#2b2d31') + (255,))
+
+    draw = ImageDraw.Draw(card)
+    accent = _color(style.get('card_accent'), '#5865f2')
+    left = 60 + AVATAR_SIZE + 40
+    draw.text((left, 50), _shape(style.get('card_title') or 'مرحباً بك!'), font=_font(40), fill=accent)
+    # Ring behind the avatar slot
+    top = (CARD_SIZE[1] - AVATAR_SIZE) // 2
+    draw.ellipse((60 - 6, top - 6, 60 + AVATAR_SIZE + 6, top + AVATAR_SIZE + 6), fill=accent)
+
+    output = io.BytesIO()
+    card.save(output, 'PNG')
+    return output.getvalue()
+
+
+def render_card(base_key: str, base: bytes, avatar_key: str, avatar: Optional[bytes],
+                name: str, subtitle: str) -> bytes:
+    """Draw one member's avatar, name and subtitle onto a rendered base"""
+    card = _decoded_base(base_key, base).copy()
+    top = (CARD_SIZE[1] - AVATAR_SIZE) // 2
+    if avatar:
+        image = _decoded_avatar(avatar_key, avatar)
+        card.alpha_composite(image, (60, top))
+
+    draw = ImageDraw.Draw(card)
+    left = 60 + AVATAR_SIZE + 40
+    draw.text((left, 110), _shape(name[:32]), font=_font(34), fill=(255, 255, 255))
+    draw.text((left, 160), _shape(subtitle[:60]), font=_font(24), fill=(200, 200, 210))
+
+    output = io.BytesIO()
+    card.convert('RGB').save(output, 'PNG', optimize=False)
+    return output.getvalue()
+
+
+# Bot side ---------------------------------------------------------------------
+
+class WelcomeCardRenderer:
+    """Render welcome cards in a process pool with bounded caches and a saturation fallback"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, timeout: float = 5.0,
+                 avatar_cache_size: int = 512, base_cache_size: int = 128):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._avatars = _LRU(avatar_cache_size)
+        self._backgrounds = _LRU(base_cache_size)
+        self._bases = _LRU(base_cache_size)
+        self._session = None
+        self.rendered = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> 'WelcomeCardRenderer':
+        return cls(
+            max_workers=int(os.environ.get('WELCOME_CARD_WORKERS', 2)),
+            max_pending=int(os.environ.get('WELCOME_CARD_MAX_PENDING', 8))
+        )
+
+    @property
+    def available(self) -> bool:
+        return Image is not None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps the workers free of the bot's threads and sockets
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    async def _download(self, url: str) -> Optional[bytes]:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        async with self._session.get(url) as response:
+            if response.status != 200:
+                return None
+            return await response.read()
+
+    async def _avatar_bytes(self, member) -> tuple:
+        asset = member.display_avatar.replace(size=256, format='png')
+        key = asset.key
+        data = self._avatars.get(key)
+        if data is None:
+            data = await asset.read()
+            self._avatars.put(key, data)
+        return key, data
+
+    async def _base(self, guild_id: int, settings: Dict) -> tuple:
+        style = {key: settings.get(key) for key in ('card_background', 'card_color', 'card_accent', 'card_title')}
+        fingerprint = hashlib.sha1(json.dumps(style, sort_keys=True, default=str).encode()).hexdigest()
+        key = f"{guild_id}:{fingerprint}"
+        base = self._bases.get(key)
+        if base is None:
+            background = None
+            url = style.get('card_background')
+            if url:
+                background = self._backgrounds.get(url)
+                if background is None:
+                    try:
+                        background = await self._download(url)
+                    except Exception as e:
+                        print(f"Failed to download welcome card background {url}: {e}")
+                    if background:
+                        self._backgrounds.put(url, background)
+            loop = asyncio.get_running_loop()
+            base = await loop.run_in_executor(self._pool(), render_base, background, style)
+            self._bases.put(key, base)
+        return key, base
+
+    async def render(self, member, settings: Dict) -> Optional[bytes]:
+        """Return PNG bytes for the member's card, or None to fall back to the plain embed"""
+        if not self.available or self._pending >= self.max_pending:
+            self.fallbacks += 1
+            return None
+
+        self._pending += 1
+        try:
+            subtitle = (settings.get('card_text') or 'العضو رقم {member_count}').format(
+                username=member.display_name,
+                server=member.guild.name,
+                member_count=member.guild.member_count
+            )
+            base_key, base = await asyncio.wait_for(self._base(member.guild.id, settings), self.timeout)
+            try:
+                avatar_key, avatar = await self._avatar_bytes(member)
+            except Exception as e:
+                print(f"Failed to fetch avatar for {member}: {e}")
+                avatar_key, avatar = '', None
+            loop = asyncio.get_running_loop()
+            card = await asyncio.wait_for(
+                loop.run_in_executor(self._pool(), render_card, base_key, base, avatar_key, avatar,
+                                     member.display_name, subtitle),
+                self.timeout
+            )
+            self.rendered += 1
+            return card
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died; start a fresh pool for the next card
+                self._executor = None
+            print(f"Welcome card rendering failed in {member.guild.id}: {e}")
+            self.fallbacks += 1
+            return None
+        finally:
+            self._pending -= 1
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "available": self.available,
+            "pending": self._pending,
+            "rendered": self.rendered,
+            "fallbacks": self.fallbacks
+        }
@@ -0,0 +1,160 @@
+"""Throughput benchmark for the automod pipeline.
+
+Measures messages per second through
+  * AutoModEngine.check alone (pure matching and sliding-window counting)
+  * the full on_message handler (guild config cache + automod + queued actions)
+
+using a guild with a large banned-word list, a set of regex patterns and spam
+and mention-flood limits. The queued deletes and timeouts are then flushed
+through the fake REST layer and the number of requests needed is
+reported next to the number of flagged messages. Exits non-zero when the full pipeline does not reach
+--min-rate messages per second.
+
+    python benchmarks/bench_automod.py --messages 100000 --banned-words 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+
+from fakes import BACKEND_DIR, FakeDatabase, FakeGuild, FakeHTTP, FakeMessage, load_server
+
+sys.path.insert(0, str(BACKEND_DIR))
+from automod import AutoModEngine  # noqa: E402
+
+VOCABULARY = (
+    "hello welcome server channel voice game match team play today tomorrow thanks please help "
+    "question answer discord bot role admin music movie code python server event stream night "
+    "مرحبا اهلا شكرا سؤال جواب لعبة فريق اليوم غدا مساعدة قناة صوت"
+).split()
+
+PATTERNS = [
+    r"discord(?:\.gg|app\.com/invite)/\w+",
+    r"https?://(?:bit\.ly|tinyurl\.com)/\S+",
+    r"(?:free|cheap)\s+nitro",
+    r"\b(\w)\1{9,}\b",
+    r"@every(?:one|body)\s+(?:look|check)",
+]
+
+
+def make_settings(banned_words, rng):
+    words = {"".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 10)))
+             for _ in range(banned_words)}
+    return {
+        "enabled": True,
+        "banned_words": sorted(words) + ["كلمة محظورة"],
+        "banned_patterns": PATTERNS,
+        "spam_max_messages": 5,
+        "spam_interval": 5,
+        "mention_max": 10,
+        "mention_interval": 10,
+        "actions": ["delete", "timeout"],
+        "timeout_duration": 300
+    }
+
+
+def make_messages(count, guild, channels, members, settings, rng, bad_ratio):
+    banned = settings["banned_words"]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(3, 25))
+        roll = rng.random()
+        mentions = ()
+        if roll < bad_ratio / 3:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(banned))
+        elif roll < 2 * bad_ratio / 3:
+            words.append("join discord.gg/abcdef")
+        elif roll < bad_ratio:
+            mentions = rng.sample(members, 6)
+        messages.append(FakeMessage(rng.choice(channels), rng.choice(members), " ".join(words), mentions=mentions))
+    return messages
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    db = FakeDatabase()
+    server = load_server(db)
+    server.automod = AutoModEngine()
+    server.AUTOMOD_ENABLED = True
+
+    async def no_commands(message):
+        return None
+    server.bot.process_commands = no_commands
+
+    guild = FakeGuild(FakeHTTP(bucket_limit=0, global_limit=0))
+    channels = [await guild.create_text_channel(f"chat-{i}") for i in range(10)]
+    members = [guild.add_member() for _ in range(args.members)]
+    settings = make_settings(args.banned_words, rng)
+    await db.server_configs.insert_one({"id": "automod-bench", "guild_id": str(guild.id), "moderation_settings": settings})
+    messages = make_messages(args.messages, guild, channels, members, settings, rng, args.bad_ratio)
+    chars = sum(len(m.content) for m in messages)
+
+    # Matching only
+    engine = AutoModEngine()
+    started = time.perf_counter()
+    engine.rules_for(guild.id, settings)
+    compile_s = time.perf_counter() - started
+    started = time.perf_counter()
+    flagged = sum(1 for m in messages if engine.check(m, settings))
+    check_s = time.perf_counter() - started
+
+    # Full handler path; actions are only queued here and sent by the batcher
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        for message in messages:
+            await server.on_message(message)
+        handler_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await server.automod.batcher.flush()
+        flush_s = time.perf_counter() - started
+
+    stats = server.automod.stats()
+    return {
+        "messages": len(messages),
+        "avg_chars": round(chars / len(messages), 1),
+        "banned_words": len(settings["banned_words"]),
+        "patterns": len(PATTERNS),
+        "compile_ms": round(compile_s * 1000, 3),
+        "check_msgs_per_s": round(len(messages) / check_s, 1),
+        "check_flagged": flagged,
+        "handler_msgs_per_s": round(len(messages) / handler_s, 1),
+        "handler_flagged": stats["flagged"],
+        "action_requests": stats["action_requests"],
+        "action_flush_s": round(flush_s, 3),
+        "db_queries": db.server_configs.op_counts["find_one"]
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--members", type=int, default=20000)
+    parser.add_argument("--banned-words", type=int, default=1000)
+    parser.add_argument("--bad-ratio", type=float, default=0.05, help="fraction of messages that violate a rule")
+    parser.add_argument("--min-rate", type=float, default=5000, help="required handler messages per second")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["handler_msgs_per_s"] < args.min_rate:
+        print(f"❌ Handler throughput below {args.min_rate} msgs/s")
+        return 1
+    print(f"✅ Handler throughput above {args.min_rate} msgs/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
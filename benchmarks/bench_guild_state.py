@@ -0,0 +1,122 @@
+"""Memory per guild of the runtime settings cache: raw Mongo documents vs GuildState.
+
+Builds --guilds settings documents the way guilds end up with them (setups
+from one of --templates shared templates, a per-guild welcome footer, some
+guilds with moderation settings), decodes each from JSON as the driver would,
+and measures the memory retained by the cache in its previous form
+((loaded_at, dict) tuples) and in the compact form (slotted, interned, shared
+GuildState records).
+
+    python benchmarks/bench_guild_state.py --guilds 100000
+"""
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+
+from fakes import BACKEND_DIR
+
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from guild_state import GuildState  # noqa: E402
+
+
+def make_templates(count, rng):
+    templates = []
+    for index in range(count):
+        templates.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "welcome_settings": {
+                "enabled": True,
+                "channel": rng.choice(["الترحيب", "welcome", "general"]),
+                "message": f"مرحباً {{user}} في {{server}}! نتمنى لك وقتاً ممتعاً في مجتمعنا رقم {index} 🎉",
+                "use_embed": True,
+                "title": "مرحباً بك! 🎉",
+                "color": rng.choice(["#00ff00", "#5865f2", "#ff9900"]),
+                "thumbnail": True,
+                "goodbye_enabled": index % 2 == 0,
+                "goodbye_channel": "الترحيب",
+                "goodbye_message": "وداعاً {username}! 👋"
+            },
+            "auto_role_settings": {"enabled": True, "roles": ["عضو", f"Member {index % 5}"]},
+            "moderation_settings": {
+                "banned_words": [f"word{n}" for n in range(10)],
+                "spam_max_messages": 5,
+                "actions": ["delete", "warn"]
+            } if index % 3 == 0 else None
+        })
+    return templates
+
+
+def make_documents(guilds, templates, rng):
+    """JSON text of each guild's settings document"""
+    documents = []
+    for index in range(guilds):
+        template = rng.choice(templates)
+        guild_id = str(800000000000000000 + index)
+        doc = {"id": template["id"], "guild_id": guild_id, **{k: v for k, v in template.items() if k != "id"}}
+        doc["welcome_settings"] = {**template["welcome_settings"], "footer": f"مرحباً بك في Guild {index}"}
+        documents.append((guild_id, json.dumps(doc, ensure_ascii=False)))
+    return documents
+
+
+def measure(documents, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    cache = {}
+    now = time.monotonic()
+    for guild_id, text in documents:
+        cache[guild_id] = build(json.loads(text), now)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del cache
+    return {
+        "bytes_per_guild": round(retained / len(documents)),
+        "total_mb": round(retained / 1024 / 1024, 1),
+        "build_us_per_guild": round(elapsed / len(documents) * 1e6, 2)
+    }
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    documents = make_documents(args.guilds, make_templates(args.templates, rng), rng)
+    raw = measure(documents, lambda doc, now: (now, doc))
+    compact = measure(documents, GuildState.from_document)
+    return {
+        "guilds": args.guilds,
+        "templates": args.templates,
+        "raw": raw,
+        "compact": compact,
+        "memory_ratio": round(compact["bytes_per_guild"] / raw["bytes_per_guild"], 3)
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--guilds", type=int, default=100000, help="guilds in the cache")
+    parser.add_argument("--templates", type=int, default=50, help="distinct templates the guilds were set up from")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
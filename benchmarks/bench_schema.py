@@ -0,0 +1,126 @@
+"""Validation time and memory of ServerConfig templates: typed entries vs plain dicts.
+
+Builds a template with --entries channels (flat format) and the same structure
+in the categories format, then compares the current ServerConfigCreate (slotted
+Role/Channel/Category dataclasses) with the previous model, whose roles and
+channels were List[Dict[str, Any]]. The dict model only checks the outer
+lists (nested values are Any and pass through unvisited), so its time is the
+floor for accepting a template without validating its entries.
+
+    python benchmarks/bench_schema.py --entries 1000
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from fakes import load_server
+from run_benchmarks import make_template
+
+
+class DictServerConfigCreate(BaseModel):
+    """ServerConfigCreate as it was before typed entries"""
+    name: str
+    description: str
+    icon_url: Optional[str] = None
+    roles: List[Dict[str, Any]]
+    channels: List[Dict[str, Any]]
+    categories: Optional[List[Dict[str, Any]]] = None
+    welcome_settings: Optional[Dict[str, Any]] = None
+    auto_role_settings: Optional[Dict[str, Any]] = None
+    moderation_settings: Optional[Dict[str, Any]] = None
+
+
+def make_payloads(entries):
+    flat = make_template(entries, role_count=max(10, entries // 10))
+    flat.pop("id", None)
+    for index, role in enumerate(flat["roles"]):
+        role.update(color=f"#{index * 2654435761 % 0xFFFFFF:06x}", hoist=index % 2 == 0, mentionable=False)
+
+    categories = {}
+    for channel in flat["channels"]:
+        if channel["type"] == "category":
+            categories[channel["name"]] = {"name": channel["name"], "position": channel["position"], "channels": []}
+    for channel in flat["channels"]:
+        if channel["type"] != "category":
+            entry = {k: v for k, v in channel.items() if k != "category"}
+            entry["overwrites"] = {"@everyone": {"allow": 0, "deny": 1024}}
+            categories[channel["category"]]["channels"].append(entry)
+    nested = {**flat, "channels": [], "categories": list(categories.values())}
+    # Round-trip through JSON so every run validates fresh, request-shaped data
+    return {"flat": json.dumps(flat), "categories": json.dumps(nested)}
+
+
+def measure(model, payload, repeats, copies):
+    timings = []
+    for _ in range(repeats):
+        fresh = json.loads(payload)
+        started = time.perf_counter()
+        model(**fresh)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    # Memory still held by validated templates once the parsed request bodies are gone
+    gc.collect()
+    tracemalloc.start()
+    kept = []
+    for _ in range(copies):
+        body = json.loads(payload)
+        kept.append(model(**body))
+        del body
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+
+    return {
+        "validate_ms_p50": round(timings[len(timings) // 2] * 1000, 3),
+        "validate_ms_min": round(timings[0] * 1000, 3),
+        "model_bytes": round(retained / copies)
+    }
+
+
+def run(args):
+    server = load_server()
+    payloads = make_payloads(args.entries)
+    report = {"entries": args.entries}
+    for layout, payload in payloads.items():
+        entry_count = len(json.loads(payload)["roles"]) + args.entries
+        typed = measure(server.ServerConfigCreate, payload, args.repeats, args.copies)
+        plain = measure(DictServerConfigCreate, payload, args.repeats, args.copies)
+        report[layout] = {
+            "entries_total": entry_count,
+            "typed": typed,
+            "dicts": plain,
+            "time_ratio": round(typed["validate_ms_p50"] / plain["validate_ms_p50"], 2),
+            "memory_ratio": round(typed["model_bytes"] / plain["model_bytes"], 2) if plain["model_bytes"] else None
+        }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000, help="channels per template")
+    parser.add_argument("--repeats", type=int, default=50, help="validations timed per model")
+    parser.add_argument("--copies", type=int, default=20, help="validated templates kept alive for the memory measurement")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,697 @@
+"""In-process stand-ins for MongoDB (Motor) and the Discord guild/HTTP layer.
+
+These fakes implement only the surface that backend/server.py touches so the
+bot handlers and API routes can be driven offline for benchmarking.
+"""
+import asyncio
+import copy
+import itertools
+import os
+import re
+import sys
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+
+
+# ---------------------------------------------------------------------------
+# Mongo stand-in
+# ---------------------------------------------------------------------------
+
+_MISSING = object()
+
+
+def _get_path(doc, path):
+    """Resolve a dotted key path inside a document"""
+    value = doc
+    for part in path.split('.'):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset_path(doc, path):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _match_condition(value, condition):
+    if isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition):
+        for op, operand in condition.items():
+            if op == '$in':
+                if value is _MISSING or value not in operand:
+                    return False
+            elif op == '$nin':
+                if value is not _MISSING and value in operand:
+                    return False
+            elif op == '$ne':
+                if value is not _MISSING and value == operand:
+                    return False
+            elif op == '$exists':
+                if (value is not _MISSING) != bool(operand):
+                    return False
+            elif op in ('$lt', '$lte', '$gt', '$gte'):
+                if value is _MISSING or value is None:
+                    return False
+                if op == '$lt' and not value < operand:
+                    return False
+                if op == '$lte' and not value <= operand:
+                    return False
+                if op == '$gt' and not value > operand:
+                    return False
+                if op == '$gte' and not value >= operand:
+                    return False
+            elif op == '$regex':
+                if not isinstance(value, str) or not re.search(operand, value, re.I if 'i' in condition.get('$options', '') else 0):
+                    return False
+            elif op == '$options':
+                continue
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {op}")
+        return True
+    if value is _MISSING:
+        return condition is None
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def _matches(doc, filter_):
+    for key, condition in (filter_ or {}).items():
+        if key == '$or':
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if key == '$and':
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+        if not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {k for k, v in projection.items() if v and k != '_id'}
+    exclude = {k for k, v in projection.items() if not v}
+    if include:
+        result = {}
+        for key in include:
+            value = _get_path(doc, key)
+            if value is not _MISSING:
+                _set_path(result, key, copy.deepcopy(value))
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    result = copy.deepcopy(doc)
+    for key in exclude:
+        _unset_path(result, key)
+    return result
+
+
+def _apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        if op == '$set':
+            for key, value in fields.items():
+                _set_path(doc, key, copy.deepcopy(value))
+        elif op == '$setOnInsert':
+            if inserting:
+                for key, value in fields.items():
+                    _set_path(doc, key, copy.deepcopy(value))
+        elif op == '$unset':
+            for key in fields:
+                _unset_path(doc, key)
+        elif op == '$inc':
+            for key, value in fields.items():
+                current = _get_path(doc, key)
+                _set_path(doc, key, (0 if current is _MISSING else current) + value)
+        elif op == '$max':
+            for key, value in fields.items():
+                current = _get_path(doc, key)
+                if current is _MISSING or value > current:
+                    _set_path(doc, key, value)
+        elif op == '$min':
+            for key, value in fields.items():
+                current = _get_path(doc, key)
+                if current is _MISSING or value < current:
+                    _set_path(doc, key, value)
+        elif op == '$push':
+            for key, value in fields.items():
+                current = _get_path(doc, key)
+                if current is _MISSING:
+                    current = []
+                    _set_path(doc, key, current)
+                if isinstance(value, dict) and '$each' in value:
+                    current.extend(copy.deepcopy(value['$each']))
+                    if value.get('$slice', 0) < 0:
+                        del current[:len(current) + value['$slice']]
+                else:
+                    current.append(copy.deepcopy(value))
+        else:
+            raise NotImplementedError(f"FakeCollection does not support {op}")
+
+
+class FakeCursor:
+    def __init__(self, docs, projection=None):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            key_or_list = [(key_or_list, direction)]
+        # {"$meta": "textScore"} sorts by descending score
+        self._sort = [(key, -1 if isinstance(value, dict) else value) for key, value in key_or_list]
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def _materialize(self, length=None):
+        docs = list(self._docs)
+        if self._sort:
+            for key, direction in reversed(self._sort):
+                docs.sort(key=lambda d: (_get_path(d, key) is _MISSING, _get_path(d, key) if _get_path(d, key) is not _MISSING else 0),
+                          reverse=direction < 0)
+        docs = docs[self._skip:]
+        limit = self._limit or length
+        if limit:
+            docs = docs[:limit]
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length=None):
+        return self._materialize(length)
+
+    def __aiter__(self):
+        self._iter = iter(self._materialize())
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Motor-compatible in-memory collection"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name):
+        self.name = name
+        self.docs = []
+        self.indexes = {}
+        self.op_counts = defaultdict(int)
+
+    async def create_index(self, keys, **kwargs):
+        name = kwargs.get('name') or str(keys)
+        self.indexes[name] = {'keys': keys, **kwargs}
+        return name
+
+    async def index_information(self):
+        return dict(self.indexes)
+
+    async def drop_index(self, name):
+        self.indexes.pop(name, None)
+
+    async def insert_one(self, document):
+        self.op_counts['insert_one'] += 1
+        doc = copy.deepcopy(document)
+        doc.setdefault('_id', next(self._ids))
+        document.setdefault('_id', doc['_id'])
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc['_id'], acknowledged=True)
+
+    async def insert_many(self, documents, ordered=True):
+        ids = [(await self.insert_one(d)).inserted_id for d in documents]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def find_one(self, filter_=None, projection=None, sort=None):
+        self.op_counts['find_one'] += 1
+        if sort:
+            docs = await FakeCursor([d for d in self.docs if _matches(d, filter_)], projection).sort(sort).to_list(1)
+            return docs[0] if docs else None
+        for doc in self.docs:
+            if _matches(doc, filter_):
+                return _project(doc, projection)
+        return None
+
+    def find(self, filter_=None, projection=None):
+        self.op_counts['find'] += 1
+        if filter_ and '$text' in filter_:
+            return FakeCursor(self._text_search(filter_), projection)
+        return FakeCursor([d for d in self.docs if _matches(d, filter_)], projection)
+
+    async def count_documents(self, filter_=None):
+        if filter_ and '$text' in filter_:
+            return len(self._text_search(filter_))
+        return sum(1 for d in self.docs if _matches(d, filter_))
+
+    def _text_search(self, filter_):
+        """$text over the collection's text index: any-term match, score = weighted term hits"""
+        fields = {}
+        for index in self.indexes.values():
+            keys = index['keys']
+            if any(kind == 'text' for _, kind in keys):
+                weights = index.get('weights') or {}
+                fields = {field: weights.get(field, 1) for field, kind in keys if kind == 'text'}
+        terms = {term.casefold() for term in re.findall(r'\w+', filter_['$text']['$search'])}
+        rest = {k: v for k, v in filter_.items() if k != '$text'}
+        results = []
+        for doc in self.docs:
+            if not _matches(doc, rest):
+                continue
+            score = 0.0
+            for field, weight in fields.items():
+                value = _get_path(doc, field)
+                if isinstance(value, str):
+                    tokens = re.findall(r'\w+', value.casefold())
+                    score += weight * sum(1 for token in tokens if token in terms)
+            if score:
+                results.append({**doc, 'score': score})
+        return results
+
+    async def update_one(self, filter_, update, upsert=False):
+        self.op_counts['update_one'] += 1
+        for doc in self.docs:
+            if _matches(doc, filter_):
+                _apply_update(doc, update)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            doc = {k: copy.deepcopy(v) for k, v in filter_.items() if not k.startswith('$') and not isinstance(v, dict)}
+            _apply_update(doc, update, inserting=True)
+            doc.setdefault('_id', next(self._ids))
+            self.docs.append(doc)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc['_id'])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, filter_, update, upsert=False):
+        matched = 0
+        for doc in self.docs:
+            if _matches(doc, filter_):
+                _apply_update(doc, update)
+                matched += 1
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_id=None)
+
+    async def replace_one(self, filter_, replacement, upsert=False):
+        for index, doc in enumerate(self.docs):
+            if _matches(doc, filter_):
+                new_doc = copy.deepcopy(replacement)
+                new_doc['_id'] = doc['_id']
+                self.docs[index] = new_doc
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            result = await self.insert_one(copy.deepcopy(replacement))
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=result.inserted_id)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def find_one_and_update(self, filter_, update, upsert=False, projection=None, return_document=False):
+        before = await self.find_one(filter_, projection)
+        await self.update_one(filter_, update, upsert=upsert)
+        if return_document:
+            return await self.find_one(filter_, projection)
+        return before
+
+    async def delete_one(self, filter_):
+        self.op_counts['delete_one'] += 1
+        for index, doc in enumerate(self.docs):
+            if _matches(doc, filter_):
+                del self.docs[index]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def find_one_and_delete(self, filter_, projection=None):
+        for index, doc in enumerate(self.docs):
+            if _matches(doc, filter_):
+                del self.docs[index]
+                return _project(doc, projection)
+        return None
+
+    async def delete_many(self, filter_):
+        before = len(self.docs)
+        self.docs = [d for d in self.docs if not _matches(d, filter_)]
+        return SimpleNamespace(deleted_count=before - len(self.docs))
+
+    async def bulk_write(self, requests, ordered=True):
+        upserted = modified = 0
+        for request in requests:
+            result = await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            upserted += 1 if result.upserted_id is not None else 0
+            modified += result.modified_count
+        return SimpleNamespace(upserted_count=upserted, modified_count=modified)
+
+
+class FakeDatabase:
+    """Motor-compatible database handle with lazily created collections"""
+
+    def __init__(self, name='benchmark'):
+        self.name = name
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    async def command(self, name, *args, **kwargs):
+        return {'ok': 1.0}
+
+
+# ---------------------------------------------------------------------------
+# Discord stand-in
+# ---------------------------------------------------------------------------
+
+class FakeHTTP:
+    """Simulated Discord REST layer with per-route latency and rate-limit buckets
+
+    Each bucket allows ``bucket_limit`` requests per ``bucket_window`` seconds
+    and all requests share a global ``global_limit`` per second, mirroring how
+    discord.py sleeps when a bucket is exhausted.
+    """
+
+    def __init__(self, latency=0.0, bucket_limit=50, bucket_window=1.0, global_limit=50, global_window=1.0):
+        self.latency = latency
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.global_limit = global_limit
+        self.global_window = global_window
+        self._buckets = defaultdict(deque)
+        self._global = deque()
+        self._bucket_locks = defaultdict(asyncio.Lock)
+        self._global_lock = asyncio.Lock()
+        self.request_count = 0
+        self.rate_limited = 0
+        self.rate_limit_wait = 0.0
+        self.calls = defaultdict(int)
+        self.guilds = {}
+
+    async def _acquire(self, window, limit, period):
+        while True:
+            now = time.perf_counter()
+            while window and now - window[0] >= period:
+                window.popleft()
+            if len(window) < limit:
+                window.append(now)
+                return
+            wait = period - (now - window[0])
+            self.rate_limited += 1
+            self.rate_limit_wait += wait
+            await asyncio.sleep(wait)
+
+    async def request(self, bucket, method='POST'):
+        self.calls[f"{method} {bucket}"] += 1
+        if self.bucket_limit:
+            async with self._bucket_locks[bucket]:
+                await self._acquire(self._buckets[bucket], self.bucket_limit, self.bucket_window)
+        if self.global_limit:
+            async with self._global_lock:
+                await self._acquire(self._global, self.global_limit, self.global_window)
+        self.request_count += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def bulk_channel_update(self, guild_id, data, *, reason=None):
+        """PATCH guilds/{id}/channels: set positions (and parents) of many channels at once"""
+        await self.request(f"guilds/{guild_id}/channels", 'PATCH')
+        guild = self.guilds[guild_id]
+        for entry in data:
+            channel = guild.get_channel(int(entry['id']))
+            if channel is None:
+                continue
+            channel.position = entry['position']
+            if 'parent_id' in entry:
+                channel.category = guild.get_channel(entry['parent_id']) if entry['parent_id'] else None
+
+    def stats(self):
+        return {
+            'requests': self.request_count,
+            'rate_limited': self.rate_limited,
+            'rate_limit_wait': round(self.rate_limit_wait, 4),
+        }
+
+
+_snowflakes = itertools.count(100000000000000000)
+
+
+def next_snowflake():
+    return next(_snowflakes)
+
+
+class FakeAsset:
+    def __init__(self, url):
+        self.url = url
+        self.key = url.rsplit('/', 1)[-1]
+
+    def replace(self, **kwargs):
+        return self
+
+    async def read(self):
+        return b''
+
+
+class FakeRole:
+    def __init__(self, guild, name, permissions=None, color=None, hoist=False, mentionable=False, position=0):
+        self.id = next_snowflake()
+        self.guild = guild
+        self.name = name
+        self.permissions = permissions if permissions is not None else SimpleNamespace(value=0)
+        self.color = color if color is not None else SimpleNamespace(value=0)
+        self.hoist = hoist
+        self.mentionable = mentionable
+        self.position = position
+        self.managed = False
+
+    def is_default(self):
+        return self.id == self.guild.id
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def __repr__(self):
+        return f"<FakeRole name={self.name!r}>"
+
+
+class FakeChannel:
+    def __init__(self, guild, name, type_, category=None, position=0, overwrites=None):
+        self.id = next_snowflake()
+        self.guild = guild
+        self.name = name
+        self.type = type_
+        self.category = category
+        self.position = position
+        self.overwrites = overwrites or {}
+        self.sent = 0
+
+    @property
+    def category_id(self):
+        return self.category.id if self.category else None
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.http.request(f"channels/{self.id}/messages")
+        self.sent += 1
+        return SimpleNamespace(id=next_snowflake(), content=content, **kwargs)
+
+    async def delete_messages(self, messages, *, reason=None):
+        await self.guild.http.request(f"channels/{self.id}/messages/bulk-delete")
+        for message in messages:
+            message.deleted = True
+
+    def __repr__(self):
+        return f"<FakeChannel name={self.name!r} type={self.type}>"
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content, mentions=(), role_mentions=()):
+        self.id = next_snowflake()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content
+        self.mentions = list(mentions)
+        self.role_mentions = list(role_mentions)
+        self.deleted = False
+
+    async def delete(self, *, delay=None):
+        await self.guild.http.request(f"channels/{self.channel.id}/messages", 'DELETE')
+        self.deleted = True
+
+
+class FakeMember:
+    def __init__(self, guild, name, member_id=None, created_at=None, bot=False):
+        self.id = member_id or next_snowflake()
+        self.guild = guild
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.created_at = created_at or (datetime.now(timezone.utc) - timedelta(days=365))
+        self.joined_at = datetime.now(timezone.utc)
+        self.roles = [guild.default_role]
+        self.guild_permissions = SimpleNamespace(manage_messages=False, administrator=False)
+        self.timed_out_until = None
+        self.display_avatar = FakeAsset(f"https://cdn.discordapp.com/embed/avatars/{self.id % 6}.png")
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    async def timeout(self, until, *, reason=None):
+        await self.guild.http.request(f"guilds/{self.guild.id}/members/{self.id}", 'PATCH')
+        self.timed_out_until = until
+
+    async def add_roles(self, *roles, reason=None, atomic=True):
+        for role in roles:
+            await self.guild.http.request(f"guilds/{self.guild.id}/members/roles", 'PUT')
+            self.roles.append(role)
+
+
+class FakeGuild:
+    """Minimal discord.Guild replacement whose mutations go through FakeHTTP"""
+
+    def __init__(self, http, name='Benchmark Guild', guild_id=None):
+        self.id = guild_id or next_snowflake()
+        self.name = name
+        self.http = http
+        self._state = SimpleNamespace(http=http)
+        http.guilds[self.id] = self
+        self.default_role = FakeRole(self, '@everyone')
+        self.default_role.id = self.id
+        self.roles = [self.default_role]
+        self.channels = []
+        self.members = []
+        self._member_count = 0
+        self.verification_level = None
+        self.icon = None
+
+    @property
+    def member_count(self):
+        return self._member_count or len(self.members)
+
+    @member_count.setter
+    def member_count(self, value):
+        self._member_count = value
+
+    @property
+    def categories(self):
+        return [c for c in self.channels if c.type == 'category']
+
+    @property
+    def text_channels(self):
+        return [c for c in self.channels if c.type == 'text']
+
+    @property
+    def voice_channels(self):
+        return [c for c in self.channels if c.type == 'voice']
+
+    def get_role(self, role_id):
+        for role in self.roles:
+            if role.id == role_id:
+                return role
+        return None
+
+    def get_channel(self, channel_id):
+        for channel in self.channels:
+            if channel.id == channel_id:
+                return channel
+        return None
+
+    def get_member(self, member_id):
+        for member in self.members:
+            if member.id == member_id:
+                return member
+        return None
+
+    async def create_role(self, *, name, permissions=None, color=None, colour=None, hoist=False, mentionable=False, reason=None):
+        await self.http.request(f"guilds/{self.id}/roles")
+        role = FakeRole(self, name, permissions, color or colour, hoist, mentionable, position=len(self.roles))
+        self.roles.append(role)
+        return role
+
+    async def _create_channel(self, name, type_, category=None, position=None, overwrites=None, **kwargs):
+        await self.http.request(f"guilds/{self.id}/channels")
+        siblings = [c for c in self.channels if c.category is category and (c.type == 'category') == (type_ == 'category')]
+        channel = FakeChannel(self, name, type_, category, len(siblings) if position is None else position, overwrites)
+        self.channels.append(channel)
+        return channel
+
+    async def create_category(self, name, *, position=None, overwrites=None, reason=None):
+        return await self._create_channel(name, 'category', position=position, overwrites=overwrites)
+
+    async def create_text_channel(self, name, *, category=None, position=None, overwrites=None, reason=None, **kwargs):
+        return await self._create_channel(name, 'text', category, position, overwrites)
+
+    async def create_voice_channel(self, name, *, category=None, position=None, overwrites=None, reason=None, **kwargs):
+        return await self._create_channel(name, 'voice', category, position, overwrites)
+
+    async def fetch_members(self, *, limit=1000, after=None):
+        """Yield members in id order after ``after``, one request per 1000 members"""
+        after_id = getattr(after, 'id', after) or 0
+        members = sorted((m for m in self.members if m.id > after_id), key=lambda m: m.id)
+        if limit is not None:
+            members = members[:limit]
+        for start in range(0, len(members), 1000):
+            await self.http.request(f"guilds/{self.id}/members", 'GET')
+            for member in members[start:start + 1000]:
+                yield member
+
+    async def fetch_channels(self):
+        await self.http.request(f"guilds/{self.id}/channels", 'GET')
+        return list(self.channels)
+
+    async def edit(self, *, reason=None, **fields):
+        await self.http.request(f"guilds/{self.id}", 'PATCH')
+        for key, value in fields.items():
+            setattr(self, key, value)
+        return self
+
+    def add_member(self, name=None, **kwargs):
+        member = FakeMember(self, name or f"member-{len(self.members)}", **kwargs)
+        self.members.append(member)
+        return member
+
+
+def load_server(db=None):
+    """Import backend/server.py offline and point it at a fake database"""
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'benchmark')
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    import server
+    server.db = db if db is not None else FakeDatabase()
+    return server
@@ -0,0 +1,290 @@
+"""Asyncio load generator for the Discord Server Manager REST API.
+
+Drives a weighted mix of API operations at a fixed target rate (open loop, so
+slow responses do not lower the offered load) and reports latency percentiles,
+error rates and achieved throughput per operation.
+
+Against an already running backend:
+
+    python benchmarks/load_test.py --base-url http://localhost:8001 --rps 200 --duration 30
+
+Against a local app started in a subprocess on the in-memory Mongo stand-in:
+
+    python benchmarks/load_test.py --spawn --rps 200 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import aiohttp
+
+from run_benchmarks import make_template, percentile
+
+DEFAULT_MIX = "list_configs=35,get_config=20,create_config=10,update_config=10,delete_config=5,setup=10,bot_status=10"
+
+
+class LoadGenerator:
+    def __init__(self, base_url, rps, duration, mix, max_in_flight, seed_configs):
+        self.base_url = base_url.rstrip('/')
+        self.rps = rps
+        self.duration = duration
+        self.mix = mix
+        self.max_in_flight = max_in_flight
+        self.seed_configs = seed_configs
+        self.config_ids = []
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+        self.dropped = 0
+        self.in_flight = 0
+        self.template = make_template(20)
+
+    def payload(self):
+        body = dict(self.template)
+        body["name"] = f"load-{random.getrandbits(32):08x}"
+        return body
+
+    # Operations -------------------------------------------------------------
+
+    async def op_list_configs(self, session):
+        return await session.get(f"{self.base_url}/api/configs")
+
+    async def op_get_config(self, session):
+        if not self.config_ids:
+            return await self.op_list_configs(session)
+        return await session.get(f"{self.base_url}/api/configs/{random.choice(self.config_ids)}")
+
+    async def op_create_config(self, session):
+        response = await session.post(f"{self.base_url}/api/configs", json=self.payload())
+        if response.status == 200:
+            self.config_ids.append((await response.json())["id"])
+        return response
+
+    async def op_update_config(self, session):
+        if not self.config_ids:
+            return await self.op_create_config(session)
+        config_id = random.choice(self.config_ids)
+        return await session.put(f"{self.base_url}/api/configs/{config_id}", json=self.payload())
+
+    async def op_delete_config(self, session):
+        # Keep the pool stocked so reads keep hitting existing documents
+        if len(self.config_ids) <= self.seed_configs // 2:
+            return await self.op_create_config(session)
+        config_id = self.config_ids.pop(random.randrange(len(self.config_ids)))
+        return await session.delete(f"{self.base_url}/api/configs/{config_id}")
+
+    async def op_setup(self, session):
+        if not self.config_ids:
+            return await self.op_create_config(session)
+        return await session.post(f"{self.base_url}/api/setup", json={
+            "guild_id": str(random.randint(10 ** 17, 10 ** 18)),
+            "config_id": random.choice(self.config_ids)
+        })
+
+    async def op_bot_status(self, session):
+        return await session.get(f"{self.base_url}/api/bot/status")
+
+    # Driver -----------------------------------------------------------------
+
+    async def execute(self, session, name):
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await getattr(self, f"op_{name}")(session)
+            await response.read()
+            self.status_codes[name][response.status] += 1
+            if response.status >= 400:
+                self.errors[name] += 1
+        except Exception:
+            self.errors[name] += 1
+            self.status_codes[name]["exception"] += 1
+        finally:
+            self.latencies[name].append(time.perf_counter() - started)
+            self.in_flight -= 1
+
+    async def seed(self, session):
+        for _ in range(self.seed_configs):
+            await self.op_create_config(session)
+
+    async def run(self):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        timeout = aiohttp.ClientTimeout(total=30)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await self.seed(session)
+
+            tasks = set()
+            interval = 1.0 / self.rps
+            started = time.perf_counter()
+            sent = 0
+            while True:
+                now = time.perf_counter()
+                if now - started >= self.duration:
+                    break
+                # Catch up on every request that is due so the offered rate holds
+                due = int((now - started) / interval) + 1
+                while sent < due:
+                    sent += 1
+                    if self.in_flight >= self.max_in_flight:
+                        self.dropped += 1
+                        continue
+                    task = asyncio.create_task(self.execute(session, random.choices(names, weights)[0]))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.sleep(max(0.0, started + sent * interval - time.perf_counter()))
+
+            if tasks:
+                await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+        return self.report(elapsed, sent)
+
+    def report(self, elapsed, offered):
+        operations = {}
+        all_latencies = []
+        total_errors = 0
+        for name, samples in sorted(self.latencies.items()):
+            all_latencies.extend(samples)
+            total_errors += self.errors[name]
+            operations[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / len(samples), 4),
+                "throughput_rps": round(len(samples) / elapsed, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "status_codes": {str(k): v for k, v in self.status_codes[name].items()}
+            }
+
+        completed = len(all_latencies)
+        return {
+            "target_rps": self.rps,
+            "duration_s": round(elapsed, 3),
+            "offered": offered,
+            "completed": completed,
+            "dropped": self.dropped,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(total_errors / completed, 4) if completed else 0.0,
+            "p50_ms": round(percentile(all_latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(all_latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(all_latencies, 99) * 1000, 2),
+            "operations": operations
+        }
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if not hasattr(LoadGenerator, f"op_{name}"):
+            raise argparse.ArgumentTypeError(f"unknown operation: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def print_report(report):
+    print("\n" + "=" * 78)
+    print(f"Target {report['target_rps']} rps for {report['duration_s']}s — "
+          f"achieved {report['throughput_rps']} rps, {report['dropped']} dropped, "
+          f"error rate {report['error_rate']:.2%}")
+    print("=" * 78)
+    print(f"{'operation':<16}{'requests':>10}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in report["operations"].items():
+        print(f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>9}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"{'all':<16}{report['completed']:>10}{'':>8}{report['throughput_rps']:>9}"
+          f"{report['p50_ms']:>10}{report['p95_ms']:>10}{report['p99_ms']:>10}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port):
+    """Run the FastAPI app on the in-memory Mongo stand-in (used by --spawn)"""
+    import uvicorn
+    from fakes import load_server
+
+    os.environ.pop("DISCORD_BOT_TOKEN", None)
+    server = load_server()
+    server.DISCORD_TOKEN = None
+    uvicorn.run(server.app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+async def wait_until_up(base_url, process, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("local app exited during startup")
+            try:
+                async with session.get(f"{base_url}/api/bot/status") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"local app did not come up within {timeout}s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001", help="backend to target")
+    parser.add_argument("--spawn", action="store_true", help="start a local app on the in-memory database")
+    parser.add_argument("--rps", type=float, default=100, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=10, help="test duration in seconds")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"weighted operations (default: {DEFAULT_MIX})")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="requests allowed in flight before dropping")
+    parser.add_argument("--seed-configs", type=int, default=20, help="configs created before the run")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        serve(args.serve)
+        return 0
+
+    process = None
+    base_url = args.base_url
+    if args.spawn:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)])
+
+    try:
+        if process:
+            asyncio.run(wait_until_up(base_url, process))
+        generator = LoadGenerator(base_url, args.rps, args.duration, args.mix, args.max_in_flight, args.seed_configs)
+        print(f"🚀 Load test against {base_url}: {args.rps} rps for {args.duration}s")
+        report = asyncio.run(generator.run())
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
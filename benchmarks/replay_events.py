@@ -0,0 +1,249 @@
+"""Replay recorded member join/leave events against the bot handlers.
+
+Recordings are produced by the bot when EVENT_RECORD_PATH is set (see
+backend/event_recorder.py). Each recorded guild is recreated on the fake
+Discord layer with welcome, goodbye and auto-role settings enabled, and every
+event is dispatched to on_member_join/on_member_remove as its own task, the
+way discord.py dispatches gateway events.
+
+    python benchmarks/replay_events.py recording.nevt --speed 1
+    python benchmarks/replay_events.py recording.nevt --speed 20 --latency 0.05
+    python benchmarks/replay_events.py recording.nevt --max-speed
+
+A raid-shaped recording can be synthesized for experiments:
+
+    python benchmarks/replay_events.py raid.nevt --synthesize --guilds 3 --burst 500
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from fakes import BACKEND_DIR, FakeDatabase, FakeGuild, FakeHTTP, FakeMember, load_server
+from run_benchmarks import percentile
+
+sys.path.insert(0, str(BACKEND_DIR))
+from event_recorder import EVENT_JOIN, EVENT_LEAVE, EventRecorder, read_events  # noqa: E402
+
+EVENT_NAMES = {EVENT_JOIN: "join", EVENT_LEAVE: "leave"}
+
+
+def synthesize(path, guilds, duration, background_rate, burst, burst_duration, seed):
+    """Write a recording with steady background traffic and one join burst per guild"""
+    rng = random.Random(seed)
+    recorder = EventRecorder(path)
+    start = time.time()
+    events = []
+    for index in range(guilds):
+        guild_id = 900000000000000000 + index
+        members = []
+        t = 0.0
+        while t < duration:
+            t += rng.expovariate(background_rate)
+            if members and rng.random() < 0.3:
+                events.append((start + t, EVENT_LEAVE, guild_id, members.pop(rng.randrange(len(members))), 0.0))
+            else:
+                member_id = rng.getrandbits(56)
+                members.append(member_id)
+                events.append((start + t, EVENT_JOIN, guild_id, member_id, start - rng.uniform(30, 1500) * 86400))
+        # Raid: many fresh accounts joining within a few seconds
+        burst_start = rng.uniform(duration * 0.3, duration * 0.7)
+        for _ in range(burst):
+            events.append((start + burst_start + rng.uniform(0, burst_duration), EVENT_JOIN, guild_id,
+                           rng.getrandbits(56), start - rng.uniform(0, 2) * 86400))
+    events.sort()
+    for timestamp, kind, guild_id, member_id, created in events:
+        recorder.record(kind, guild_id, member_id, created, timestamp=timestamp)
+    recorder.close()
+    return len(events)
+
+
+class Replayer:
+    def __init__(self, events, speed, http_kwargs, moderation_settings=None, verbose=False):
+        self.events = events
+        self.speed = speed
+        self.moderation_settings = moderation_settings
+        self.http = FakeHTTP(**http_kwargs)
+        self.verbose = verbose
+        self.db = FakeDatabase()
+        self.server = load_server(self.db)
+        self.server.event_recorder = None
+        self.guilds = {}
+        self.members = {}
+        self.latencies = defaultdict(list)
+        self.lags = []
+        self.completed = []
+        self.errors = 0
+
+    async def prepare(self):
+        for guild_id in sorted({event.guild_id for event in self.events}):
+            guild = FakeGuild(self.http, name=f"guild-{guild_id}", guild_id=guild_id)
+            await guild.create_text_channel("الترحيب")
+            await guild.create_role(name="👤 العضو")
+            await self.db.server_configs.insert_one({
+                "id": f"replay-{guild_id}",
+                "guild_id": str(guild_id),
+                "name": f"replay-{guild_id}",
+                "welcome_settings": {
+                    "enabled": True,
+                    "channel": "الترحيب",
+                    "message": "مرحباً {user} في {server}! 🎉",
+                    "use_embed": True,
+                    "thumbnail": True,
+                    "footer": "replay",
+                    "goodbye_enabled": True,
+                    "goodbye_channel": "الترحيب"
+                },
+                "auto_role_settings": {"enabled": True, "roles": ["👤 العضو"]},
+                "moderation_settings": self.moderation_settings
+            })
+            self.guilds[guild_id] = guild
+        self.http.request_count = 0
+
+    def member_for(self, event):
+        key = (event.guild_id, event.member_id)
+        member = self.members.get(key)
+        if member is None:
+            guild = self.guilds[event.guild_id]
+            created_at = datetime.fromtimestamp(event.account_created, timezone.utc) if event.account_created else None
+            member = FakeMember(guild, f"user-{event.member_id}", member_id=event.member_id, created_at=created_at)
+            self.members[key] = member
+        return member
+
+    async def dispatch(self, event, scheduled):
+        started = time.perf_counter()
+        self.lags.append(started - scheduled)
+        member = self.member_for(event)
+        try:
+            if event.kind == EVENT_JOIN:
+                await self.server.on_member_join(member)
+            else:
+                await self.server.on_member_remove(member)
+                self.members.pop((event.guild_id, event.member_id), None)
+        except Exception:
+            self.errors += 1
+        finished = time.perf_counter()
+        self.latencies[event.kind].append(finished - started)
+        self.completed.append(finished)
+
+    async def run(self):
+        await self.prepare()
+        tasks = []
+        origin = self.events[0].timestamp
+        output = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            started = time.perf_counter()
+            for event in self.events:
+                scheduled = started
+                if self.speed:
+                    scheduled = started + (event.timestamp - origin) / self.speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.dispatch(event, scheduled)))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+            # Release any lockdowns still open so deferred work is counted
+            for guild in self.guilds.values():
+                await self.server.anti_raid.lift(guild, self.moderation_settings or {})
+        return self.report(elapsed, started)
+
+    def report(self, elapsed, started):
+        recorded_peak = max(Counter(int(e.timestamp) for e in self.events).values())
+        handled_peak = max(Counter(int(t - started) for t in self.completed).values())
+        handlers = {}
+        for kind, samples in sorted(self.latencies.items()):
+            handlers[EVENT_NAMES[kind]] = {
+                "events": len(samples),
+                "p50_ms": round(percentile(samples, 50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 95) * 1000, 3),
+                "p99_ms": round(percentile(samples, 99) * 1000, 3),
+                "max_ms": round(max(samples) * 1000, 3)
+            }
+        return {
+            "events": len(self.events),
+            "guilds": len(self.guilds),
+            "speed": self.speed or "max",
+            "recorded_span_s": round(self.events[-1].timestamp - self.events[0].timestamp, 3),
+            "duration_s": round(elapsed, 3),
+            "throughput_eps": round(len(self.events) / elapsed, 2) if elapsed else 0.0,
+            "recorded_peak_eps": recorded_peak,
+            "handled_peak_eps": handled_peak,
+            "dispatch_lag_p99_ms": round(percentile(self.lags, 99) * 1000, 3),
+            "errors": self.errors,
+            "lockdowns": self.server.anti_raid.lockdowns,
+            "handlers": handlers,
+            **self.http.stats()
+        }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="recording file (EVENT_RECORD_PATH output)")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier (1 = real time)")
+    parser.add_argument("--max-speed", action="store_true", help="dispatch events back to back without pacing")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument("--bucket-limit", type=int, default=5, help="requests per bucket window (0 disables)")
+    parser.add_argument("--bucket-window", type=float, default=5.0, help="bucket window in seconds")
+    parser.add_argument("--global-limit", type=int, default=50, help="global requests per second (0 disables)")
+    parser.add_argument("--raid-threshold", type=int, default=0,
+                        help="enable anti-raid with this many joins per --raid-interval (0 disables)")
+    parser.add_argument("--raid-interval", type=float, default=10.0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own log output")
+
+    synth = parser.add_argument_group("synthesize a recording instead of replaying")
+    synth.add_argument("--synthesize", action="store_true")
+    synth.add_argument("--guilds", type=int, default=3)
+    synth.add_argument("--span", type=float, default=60.0, help="recording length in seconds")
+    synth.add_argument("--background-rate", type=float, default=0.5, help="background events per second per guild")
+    synth.add_argument("--burst", type=int, default=300, help="joins in each guild's raid burst")
+    synth.add_argument("--burst-duration", type=float, default=5.0, help="length of the raid burst in seconds")
+    synth.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.synthesize:
+        count = synthesize(args.recording, args.guilds, args.span, args.background_rate,
+                           args.burst, args.burst_duration, args.seed)
+        print(f"📼 Wrote {count} events to {args.recording}")
+        return 0
+
+    events = list(read_events(args.recording))
+    if not events:
+        print("❌ Recording contains no events")
+        return 1
+
+    http_kwargs = {
+        "latency": args.latency,
+        "bucket_limit": args.bucket_limit,
+        "bucket_window": args.bucket_window,
+        "global_limit": args.global_limit
+    }
+    moderation_settings = None
+    if args.raid_threshold:
+        moderation_settings = {
+            "raid_join_threshold": args.raid_threshold,
+            "raid_join_interval": args.raid_interval,
+            "raid_lockdown_duration": args.raid_interval
+        }
+    replayer = Replayer(events, None if args.max_speed else args.speed, http_kwargs, moderation_settings, args.verbose)
+    report = asyncio.run(replayer.run())
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""Offline benchmark suite for the Discord Server Manager backend.
+
+Runs backend/server.py against the in-process fakes in fakes.py and measures:
+  * server setup duration for templates of 10/100/500 channels
+  * member joins per second handled by on_member_join
+  * configuration CRUD throughput through the API route handlers
+
+Results are written as JSON so two runs can be compared:
+
+    python benchmarks/run_benchmarks.py --output before.json
+    python benchmarks/run_benchmarks.py --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from fakes import FakeDatabase, FakeGuild, FakeHTTP, load_server
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_template(channel_count, channels_per_category=10, role_count=10):
+    """Build a flat-format template with ``channel_count`` channels"""
+    roles = [
+        {"name": f"role-{i}", "color": "#%06x" % (i * 99991 % 0xffffff), "permissions": 104324161, "hoist": False, "mentionable": False}
+        for i in range(role_count)
+    ]
+    channels = []
+    position = 0
+    for index in range(channel_count):
+        if index % channels_per_category == 0:
+            category_name = f"category-{index // channels_per_category}"
+            channels.append({"name": category_name, "type": "category", "position": position})
+            position += 1
+        channels.append({
+            "name": f"channel-{index}",
+            "type": "voice" if index % 5 == 4 else "text",
+            "category": category_name,
+            "position": position
+        })
+        position += 1
+    return {
+        "name": f"bench-{channel_count}",
+        "description": f"Benchmark template with {channel_count} channels",
+        "roles": roles,
+        "channels": channels
+    }
+
+
+class BenchmarkRunner:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+
+    def http(self):
+        return FakeHTTP(
+            latency=self.args.latency,
+            bucket_limit=self.args.bucket_limit,
+            bucket_window=self.args.bucket_window,
+            global_limit=self.args.global_limit
+        )
+
+    @contextlib.contextmanager
+    def quiet(self):
+        """Swallow the bot's print() logging unless --verbose is set"""
+        if self.args.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+
+    async def bench_setup(self, channel_count):
+        db = FakeDatabase()
+        server = load_server(db)
+        http = self.http()
+        guild = FakeGuild(http)
+        # The channel order is applied through bot.http, which is the guild's HTTP client on Discord
+        server.bot.http.bulk_channel_update = http.bulk_channel_update
+        config = make_template(channel_count)
+        status = server.SetupStatus(guild_id=str(guild.id), config_id="bench", status="running")
+        await db.setup_status.insert_one(status.dict())
+
+        with self.quiet():
+            started = time.perf_counter()
+            success = await server.setup_discord_server(guild, config, status.id)
+            elapsed = time.perf_counter() - started
+
+        return {
+            "success": success,
+            "channels": channel_count,
+            "duration_s": round(elapsed, 6),
+            "channels_created": len(guild.channels),
+            "roles_created": len(guild.roles) - 1,
+            **http.stats()
+        }
+
+    async def bench_member_join(self, join_count, concurrency):
+        db = FakeDatabase()
+        server = load_server(db)
+        http = self.http()
+        guild = FakeGuild(http)
+        await guild.create_text_channel("الترحيب")
+        await guild.create_role(name="👤 العضو")
+        await db.server_configs.insert_one({
+            "id": "bench-join",
+            "guild_id": str(guild.id),
+            "name": "bench-join",
+            "welcome_settings": {
+                "enabled": True,
+                "channel": "الترحيب",
+                "message": "مرحباً {user} في {server}! 🎉",
+                "use_embed": True,
+                "thumbnail": True,
+                "footer": "benchmark"
+            },
+            "auto_role_settings": {"enabled": True, "roles": ["👤 العضو"]}
+        })
+        members = [guild.add_member() for _ in range(join_count)]
+        http.request_count = 0
+        latencies = []
+
+        async def handle(member):
+            started = time.perf_counter()
+            await server.on_member_join(member)
+            latencies.append(time.perf_counter() - started)
+
+        with self.quiet():
+            started = time.perf_counter()
+            for offset in range(0, join_count, concurrency):
+                await asyncio.gather(*(handle(m) for m in members[offset:offset + concurrency]))
+            elapsed = time.perf_counter() - started
+
+        return {
+            "joins": join_count,
+            "concurrency": concurrency,
+            "duration_s": round(elapsed, 6),
+            "joins_per_s": round(join_count / elapsed, 2),
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "latency_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+            "db_queries": db.server_configs.op_counts['find_one'],
+            **http.stats()
+        }
+
+    async def bench_config_crud(self, count):
+        db = FakeDatabase()
+        server = load_server(db)
+        template = make_template(20)
+        payload = server.ServerConfigCreate(**template)
+        results = {}
+        ids = []
+
+        async def timed(name, operations):
+            started = time.perf_counter()
+            for operation in operations:
+                await operation
+            elapsed = time.perf_counter() - started
+            results[f"{name}_ops_per_s"] = round(len(operations) / elapsed, 2) if elapsed else 0.0
+
+        started = time.perf_counter()
+        for _ in range(count):
+            created = await server.create_server_config(payload)
+            ids.append(created.id)
+        results["create_ops_per_s"] = round(count / (time.perf_counter() - started), 2)
+
+        await timed("get", [server.get_server_config(config_id) for config_id in ids])
+        await timed("list", [server.get_server_configs() for _ in range(max(1, count // 10))])
+        await timed("update", [server.update_server_config(config_id, payload) for config_id in ids])
+        await timed("delete", [server.delete_server_config(config_id) for config_id in ids])
+        results["configs"] = count
+        return results
+
+    async def run(self):
+        for size in self.args.sizes:
+            print(f"⏱  setup: {size} channels")
+            self.results[f"setup_{size}"] = await self.bench_setup(size)
+
+        print(f"⏱  on_member_join: {self.args.joins} joins")
+        self.results["member_join"] = await self.bench_member_join(self.args.joins, self.args.concurrency)
+
+        print(f"⏱  config CRUD: {self.args.configs} configs")
+        self.results["config_crud"] = await self.bench_config_crud(self.args.configs)
+        return self.results
+
+
+# Metric used to compare each benchmark between runs and whether higher is better
+PRIMARY_METRICS = {
+    "member_join": ("joins_per_s", True),
+    "config_crud": ("get_ops_per_s", True),
+}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print per-benchmark deltas against a previous run; return regressions"""
+    regressions = []
+    print("\n" + "=" * 60)
+    print(f"{'benchmark':<16}{'metric':<20}{'baseline':>10}{'current':>10}{'change':>9}")
+    print("=" * 60)
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        metric, higher_is_better = PRIMARY_METRICS.get(name, ("duration_s", False))
+        old, new = previous.get(metric), current.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -threshold if higher_is_better else change > threshold
+        marker = " ❌" if regressed else ""
+        print(f"{name:<16}{metric:<20}{old:>10}{new:>10}{change:>+8.1%}{marker}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="template sizes in channels")
+    parser.add_argument("--joins", type=int, default=2000, help="member joins to simulate")
+    parser.add_argument("--concurrency", type=int, default=50, help="joins dispatched at once")
+    parser.add_argument("--configs", type=int, default=200, help="configs used for CRUD throughput")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated REST latency in seconds")
+    parser.add_argument("--bucket-limit", type=int, default=0, help="requests per bucket window (0 disables)")
+    parser.add_argument("--bucket-window", type=float, default=1.0, help="bucket window in seconds")
+    parser.add_argument("--global-limit", type=int, default=0, help="global requests per second (0 disables)")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's own log output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runner = BenchmarkRunner(args)
+    results = asyncio.run(runner.run())
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "verbose")}
+        },
+        "results": results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
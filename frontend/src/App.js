@@ -272,13 +272,13 @@ function App() {
                   <div className="flex items-center text-sm text-gray-600">
                     <span className="ml-2">📋</span>
                     <span>
-                      {config.categories ? 
+                      {config.categories?.length ? 
                         `${config.categories.length} تصنيفات` : 
                         `${config.channels?.length || 0} قنوات`
                       }
                     </span>
                   </div>
-                  {config.categories && (
+                  {config.categories?.length > 0 && (
                     <div className="flex items-center text-sm text-purple-600">
                       <span className="ml-2">🗂️</span>
                       <span>تنسيق محسّن</span>
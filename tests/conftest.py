@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# The backend modules import each other as top-level modules (server.py runs from backend/);
+# the benchmark fakes (in-memory Mongo) are shared with the tests that need a database
+for directory in (ROOT_DIR / "backend", ROOT_DIR / "benchmarks"):
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
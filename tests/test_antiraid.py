@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+from antiraid import AntiRaidGuard, JoinRing
+
+
+def test_join_ring_trips_on_size_joins_within_window():
+    ring = JoinRing(3)
+    assert not ring.add(0.0, 10)
+    assert not ring.add(1.0, 10)
+    assert ring.add(2.0, 10)       # 3 joins within 10s
+    assert ring.add(10.0, 10)      # oldest kept join is t=1.0
+    assert not ring.add(25.0, 10)  # oldest kept join is t=2.0
+
+
+def test_join_ring_window_boundary_is_inclusive():
+    ring = JoinRing(2)
+    ring.add(0.0, 5)
+    assert ring.add(5.0, 5)
+    assert not ring.add(10.5, 5)
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1):
+        self.id = guild_id
+        self.name = "guild"
+        self.channels = []
+        self.verification_level = None
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+def test_guard_locks_down_and_hands_deferred_members_to_on_lift():
+    released = []
+
+    async def on_lift(guild, settings, members):
+        released.extend(members)
+
+    async def scenario():
+        guard = AntiRaidGuard(on_lift=on_lift)
+        guild = FakeGuild()
+        settings = {"raid_join_threshold": 3, "raid_join_interval": 60}
+        members = [SimpleNamespace(id=n, guild=guild) for n in range(5)]
+
+        results = [guard.observe(member, settings) for member in members]
+        assert results == [False, False, True, True, True]
+        assert guard.is_locked(guild.id)
+        assert guard.status(guild.id)["suppressed_joins"] == 3
+
+        await guard.lift(guild, settings)
+        assert not guard.is_locked(guild.id)
+        return members
+
+    members = asyncio.run(scenario())
+    assert released == members[2:]
+
+
+def test_guard_ignores_guilds_without_threshold():
+    guard = AntiRaidGuard()
+    member = SimpleNamespace(id=1, guild=FakeGuild())
+    assert not guard.observe(member, {})
+    assert guard.status(1) == {"monitored": False, "locked": False}
+
+
+def test_join_ring_of_one_trips_on_every_join():
+    ring = JoinRing(1)
+    assert ring.add(0.0, 10)
+    assert ring.add(100.0, 10)
+
+
+def test_lockdown_level_is_handed_over_and_restored_after_restart():
+    import discord
+
+    stored = {}
+
+    async def on_lockdown(guild, previous, raised):
+        stored[guild.id] = (previous, raised)
+
+    async def scenario():
+        guard = AntiRaidGuard(on_lockdown=on_lockdown)
+        guild = FakeGuild()
+        guild.verification_level = discord.VerificationLevel.low
+        settings = {"raid_join_threshold": 1, "raid_lockdown_duration": 60}
+        guard.observe(SimpleNamespace(id=1, guild=guild), settings)
+        await asyncio.sleep(0)  # let the lockdown task raise the level
+        guard._guilds[guild.id].lift_task.cancel()
+        assert stored[guild.id] == (discord.VerificationLevel.low, discord.VerificationLevel.high)
+        guild.verification_level = discord.VerificationLevel.high
+
+        # A new process: nothing is locked in memory, the stored level is restored
+        restarted = AntiRaidGuard()
+        assert await restarted.restore_after_restart(guild, *stored[guild.id])
+        assert guild.edits[-1]["verification_level"] == discord.VerificationLevel.low
+
+        # A level changed by the admins since the lockdown is left alone
+        guild.verification_level = discord.VerificationLevel.highest
+        assert await restarted.restore_after_restart(guild, *stored[guild.id])
+        assert len(guild.edits) == 2
+
+    asyncio.run(scenario())
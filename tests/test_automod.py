@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+from automod import AhoCorasick, AutoModEngine, GuildRules, SlidingWindow
+
+
+def make_message(content, guild_id=1, author_id=10, mentions=0):
+    author = SimpleNamespace(id=author_id, roles=[], guild_permissions=SimpleNamespace(manage_messages=False))
+    return SimpleNamespace(
+        content=content,
+        guild=SimpleNamespace(id=guild_id),
+        author=author,
+        mentions=[object()] * mentions,
+        role_mentions=[]
+    )
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("nothing to see", None),
+    ("buy spam now", "spam"),
+    ("ushers", "she"),         # suffix link: "he" is reached through the "she" branch
+    ("xhis", "his"),
+    ("hers and his", "he"),    # the shorter term ends first
+])
+def test_aho_corasick_finds_first_ending_term(text, expected):
+    automaton = AhoCorasick(["he", "she", "his", "hers", "spam"])
+    assert automaton.search(text) == expected
+
+
+def test_aho_corasick_overlapping_prefixes():
+    automaton = AhoCorasick(["abcd", "bc"])
+    assert automaton.search("abce") == "bc"
+    assert automaton.search("xabd") is None
+
+
+def test_sliding_window_expires_old_events():
+    window = SlidingWindow(5)
+    assert window.add(1, 0.0) == 1
+    assert window.add(1, 1.0, weight=3) == 4
+    assert window.add(2, 1.0) == 1
+    # The event at t=0 leaves the window at t=5 (exclusive)
+    assert window.add(1, 5.0) == 4
+    assert window.add(1, 6.5) == 2
+
+
+def test_sliding_window_prune_drops_idle_keys():
+    window = SlidingWindow(5)
+    window.add(1, 0.0)
+    window.add(2, 4.0)
+    window.prune(6.0)
+    assert len(window) == 1
+    assert window.add(1, 6.0) == 1
+
+
+def matches(rules, text):
+    return any(regex.search(text) for regex in rules.regexes)
+
+
+def test_patterns_with_global_inline_flags_are_combined():
+    rules = GuildRules({"banned_patterns": ["(?i)spam", r"free\s+nitro", "(?s)a.b"]})
+    assert len(rules.regexes) == 1
+    assert matches(rules, "SPAM here")
+    assert matches(rules, "FREE   nitro")
+    assert matches(rules, "a\nb")
+    assert not matches(rules, "eggs")
+
+
+def test_invalid_patterns_are_skipped():
+    rules = GuildRules({"banned_patterns": ["(unclosed", "ok+"]})
+    assert matches(rules, "okkk")
+
+
+def test_backreferences_keep_their_group_numbers():
+    rules = GuildRules({"banned_patterns": ["(free) nitro", r"(\w)\1{4,}", "plain"]})
+    assert matches(rules, "aaaaaaa")
+    assert matches(rules, "free nitro")
+    assert matches(rules, "plain")
+    assert not matches(rules, "abcdefg")
+
+
+def test_repeated_group_names_do_not_drop_the_guilds_patterns():
+    rules = GuildRules({"banned_patterns": [r"(?P<w>buy)\s+now", r"(?P<w>sell)\s+fast", "scam"]})
+    assert matches(rules, "buy  now")
+    assert matches(rules, "SELL fast")
+    assert matches(rules, "a scam")
+    assert not matches(rules, "buy later")
+
+
+def test_engine_flags_banned_words_and_spam():
+    engine = AutoModEngine()
+    settings = {"banned_words": ["Badword"], "spam_max_messages": 2, "spam_interval": 60}
+    assert engine.check(make_message("this has a BADWORD"), settings) == "banned word"
+    assert engine.check(make_message("hello", author_id=11), settings) is None
+    assert engine.check(make_message("hello", author_id=11), settings) is None
+    assert engine.check(make_message("hello", author_id=11), settings) == "spam"
+
+
+def test_engine_reuses_rules_for_equal_settings():
+    engine = AutoModEngine()
+    rules = engine.rules_for(1, {"banned_words": ["x"]})
+    assert engine.rules_for(1, {"banned_words": ["x"]}) is rules
+    assert engine.rules_for(1, {"banned_words": ["y"]}) is not rules
@@ -0,0 +1,44 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from fakes import FakeDatabase, load_server
+
+TEMPLATE = {"name": "Main", "description": "d", "roles": [], "channels": [{"name": "general", "type": "text"}]}
+
+
+def setup():
+    db = FakeDatabase()
+    server = load_server(db)
+    client = TestClient(server.app)
+    config_id = client.post("/api/configs", json=TEMPLATE).json()["id"]
+    return db, server, client, config_id
+
+
+def test_update_after_out_of_band_write_keeps_versions_readable():
+    db, server, client, config_id = setup()
+    # Written straight to the document, as /configure_welcome did before it saved versions
+    asyncio.run(db.server_configs.update_one({"id": config_id}, {"$set": {"welcome_settings": {"enabled": True}}}))
+
+    response = client.put(f"/api/configs/{config_id}", json={**TEMPLATE, "welcome_settings": {"enabled": False}})
+    assert response.status_code == 200
+
+    version = client.get(f"/api/configs/{config_id}/versions/2")
+    assert version.status_code == 200
+    assert version.json()["config"]["welcome_settings"] == {"enabled": False}
+    assert client.get(f"/api/configs/{config_id}/versions/1").json()["config"]["welcome_settings"] is None
+
+
+def test_guild_settings_are_saved_as_versions():
+    db, server, client, config_id = setup()
+    asyncio.run(db.server_configs.update_one({"id": config_id}, {"$set": {"guild_id": "42"}}))
+
+    asyncio.run(server.save_guild_settings("42", "auto_role_settings", {"enabled": True, "roles": ["Member"]}))
+    asyncio.run(server.save_guild_settings("42", "welcome_settings", {"enabled": True, "channel": "hi"}))
+
+    versions = client.get(f"/api/configs/{config_id}/versions").json()
+    assert [v["version"] for v in versions] == [3, 2, 1]
+    latest = client.get(f"/api/configs/{config_id}/versions/3").json()["config"]
+    assert latest["auto_role_settings"] == {"enabled": True, "roles": ["Member"]}
+    assert latest["welcome_settings"] == {"enabled": True, "channel": "hi"}
+    assert client.get(f"/api/configs/{config_id}").json()["version"] == 3
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import config_storage
+from config_storage import ConfigStorage
+from fakes import FakeDatabase
+
+
+def make_doc(config_id, channels=200):
+    return {
+        "id": config_id,
+        "name": f"Config {config_id}",
+        "roles": [{"name": f"Role {n}", "color": "#ff0000"} for n in range(20)],
+        "channels": [{"name": f"قناة-{n}", "type": "text", "category": None} for n in range(channels)],
+        "categories": None,
+    }
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.mark.parametrize("mode", ["compressed", "dedup"])
+@pytest.mark.parametrize("codec", ["zlib", "zstd"])
+def test_encode_decode_round_trip(mode, codec):
+    if codec == "zstd" and config_storage.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    db = FakeDatabase()
+    storage = ConfigStorage(mode=mode, min_bytes=100, codec=codec)
+    doc = make_doc("a")
+
+    encoded = run(storage.encode(db, doc))
+    assert set(encoded["_packed"]) == {"roles", "channels"}
+    assert "channels" not in encoded and encoded["name"] == doc["name"]
+
+    # A fresh instance has an empty cache, so the blobs are really read back
+    assert run(ConfigStorage(mode=mode).decode(db, encoded)) == doc
+    assert run(storage.decode(db, encoded)) == doc
+
+
+def test_small_documents_and_inline_mode_stay_inline():
+    db = FakeDatabase()
+    doc = make_doc("a", channels=2)
+    assert run(ConfigStorage(mode="compressed", min_bytes=1 << 20).encode(db, doc)) is doc
+    assert run(ConfigStorage(mode="inline", min_bytes=0).encode(db, make_doc("b"))) == make_doc("b")
+    assert run(ConfigStorage().decode(db, doc)) is doc
+
+
+def test_dedup_shares_blobs_and_releases_them_by_reference_count():
+    db = FakeDatabase()
+    storage = ConfigStorage(mode="dedup", min_bytes=100, codec="zlib")
+    first = run(storage.encode(db, make_doc("a")))
+    second = run(storage.encode(db, make_doc("b")))
+    assert first["_packed"]["channels"]["sha256"] == second["_packed"]["channels"]["sha256"]
+
+    async def blobs():
+        return await db.config_blobs.find({}, {"_id": 0, "sha256": 1, "refs": 1}).to_list(None)
+
+    assert sorted(blob["refs"] for blob in run(blobs())) == [2, 2]
+    run(storage.release(db, first))
+    assert sorted(blob["refs"] for blob in run(blobs())) == [1, 1]
+    run(storage.release(db, second))
+    assert run(blobs()) == []
+
+
+def test_update_operations_unset_the_other_representation():
+    packed = {"id": "a", "_packed": {"roles": {}, "channels": {}}}
+    assert ConfigStorage.update_operations(packed)["$unset"] == {"roles": "", "channels": ""}
+    assert ConfigStorage.update_operations({"id": "a", "roles": []})["$unset"] == {"_packed": ""}
+
+
+def test_missing_blob_is_reported():
+    db = FakeDatabase()
+    encoded = run(ConfigStorage(mode="dedup", min_bytes=100, codec="zlib").encode(db, make_doc("a")))
+    run(db.config_blobs.delete_many({}))
+    with pytest.raises(LookupError):
+        run(ConfigStorage(mode="dedup").decode(db, encoded))
+
+
+def test_cache_is_bounded():
+    storage = ConfigStorage(mode="compressed", min_bytes=100, codec="zlib", cache_size=2)
+    db = FakeDatabase()
+    for config_id in "abc":
+        doc = make_doc(config_id, channels=50)
+        doc["roles"] = [{"name": config_id}]
+        run(storage.encode(db, doc))
+    assert len(storage._cache) == 2
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ConfigStorage(mode="gzip")
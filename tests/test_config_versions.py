@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from config_versions import apply_patch, is_checkpoint, make_patch, rebuild
+
+
+def template(channels, roles=("Admin", "Member")):
+    return {
+        "name": "Server",
+        "description": "desc",
+        "roles": [{"name": name, "color": "#ff0000"} for name in roles],
+        "channels": [{"name": name, "type": "text", "category": None} for name in channels],
+    }
+
+
+@pytest.mark.parametrize("old, new", [
+    (template(["a", "b", "c"]), template(["a", "x", "b", "c"])),       # insert in the middle
+    (template(["a", "b", "c"]), template(["b", "c"])),                 # remove the head
+    (template(["a", "b", "c"]), template(["c", "b", "a"])),            # reorder
+    (template(["a"]), template([], roles=())),                         # empty lists
+    ({"a": 1, "b": {"c": [1, 2]}}, {"b": {"c": [2], "d": None}}),      # removed and added keys
+    ({"x/y": 1, "t~": 2}, {"x/y": 3, "t~": 2}),                        # keys needing escapes
+    ({"v": 1}, {"v": True}),                                           # equal but different type
+    ([1, 2], {"a": 1}),                                                 # root replaced
+])
+def test_patch_round_trip(old, new):
+    assert apply_patch(old, make_patch(old, new)) == new
+
+
+def test_patch_is_small_for_single_entry_edits():
+    old = template([f"channel-{n}" for n in range(50)])
+    new = template([f"channel-{n}" for n in range(50)])
+    new["channels"].insert(10, {"name": "inserted", "type": "voice", "category": None})
+    patch = make_patch(old, new)
+    assert patch == [{"op": "add", "path": "/channels/10", "value": new["channels"][10]}]
+
+
+def test_apply_patch_does_not_mutate_input():
+    old = template(["a"])
+    snapshot = template(["a"])
+    apply_patch(old, make_patch(old, template(["b"])))
+    assert old == snapshot
+
+
+def test_rebuild_from_checkpoint_and_deltas_matches_every_version():
+    rng = random.Random(5)
+    versions = [template(["general"])]
+    for _ in range(25):
+        channels = [channel["name"] for channel in versions[-1]["channels"]]
+        if channels and rng.random() < 0.4:
+            channels.pop(rng.randrange(len(channels)))
+        else:
+            channels.insert(rng.randrange(len(channels) + 1), f"c{rng.randrange(1000)}")
+        versions.append(template(channels))
+
+    records = []
+    for number, document in enumerate(versions, start=1):
+        if is_checkpoint(number, 10):
+            records.append({"version": number, "kind": "checkpoint", "document": document})
+        else:
+            records.append({"version": number, "kind": "delta", "patch": make_patch(versions[number - 2], document)})
+
+    for number in range(1, len(versions) + 1):
+        checkpoint = max(r["version"] for r in records if r["kind"] == "checkpoint" and r["version"] <= number)
+        chain = [r for r in records if checkpoint <= r["version"] <= number]
+        assert number - checkpoint < 10
+        assert rebuild(chain) == versions[number - 1]
+
+
+def test_checkpoint_schedule():
+    assert [v for v in range(1, 25) if is_checkpoint(v, 10)] == [1, 11, 21]
+
+
+def test_rebuild_requires_a_checkpoint():
+    with pytest.raises(ValueError):
+        rebuild([{"kind": "delta", "patch": []}])
@@ -0,0 +1,148 @@
+import asyncio
+import calendar
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from fakes import FakeDatabase
+from member_analytics import MemberAnalytics, bucket_start
+
+# 2026-03-01 23:58:30 UTC: the events below straddle a minute, hour and day boundary
+BASE = calendar.timegm(datetime(2026, 3, 1, 23, 58, 30).utctimetuple())
+
+
+def record_events(analytics):
+    analytics.record_join(1, BASE)            # 23:58
+    analytics.record_join(1, BASE + 20)       # 23:58
+    analytics.record_leave(1, BASE + 45)      # 23:59
+    analytics.record_join(1, BASE + 120)      # 00:00 next day
+    analytics.record_join(2, BASE)            # another guild
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_bucket_start():
+    assert bucket_start(BASE, "minute") == datetime(2026, 3, 1, 23, 58)
+    assert bucket_start(BASE, "hour") == datetime(2026, 3, 1, 23)
+    assert bucket_start(BASE, "day") == datetime(2026, 3, 1)
+
+
+def test_roll_up_sums_minutes_into_hours_and_days():
+    analytics = MemberAnalytics()
+    record_events(analytics)
+    totals = analytics._roll_up(analytics._pending)
+    assert totals[("1", "minute", datetime(2026, 3, 1, 23, 58))] == [2, 0]
+    assert totals[("1", "minute", datetime(2026, 3, 1, 23, 59))] == [0, 1]
+    assert totals[("1", "hour", datetime(2026, 3, 1, 23))] == [2, 1]
+    assert totals[("1", "day", datetime(2026, 3, 1))] == [2, 1]
+    assert totals[("1", "day", datetime(2026, 3, 2))] == [1, 0]
+    assert totals[("2", "day", datetime(2026, 3, 1))] == [1, 0]
+
+
+@pytest.mark.parametrize("granularity, start, end, expected", [
+    ("minute", datetime(2026, 3, 1, 23, 58), datetime(2026, 3, 2, 0, 0), [(2, 0), (0, 1), (1, 0)]),
+    ("hour", datetime(2026, 3, 1, 22), datetime(2026, 3, 2, 0), [(0, 0), (2, 1), (1, 0)]),
+    ("day", datetime(2026, 3, 1), datetime(2026, 3, 2), [(2, 1), (1, 0)]),
+])
+def test_series_is_the_same_before_and_after_flush(granularity, start, end, expected):
+    async def scenario():
+        db = FakeDatabase()
+        analytics = MemberAnalytics()
+        record_events(analytics)
+        before = await analytics.series(db, "1", granularity, start, end)
+        operations = await analytics.flush(db)
+        after = await analytics.series(db, "1", granularity, start, end)
+        return before, operations, after
+
+    before, operations, after = run(scenario())
+    assert [(p["joins"], p["leaves"]) for p in before] == expected
+    assert after == before
+    assert [p["net"] for p in after] == [joins - leaves for joins, leaves in expected]
+    # guild 1: 3 minutes + 2 hours + 2 days, guild 2: minute + hour + day
+    assert operations == 10
+
+
+def test_flush_accumulates_into_existing_buckets_and_sets_expiry():
+    async def scenario():
+        db = FakeDatabase()
+        analytics = MemberAnalytics()
+        analytics.record_join(1, BASE)
+        await analytics.flush(db)
+        analytics.record_join(1, BASE + 5)
+        await analytics.flush(db)
+        assert await analytics.flush(db) == 0
+        return await db.member_analytics.find({"guild_id": "1"}, {"_id": 0}).to_list(None)
+
+    docs = {doc["granularity"]: doc for doc in run(scenario())}
+    assert docs["minute"]["joins"] == 2
+    assert docs["minute"]["expires_at"] == datetime(2026, 3, 1, 23, 58) + timedelta(days=2)
+    assert docs["hour"]["expires_at"] == datetime(2026, 3, 1, 23) + timedelta(days=90)
+    assert "expires_at" not in docs["day"]
+
+
+def test_failed_flush_keeps_counts():
+    class FailingCollection:
+        async def bulk_write(self, operations, ordered=True):
+            raise RuntimeError("primary stepped down")
+
+    async def scenario():
+        db = FakeDatabase()
+        analytics = MemberAnalytics()
+        analytics.record_join(1, BASE)
+        with pytest.raises(RuntimeError):
+            await analytics.flush({"member_analytics": FailingCollection()})
+        analytics.record_join(1, BASE)
+        minute = datetime(2026, 3, 1, 23, 58)
+        before = await analytics.series(db, "1", "minute", minute, minute)
+        assert await analytics.flush(db) == 3
+        after = await analytics.series(db, "1", "minute", minute, minute)
+        return before, after
+
+    before, after = run(scenario())
+    assert before[0]["joins"] == after[0]["joins"] == 2
+
+
+def test_partial_flush_failure_retries_only_failed_operations():
+    class PartlyFailingCollection:
+        """Applies every operation except those on hour buckets, like an unordered bulk"""
+
+        def __init__(self, collection):
+            self.collection = collection
+
+        async def bulk_write(self, operations, ordered=True):
+            errors = []
+            for index, operation in enumerate(operations):
+                if operation._filter["granularity"] == "hour":
+                    errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                else:
+                    await self.collection.bulk_write([operation])
+            if errors:
+                raise BulkWriteError({"writeErrors": errors, "nInserted": 0})
+
+    async def scenario():
+        db = FakeDatabase()
+        analytics = MemberAnalytics()
+        record_events(analytics)
+        with pytest.raises(BulkWriteError):
+            await analytics.flush({"member_analytics": PartlyFailingCollection(db.member_analytics)})
+        assert analytics.flushed_operations == 7
+        hours = await analytics.series(db, "1", "hour", datetime(2026, 3, 1, 23), datetime(2026, 3, 2, 0))
+        assert await analytics.flush(db) == 3
+        assert await analytics.flush(db) == 0
+        return hours, await db.member_analytics.find({"guild_id": "1"}, {"_id": 0}).to_list(None)
+
+    hours, docs = run(scenario())
+    assert [(p["joins"], p["leaves"]) for p in hours] == [(2, 1), (1, 0)]
+    counts = {(doc["granularity"], doc["bucket"]): (doc["joins"], doc["leaves"]) for doc in docs}
+    assert counts[("minute", datetime(2026, 3, 1, 23, 58))] == (2, 0)
+    assert counts[("hour", datetime(2026, 3, 1, 23))] == (2, 1)
+    assert counts[("day", datetime(2026, 3, 1))] == (2, 1)
+
+
+def test_series_rejects_ranges_over_max_points():
+    analytics = MemberAnalytics(max_points=10)
+    with pytest.raises(ValueError):
+        run(analytics.series(FakeDatabase(), "1", "minute", datetime(2026, 3, 1), datetime(2026, 3, 1, 1)))
@@ -0,0 +1,72 @@
+from prefix_index import KeyedPrefixIndex, PrefixIndex
+
+
+def test_search_is_case_insensitive_and_sorted():
+    index = PrefixIndex(["Gaming", "gallery", "General", "Art"])
+    assert index.search("ga") == ["gallery", "Gaming"]
+    assert index.search("G") == ["gallery", "Gaming", "General"]
+    assert index.search("") == ["Art", "gallery", "Gaming", "General"]
+
+
+def test_search_stops_at_prefix_bounds_and_limit():
+    index = PrefixIndex([f"team {n:02d}" for n in range(40)] + ["tea", "teb", "te"])
+    assert index.search("team", limit=3) == ["team 00", "team 01", "team 02"]
+    assert len(index.search("team")) == 25
+    assert index.search("tea", limit=50)[0] == "tea"
+    assert "teb" not in index.search("tea", limit=50)
+    assert index.search("zzz") == []
+    assert index.search("team 39") == ["team 39"]
+
+
+def test_duplicate_names_are_counted():
+    index = PrefixIndex(["Main", "main"])
+    assert len(index) == 1
+    index.remove("MAIN")
+    assert "main" in index
+    index.remove("main")
+    assert "main" not in index
+    assert index.search("m") == []
+
+
+def test_add_remove_rename_keep_keys_sorted():
+    index = PrefixIndex()
+    for name in ["delta", "alpha", "charlie", "bravo"]:
+        index.add(name)
+    index.rename("charlie", "echo")
+    index.remove("missing")
+    assert index.search("") == ["alpha", "bravo", "delta", "echo"]
+
+
+def test_fuzzy_search_orders_prefix_word_and_subsequence_matches():
+    index = PrefixIndex(["Moderator", "🛡️ Moderator", "Server Admin", "Member"])
+    assert index.fuzzy_search("mod") == ["Moderator", "🛡️ Moderator"]
+    assert index.fuzzy_search("adm") == ["Server Admin"]
+    assert index.fuzzy_search("mr") == ["Member", "Moderator", "🛡️ Moderator"]
+    assert index.fuzzy_search("mod", exclude=["moderator"]) == ["🛡️ Moderator"]
+
+
+def test_resolve_and_suggest():
+    index = PrefixIndex(["Server Admin", "Member"])
+    assert index.resolve("server admin") == "Server Admin"
+    assert index.resolve("nobody") is None
+    assert index.suggest("Membr") == ["Member"]
+
+
+def test_keyed_index_keeps_names_differing_only_in_case():
+    index = KeyedPrefixIndex([("1", "Main"), ("2", "main"), ("3", "Other")])
+    assert len(index) == 3
+    assert sorted(index.search("MA")) == [("1", "Main"), ("2", "main")]
+    index.set("1", "Renamed")
+    assert index.search("ma") == [("2", "main")]
+    assert index.search("re") == [("1", "Renamed")]
+    index.remove("2")
+    index.remove("missing")
+    assert index.search("ma") == []
+    assert "2" not in index
+
+
+def test_keyed_index_returns_ids_for_long_names():
+    long_name = "x" * 150
+    index = KeyedPrefixIndex([("a", long_name), ("b", long_name)])
+    assert index.search("x" * 120) == [("a", long_name), ("b", long_name)]
+    assert index.search("x", limit=1) == [("a", long_name)]
@@ -0,0 +1,47 @@
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from schema import Category, Channel, Role, check_names
+
+
+class Template(BaseModel):
+    roles: List[Role]
+    channels: List[Channel]
+    categories: Optional[List[Category]] = None
+
+
+def test_unknown_types_and_keys_round_trip():
+    stored = {
+        "roles": [{"name": "Admin", "icon": "🛡️"}],
+        "channels": [{"name": "news", "type": "announcement", "nsfw": True, "slowmode": 5}],
+        "categories": [{"name": "Voice", "collapsed": True,
+                        "channels": [{"name": "stage", "type": "stage", "bitrate": 64000}]}],
+    }
+    dumped = Template(**stored).model_dump()
+    assert dumped["roles"][0]["icon"] == "🛡️"
+    assert dumped["channels"][0]["type"] == "announcement"
+    assert dumped["channels"][0]["slowmode"] == 5
+    assert dumped["categories"][0]["collapsed"] is True
+    assert dumped["categories"][0]["channels"][0]["bitrate"] == 64000
+    assert "extra" not in dumped["channels"][0]
+    assert Template(**dumped).model_dump() == dumped
+
+
+def test_entries_stay_slotted():
+    channel = Channel(name="general")
+    assert not hasattr(channel, "__dict__")
+    assert channel.extra is None
+
+
+def test_check_names_strips_and_rejects_empty_names():
+    template = Template(roles=[{"name": "  Admin "}], channels=[{"name": "chat"}])
+    check_names(template.roles, template.channels, None)
+    assert template.roles[0].name == "Admin"
+
+    empty = Template(roles=[], channels=[], categories=[{"name": "ok", "channels": [{"name": " "}]}])
+    with pytest.raises(ValueError):
+        check_names(empty.roles, empty.channels, empty.categories)
+    with pytest.raises(ValueError):
+        check_names([Role(name="x" * 101)], [], None)